@@ -1,6 +1,6 @@
 from player import Player
 import card_tools as ct
-import card
+import ranking
 import user_interface as ui
 
 class AI(Player):
@@ -9,28 +9,7 @@ class AI(Player):
   def ai_choose_cards(self, number_of_cards = 1):
     '''Return cards chosen to trade'''
 
-    # Creates arrays with length corresponding to number of cards filled with None as placeholders to contain best cards to give
-    best_hands = [None] * number_of_cards
-    best_hand_moves = [None] * number_of_cards
-    best_cards = [None] * number_of_cards
-
-    # Loops through each card in hand
-    for card_index in range(len(self.hand)):
-
-      # Determines the remaining hand if that card was traded
-      remaining_hand = self.hand.subtract(self.hand[card_index], False)
-
-      # Fills best_cards list with best cards to trade according to how good their respective remaining hands are
-      for ranking in range(len(best_cards)):
-        if best_hands[ranking] == None or ct.greater_than(remaining_hand.get_valid_moves(), best_hand_moves[ranking]):
-          best_hands.insert(ranking, remaining_hand)
-          best_hand_moves.insert(ranking, best_hands[ranking].get_valid_moves())
-          best_cards.insert(ranking, self.hand[card_index])
-
-          best_hands.pop()
-          best_hand_moves.pop()
-          best_cards.pop()
-          break
+    best_cards = self.choose_trade_cards(number_of_cards)
 
     if number_of_cards == 1:
       ui.print_end_input("AI giving " + str(best_cards[0]) , False)
@@ -38,6 +17,16 @@ class AI(Player):
       ui.print_end_input("AI giving " + str(best_cards[0]) + " and " + str(best_cards[1]), False)
 
     return best_cards
+
+  def choose_trade_cards(self, number_of_cards = 1):
+    '''Return cards chosen to trade, without any output'''
+
+    # Ranks each card by how good the remaining hand would be if it was traded (see card_tools.profile_key),
+    # keeping the earlier card in the hand first when two are as good
+    def remaining_hand_key(hand_card):
+      return ct.profile_key(self.hand.capability_profile(self.hand.mask_of(hand_card)))
+
+    return ranking.top_k(self.hand, number_of_cards, key=remaining_hand_key)
   
   def __ai_determine_first_move(self):
     '''Return move to play when no previous move (this may be updated if time permits)'''
@@ -48,16 +37,14 @@ class AI(Player):
     if self._can_pass and len(self._valid_moves) == 0:
       return 1
 
-    best_hand = None
-    best_hand_moves = None
+    best_hand_profile = None
     best_move = None
 
-    for move_index in range(len(self._valid_moves)):
-      remaining_hand = self.hand.subtract(self._valid_moves[move_index], False)
+    for move_index, move_mask in enumerate(self._valid_moves.masks):
+      remaining_profile = self.hand.capability_profile(move_mask)
 
-      if best_hand == None or ct.greater_than(remaining_hand.get_valid_moves(), best_hand_moves):
-        best_hand = remaining_hand
-        best_hand_moves = best_hand.get_valid_moves()
+      if best_move == None or ct.profile_greater_than(remaining_profile, best_hand_profile):
+        best_hand_profile = remaining_profile
         best_move = move_index
 
     return best_move + 1
@@ -1,15 +1,27 @@
-from card import Card, Hand, Move, BlankCard
+from card import BlankCard, CARDS
 import user_input as user_in
 import user_interface as ui
-import random
-import math
-from player import Player
+import time
 from person import Person
 from ai import AI
-import card_tools as ct
+import dealing
+import engine
+import instrumentation
+import game_log
+import multi_deck
 
 # GLOBAL VARIABLES
 TEST = True
+INSTRUMENT = False    # Records turn latencies, move generation and output time (see instrumentation) if true
+
+game_summary = None   # Summary of what was recorded in the last game, if INSTRUMENT is true
+LOG_PATH = None       # Game log that every finished game is appended to (see game_log), if specified
+SEED = None           # Seed of the deals of every game (see dealing), which makes them reproducible if specified
+DECKS = 1             # Number of decks shuffled together (see multi_deck), which is asked for when there are over 8 players
+
+deal_random = None    # Random number generator of the deals of the game in progress
+
+game_rounds = []      # Deals, trades, turns and finishing order of each round of the game in progress
 
 total_rounds = None
 num_players = None
@@ -18,11 +30,13 @@ players = []
 def setup():
   '''Setup the game by allowing user to specify the number of rounds, players, and their names and AI status'''
 
-  global total_rounds, num_players, players
+  global total_rounds, num_players, players, deal_random, DECKS
 
+  deal_random = dealing.stream(SEED)
   players.clear()
+  game_rounds.clear()
 
-  intro_text = ("This is a card game with 3-8 players, where players "
+  intro_text = ("This is a card game with 3-8 players (or up to " + str(engine.max_players(multi_deck.MAX_DECKS)) + " with several decks), where players "
   "can play moves, like single cards and poker combos, according to the "
   "previous move. Please specify the "
   "number of players and the number of rounds below. Note that each player "
@@ -33,7 +47,13 @@ def setup():
   ui.print_title_input("Choose Game Options:")
 
   total_rounds = user_in.valid_input("Num Rounds: ", int, "Please enter a number.")
-  num_players = user_in.valid_input_with_range("Num Players: ", int, 3, 8)
+  num_players = user_in.valid_input_with_range("Num Players: ", int, engine.MIN_PLAYERS, engine.max_players(multi_deck.MAX_DECKS))
+
+  # Tables of more than one deck's worth of players choose how many decks to deal from
+  if num_players > engine.MAX_PLAYERS:
+    DECKS = user_in.valid_input_with_range("Num Decks: ", int, engine.decks_needed(num_players), multi_deck.MAX_DECKS)
+  else:
+    DECKS = 1
 
   for player_counter in range(num_players):
     player_name = user_in.input_ln("Player " + str(player_counter + 1) + " name: ")
@@ -46,31 +66,24 @@ def setup():
 
   ui.print_end_input("Setting up the game", False)
 
+  if INSTRUMENT: instrumentation.start()
+
 def deal_to(*players):
-  '''Deals an equal number of cards to each player from a full deck of cards'''
+  '''Deals an equal number of cards to each player from a full deck of cards, and return the cards left over'''
 
-  deck = ct.full_deck()[:]
-  cards_left = len(deck)
-  leftover = cards_left % len(players)
-  keep_dealing = True
+  hand_masks, remainder_mask = dealing.deal(deal_random, len(players), DECKS)
+  hand_class = multi_deck.hand_class(DECKS)
 
-  while keep_dealing:
-    for player in players:
-      if cards_left <= leftover: 
-        keep_dealing = False
-        break
-      player.hand.append(deck.pop(random.randrange(0, len(deck))))
-      cards_left -= 1
+  for player, hand_mask in zip(players, hand_masks):
+    if not isinstance(player.hand, hand_class): player.hand = hand_class(player.hand)
+    player.hand.extend(hand_class.from_mask(hand_mask))
 
-  return deck
+  return hand_class.from_mask(remainder_mask)
 
-def get_lowest_card(remainder_deck, lowest_possible = Card(3, 0)):
-  '''Return the lowest card in the deck according to the cards leftover after dealing'''
+def get_lowest_card(remainder_deck):
+  '''Return the lowest card dealt to a player, according to the cards leftover after dealing'''
 
-  if lowest_possible in remainder_deck:
-    return get_lowest_card(remainder_deck[:].remove(lowest_possible), lowest_possible.get_next())
-  else:
-    return lowest_possible
+  return CARDS[dealing.lowest_dealt_card(remainder_deck.to_mask(), DECKS)]
 
 def do_round(round_number):
   '''Conducts one round of President'''
@@ -87,13 +100,17 @@ def do_round(round_number):
       starting_player_index = players.index(player)
       # ui.print_ln("sp_index [first]:" + str(starting_player_index))
 
+  seating = [player.name for player in players]
+  hands = [player.hand.to_mask() for player in players]
+  trades = []
+
   if round_number > 1:
     starting_player_index = 0
     # ui.print_ln("sp_index [subsequent]:" + str(starting_player_index))
-    do_trade()
+    trades = do_trade()
 
   ui.print_box("Round " + str(round_number), "This is the " + ui.to_ordinal(round_number) + " round.", "Players will see their cards in the following order: ", *players[starting_player_index:], *players[0:starting_player_index])
-  input("> Press enter to proceed to the first player (" + players[starting_player_index].name + ")...")
+  user_in.wait_for_enter("> Press enter to proceed to the first player (" + players[starting_player_index].name + ")...")
 
   if TEST:
     ui.print_ln(*remainder_deck)
@@ -105,14 +122,20 @@ def do_round(round_number):
   num_passes = 0
   players_finished = 0
   
-  moves = []
+  turns = []
 
   while not round_ended:
     for index in range(len(players)):
       # ui.print_ln("index: " + str(index) + " -- sp_index: " + str(starting_player_index))
+      if round_ended:
+        break
+
       if players[index].finished or (is_first_turn and index != starting_player_index):
         continue        
 
+      recorder = instrumentation.recorder
+      if recorder != None: ui_start_time = time.perf_counter()
+
       ui.print_title("Round " + str(round_number) + " - " + players[index].name + "\'s turn")
       players[index].hand.sort()
 
@@ -139,6 +162,10 @@ def do_round(round_number):
         ui.print_end()
         ui.print_title_input("Move:")
 
+      if recorder != None:
+        turn_start_time = time.perf_counter()
+        recorder.observe('ui', turn_start_time - ui_start_time)
+
       move = None
 
       if not is_first_turn:
@@ -158,9 +185,13 @@ def do_round(round_number):
         prev_move = move
         is_first_turn = False
 
+      if recorder != None:
+        ui_start_time = time.perf_counter()
+        recorder.observe('turn/' + type(players[index]).__name__, ui_start_time - turn_start_time)
+
       next_player = None
 
-      for counter in range(index + 1, index + 5):
+      for counter in range(index + 1, index + len(players)):
         next_index = counter
 
         if next_index >= len(players):
@@ -185,12 +216,16 @@ def do_round(round_number):
 
         ui.print_end_input(prefix + "Proceeding to next player (" + next_player.name + ")")
 
-       
-      moves.append(move)
+      if recorder != None: recorder.observe('ui', time.perf_counter() - ui_start_time)
+
+      turns.append((index, move.mask if move != "*" else 0))
 
   for player in players:
     if len(player.finishing_record) < round_number:
       player.finishing_record.append(num_players)
+
+  finishing_order = sorted(players, key=lambda player: player.finishing_record[-1])
+  game_rounds.append({'round': round_number, 'seating': seating, 'hands': hands, 'trades': trades, 'turns': turns, 'finishing_order': [player.name for player in finishing_order]})
   
   get_finishing_roles()
 
@@ -208,22 +243,12 @@ def do_round(round_number):
 def next_round(round_number):
   '''Proceeds to next round (this may be expanded if time permits)'''
 
-  input("> Press enter to continue to next round...")
+  user_in.wait_for_enter("> Press enter to continue to next round...")
 
 def get_finishing_roles():
   '''Obtains finishing roles after each round according to the order in which each player finished'''
 
-  global players
-
-  players.sort()
-
-  for counter in range(math.ceil(num_players / 2)):
-    if counter >= 2 or (counter == (num_players - 1 - counter)):
-      players[counter].role = players[(counter * -1) - 1].role = Player.FINISHING_ROLES[2]
-      continue
-
-    players[counter].role = Player.FINISHING_ROLES[counter]
-    players[(counter * -1) - 1].role = Player.FINISHING_ROLES[(counter * -1) - 1]
+  engine.assign_roles(players)
 
   # 1 2 president bum [0]
   # 1 2 3 president netural bum [0, 1]
@@ -233,31 +258,34 @@ def get_finishing_roles():
   # 1 2 3 4 5 6 7 p vp n n n vb b [0, 1, 2, 3]
 
 def do_trade():
-  '''Conducts trade between players according to number of players and each of their roles'''
+  '''Conducts trade between players according to number of players and each of their roles, and return the trades made'''
 
   if num_players >= 4:
     ui.print_box("Trade", "Trade will occur between first the president and bum, and then the vice-president and vice-bum.")
   else:
     ui.print_box("Trade", "Trade will now occur between the president and bum.")
 
-  input("> Press enter to continue...")
+  user_in.wait_for_enter("> Press enter to continue...")
 
-  for counter in range(math.ceil(num_players / 2)):
-    if counter >= 2 or (counter == (num_players - 1 - counter)):
-      break
-    
-    president = players[counter]
-    bum = players[(counter * -1) - 1]
+  trades = []
+
+  for counter, (president, bum) in enumerate(engine.trade_pairs(players)):
     ui.print_box("Trade " + str(counter + 1), "This trade is between " + president.name + " (" + president.role + ") and " + bum.name + " (" + bum.role + ")")
-    input("> Press enter for " + president.name + " (" + president.role + ") to select cards to give...")
+    user_in.wait_for_enter("> Press enter for " + president.name + " (" + president.role + ") to select cards to give...")
+
+    president_cards, bum_cards = trade_between(president, bum)
+    trades.append({'president': president.name, 'bum': bum.name, 'given': president_cards, 'received': bum_cards})
 
-    trade_between(president, bum)
+  return trades
 
 def trade_between(president, bum):
-  '''Facilitates the actual trading mechanism between players/AI'''
+  '''Facilitates the actual trading mechanism between players/AI, and return the cards given by each (see engine.trade_between)'''
 
   num_cards = 3 - president.finishing_record[-1]
 
+  recorder = instrumentation.recorder
+  if recorder != None: start_time = time.perf_counter()
+
   if isinstance(president, AI):
     ui.print_title_input(president.name + " (AI) picking " + str(num_cards) + " cards to give")
     president_cards = president.ai_choose_cards(num_cards)
@@ -265,15 +293,24 @@ def trade_between(president, bum):
     ui.print_title_input(president.name + ", pick " + str(num_cards) + " of the following to give:")
     president_cards = president.choose_cards(num_cards)
 
-  bum_cards = bum.hand[(-1 * num_cards):]
+  if recorder != None: recorder.observe('trade_choice/' + type(president).__name__, time.perf_counter() - start_time)
 
-  president.give_cards(bum, *president_cards)
-  bum.give_cards(president, *bum_cards)
+  return engine.trade_between(president, bum, president_cards)
 
 def finish_game():
   '''Finishes the game and return true/false based on whether player wants to play again'''
 
-  input("> Press enter to continue...")
+  global game_summary
+
+  user_in.wait_for_enter("> Press enter to continue...")
+
+  if INSTRUMENT:
+    game_summary = instrumentation.stop().summary()
+    instrumentation.print_summary(game_summary)
+
+  if LOG_PATH != None:
+    with game_log.GameLogWriter(LOG_PATH) as log_writer:
+      log_writer.write({'seed': SEED, 'decks': DECKS, 'players': game_rounds[0]['seating'], 'rounds': game_rounds})
 
   ui.print_box("End of Game", "Thank you for playing President! We hope you enjoyed.")
   ui.print_title_input("Would you like to play again?")
@@ -0,0 +1,276 @@
+'''
+Batch evaluation of many hands at once with NumPy (required by this module only).
+
+Hands are given as an (N, 52) boolean array, with one column per card ordinal (see card_mask), or as
+an array of N bitmasks. Every statistic is computed with array operations on the (N, 13, 4) value by
+suit matrix of the hands, looping only over the fixed values, suits and straight windows of the deck,
+never over hands or moves.
+'''
+
+import numpy as np
+import card_mask
+from card_mask import NUM_VALUES, NUM_SUITS, DECK_SIZE, STRAIGHT_STARTS
+
+NUM_HAND_TYPES = card_mask.STRAIGHT_FLUSH + 1
+
+# Number of ways to choose k cards out of n, for n and k up to 13
+_CHOOSE = np.array([[np.prod(range(n - k + 1, n + 1)) // np.prod(range(1, k + 1)) if k <= n else 0 for k in range(6)] for n in range(14)], dtype=np.int64)
+
+def to_matrix(hands):
+  '''Return hands (an (N, 52) boolean array or an array of N bitmasks) as an (N, 52) boolean array'''
+
+  hands = np.asarray(hands)
+
+  if hands.dtype == bool:
+    if hands.ndim != 2 or hands.shape[1] != DECK_SIZE:
+      raise ValueError("Boolean hands must have shape (N, 52).")
+    return hands
+
+  masks = hands.astype(np.uint64).reshape(-1, 1)
+
+  return ((masks >> np.arange(DECK_SIZE, dtype=np.uint64)) & np.uint64(1)).astype(bool)
+
+def to_masks(matrix):
+  '''Return the bitmasks of the hands in an (N, 52) boolean array, as an array of int64'''
+  return (matrix.astype(np.int64) << np.arange(DECK_SIZE, dtype=np.int64)).sum(axis=1)
+
+def _bit(ordinals):
+  return np.left_shift(np.int64(1), ordinals.astype(np.int64))
+
+def _key(hand_type_index, primary, mask):
+  return (np.int64(hand_type_index) << card_mask.TYPE_SHIFT) | (primary.astype(np.int64) << card_mask.PRIMARY_SHIFT) | mask
+
+def _nth(present, n, from_top = False):
+  '''
+  Return the index of the n-th (1-based) True value along the last axis, counted from the bottom (or top),
+  and whether there are at least n True values
+  '''
+
+  if from_top:
+    index, valid = _nth(present[..., ::-1], n)
+    return present.shape[-1] - 1 - index, valid
+
+  counts = np.cumsum(present, axis=-1)
+
+  return np.argmax((counts == n) & present, axis=-1), counts[..., -1] >= n
+
+def _first(present, n, from_top = False):
+  '''Return a boolean array keeping only the first n True values along the last axis, from the bottom (or top)'''
+
+  if from_top:
+    return _first(present[..., ::-1], n)[..., ::-1]
+
+  return present & (np.cumsum(present, axis=-1) <= n)
+
+def _suit_bits(selected, value_index):
+  '''Return the mask of the suits selected (an (N, 4) boolean array) within the value with the given (N,) indices'''
+
+  ordinals = value_index.reshape(-1, 1) * NUM_SUITS + np.arange(NUM_SUITS)
+  return np.where(selected, _bit(ordinals), 0).sum(axis=1)
+
+def count_moves(cards):
+  '''Return the (N, 11) number of moves of each hand type (see move_gen.move_counts) of hands given as an (N, 13, 4) matrix'''
+
+  value_counts = cards.sum(axis=2)
+  suit_counts = cards.sum(axis=1)
+  counts = np.zeros((cards.shape[0], NUM_HAND_TYPES), dtype=np.int64)
+
+  counts[:, card_mask.ONE_CARD] = value_counts.sum(axis=1)
+
+  for move_size in range(2, 5):
+    counts[:, move_size + 1] = _CHOOSE[value_counts, move_size].sum(axis=1)
+
+  straight_flushes = _straight_flush_windows(cards)
+  counts[:, card_mask.STRAIGHT_FLUSH] = straight_flushes.sum(axis=(1, 2))
+
+  for start in STRAIGHT_STARTS:
+    counts[:, card_mask.STRAIGHT] += value_counts[:, start:start + 5].prod(axis=1)
+
+  counts[:, card_mask.STRAIGHT] -= counts[:, card_mask.STRAIGHT_FLUSH]
+  counts[:, card_mask.FLUSH] = (_CHOOSE[suit_counts, 5] - straight_flushes.sum(axis=1)).sum(axis=1)
+
+  triples = _CHOOSE[value_counts, 3]
+  pairs = _CHOOSE[value_counts, 2]
+  counts[:, card_mask.FULL_HOUSE] = (triples * (pairs.sum(axis=1, keepdims=True) - pairs)).sum(axis=1)
+  counts[:, card_mask.FOUR_OF_A_KIND_PLUS_ONE] = (value_counts == 4).sum(axis=1) * (counts[:, card_mask.ONE_CARD] - 4)
+
+  return counts
+
+def _straight_flush_windows(cards):
+  '''Return an (N, 8, 4) boolean array of the straight flushes, by starting value and suit'''
+
+  windows = np.ones((cards.shape[0], len(STRAIGHT_STARTS), NUM_SUITS), dtype=bool)
+
+  for offset in range(5):
+    windows &= cards[:, offset:offset + len(STRAIGHT_STARTS), :]
+
+  return windows
+
+def _single_keys(flat, highest):
+  ordinal, valid = _nth(flat, 1, highest)
+  return np.where(valid, _key(card_mask.ONE_CARD, ordinal, _bit(ordinal)), 0)
+
+def _n_of_a_kind_keys(cards, move_size, highest):
+  # The highest move takes the top suits of the highest value, the lowest the bottom suits of the lowest value
+  value_index, valid = _nth(cards.sum(axis=2) >= move_size, 1, highest)
+  rows = cards[np.arange(cards.shape[0]), value_index]
+  selected = _first(rows, move_size, highest)
+  primary = value_index * NUM_SUITS + _nth(selected, 1)[0]
+
+  return np.where(valid, _key(move_size + 1, primary, _suit_bits(selected, value_index)), 0)
+
+def _straight_flush_keys(cards, highest):
+  windows = _straight_flush_windows(cards).reshape(cards.shape[0], -1)
+  index, valid = _nth(windows, 1, highest)
+  start = index // NUM_SUITS
+  suit = index % NUM_SUITS
+
+  mask = np.zeros(cards.shape[0], dtype=np.int64)
+  for offset in range(5):
+    mask |= _bit((start + offset) * NUM_SUITS + suit)
+
+  return np.where(valid, _key(card_mask.STRAIGHT_FLUSH, (start + 4) * NUM_SUITS + suit, mask), 0)
+
+def _four_of_a_kind_plus_one_keys(cards, flat, highest):
+  # The highest move takes the highest four of a kind and kicker, the lowest the lowest of both
+  value_index, valid = _nth(cards.sum(axis=2) == 4, 1, highest)
+  others = flat.copy()
+  others[np.arange(flat.shape[0]).reshape(-1, 1), value_index.reshape(-1, 1) * NUM_SUITS + np.arange(NUM_SUITS)] = False
+  kicker, has_kicker = _nth(others, 1, highest)
+  quad = np.int64(0xF) << (value_index.astype(np.int64) * NUM_SUITS)
+
+  return np.where(valid & has_kicker, _key(card_mask.FOUR_OF_A_KIND_PLUS_ONE, value_index * NUM_SUITS + NUM_SUITS - 1, quad | _bit(kicker)), 0)
+
+def _full_house_keys(cards, highest):
+  # The highest (lowest) three of a kind, from the top (bottom) three suits, with the highest (lowest) pair of another value
+  num_rows = cards.shape[0]
+  value_counts = cards.sum(axis=2)
+  triple_index, has_triple = _nth(value_counts >= 3, 1, highest)
+
+  pair_values = value_counts >= 2
+  pair_values[np.arange(num_rows), triple_index] = False
+  pair_index, has_pair = _nth(pair_values, 1, highest)
+
+  triple = _first(cards[np.arange(num_rows), triple_index], 3, highest)
+  pair = _first(cards[np.arange(num_rows), pair_index], 2, highest)
+  primary = triple_index * NUM_SUITS + _nth(triple, 1, True)[0]
+  mask = _suit_bits(triple, triple_index) | _suit_bits(pair, pair_index)
+
+  return np.where(has_triple & has_pair, _key(card_mask.FULL_HOUSE, primary, mask), 0)
+
+def _flush_keys(cards, highest):
+  num_rows = cards.shape[0]
+  best = np.zeros(num_rows, dtype=np.int64)
+
+  for suit in range(NUM_SUITS):
+    present = cards[:, :, suit]
+    chosen = _first(present, 5, highest)
+    count = present.sum(axis=1)
+    low_index = _nth(chosen, 1)[0]
+    is_straight_flush = (count >= 5) & (_nth(chosen, 1, True)[0] - low_index == 4) & (low_index <= STRAIGHT_STARTS[-1])
+
+    # If the five highest (lowest) cards are a straight flush, the next flush replaces the fifth highest with the
+    # sixth highest (the fifth lowest with the sixth lowest), which breaks the run of values
+    if highest:
+      swap_out, swap_in = _nth(present, 5, True)[0], _nth(present, 6, True)[0]
+    else:
+      swap_out, swap_in = _nth(present, 5)[0], _nth(present, 6)[0]
+
+    chosen[np.arange(num_rows), swap_out] &= ~is_straight_flush
+    chosen[np.arange(num_rows), swap_in] |= is_straight_flush & (count >= 6)
+
+    valid = (count >= 5) & (~is_straight_flush | (count >= 6))
+    top_index = _nth(chosen, 1, True)[0]
+    ordinals = np.arange(NUM_VALUES) * NUM_SUITS + suit
+    mask = np.where(chosen, _bit(ordinals), 0).sum(axis=1)
+    key = np.where(valid, _key(card_mask.FLUSH, top_index * NUM_SUITS + suit, mask), 0)
+
+    if highest:
+      best = np.maximum(best, key)
+    else:
+      best = np.where((best == 0) | ((key != 0) & (key < best)), key, best)
+
+  return best
+
+def _straight_keys(cards, highest):
+  num_rows = cards.shape[0]
+  best = np.zeros(num_rows, dtype=np.int64)
+  rows = np.arange(num_rows)
+
+  for start in (reversed(STRAIGHT_STARTS) if highest else STRAIGHT_STARTS):
+    window = cards[:, start:start + 5, :]
+    value_counts = window.sum(axis=2)
+
+    # Top (bottom) suit of every value; all five share a suit exactly when they form a straight flush
+    suits = _nth(window, 1, highest)[0]
+    is_straight_flush = (suits == suits[:, :1]).all(axis=1)
+
+    # The next straight down (up) changes the suit of the lowest of the four lower values that has a second card,
+    # or failing that, the suit of the top value
+    second_suits, has_second = _nth(window, 2, highest)
+    changeable = has_second[:, :4]
+    change_index = np.where(changeable.any(axis=1), np.argmax(changeable, axis=1), 4)
+    can_change = has_second[rows, change_index]
+
+    changed_suits = suits.copy()
+    changed_suits[rows, change_index] = np.where(is_straight_flush, second_suits[rows, change_index], suits[rows, change_index])
+
+    valid = (value_counts > 0).all(axis=1) & (~is_straight_flush | can_change)
+    ordinals = (start + np.arange(5)) * NUM_SUITS + changed_suits
+    mask = _bit(ordinals).sum(axis=1)
+    key = np.where(valid, _key(card_mask.STRAIGHT, ordinals[:, 4], mask), 0)
+
+    best = np.where(best == 0, key, best)
+
+  return best
+
+def evaluate(hands):
+  '''
+  Return the move statistics of many hands at once, as a dictionary of arrays:
+  'counts' -- (N, 11) number of moves of each hand type (index = hand type index, see Move.HAND_TYPES)
+  'available' -- (N, 11) whether each hand can form each hand type
+  'lowest', 'highest' -- (N, 11) strength key (see card_mask.strength_key) of the lowest/highest move of each hand type, or 0 if there is none
+  'lowest_by_size', 'highest_by_size' -- (N, 6) the same for each number of cards (index 0 is unused)
+  '''
+
+  flat = to_matrix(hands)
+  cards = flat.reshape(-1, NUM_VALUES, NUM_SUITS)
+  num_rows = cards.shape[0]
+
+  counts = count_moves(cards)
+  extremes = {}
+
+  for name, highest in [('lowest', False), ('highest', True)]:
+    keys = np.zeros((num_rows, NUM_HAND_TYPES), dtype=np.int64)
+
+    keys[:, card_mask.ONE_CARD] = _single_keys(flat, highest)
+    for move_size in range(2, 5):
+      keys[:, move_size + 1] = _n_of_a_kind_keys(cards, move_size, highest)
+    keys[:, card_mask.STRAIGHT] = _straight_keys(cards, highest)
+    keys[:, card_mask.FLUSH] = _flush_keys(cards, highest)
+    keys[:, card_mask.FULL_HOUSE] = _full_house_keys(cards, highest)
+    keys[:, card_mask.FOUR_OF_A_KIND_PLUS_ONE] = _four_of_a_kind_plus_one_keys(cards, flat, highest)
+    keys[:, card_mask.STRAIGHT_FLUSH] = _straight_flush_keys(cards, highest)
+
+    by_size = np.zeros((num_rows, 6), dtype=np.int64)
+
+    for hand_type_index in range(card_mask.ONE_CARD, NUM_HAND_TYPES):
+      move_size = card_mask.MOVE_SIZES[hand_type_index]
+      type_keys = keys[:, hand_type_index]
+
+      if highest:
+        by_size[:, move_size] = np.maximum(by_size[:, move_size], type_keys)
+      else:
+        by_size[:, move_size] = np.where((by_size[:, move_size] == 0) | ((type_keys != 0) & (type_keys < by_size[:, move_size])), type_keys, by_size[:, move_size])
+
+    extremes[name] = keys
+    extremes[name + '_by_size'] = by_size
+
+  return {
+    'counts': counts,
+    'available': counts > 0,
+    'lowest': extremes['lowest'],
+    'highest': extremes['highest'],
+    'lowest_by_size': extremes['lowest_by_size'],
+    'highest_by_size': extremes['highest_by_size']
+  }
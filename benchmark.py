@@ -0,0 +1,618 @@
+'''
+Benchmark suite for the move engine, the AI and headless games (see engine), with fixed seeds.
+People (see Person) are benchmarked too, with their input answered by a callback (see user_input) and no output.
+
+Every benchmark times a fixed workload, and reports the best and median time per operation over
+several repeats, along with the memory it allocates (measured with tracemalloc in a separate run).
+The cache of valid moves is cleared before every run, so timings are those of move generation.
+
+Before timing anything, the move engine is checked against a reference that enumerates every
+combination of cards in a hand, so an optimization is only accepted if the moves it returns are
+exactly the same, in the same order. Results can be saved as JSON and compared with a later run.
+
+Usage: python benchmark.py --json before.json
+       python benchmark.py --only get_valid_moves --compare before.json
+'''
+
+import argparse
+import itertools
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+import card
+import card_tools as ct
+import dealing
+import multi_deck
+import user_input as user_in
+import user_interface as ui
+from ai import AI
+from engine import Game
+from person import Person
+
+HAND_SIZES = [5, 8, 13, 17, 20, 26]
+OPTIONS = ['default', 'highest', 'lowest']
+NUM_PLAYERS = range(3, 9)
+MULTI_DECK_HANDS = [(2, 26), (4, 50)]   # (decks, hand size) of the multi-deck move generation benchmarks
+
+def random_hands(seed, hand_size, count, decks = 1):
+  '''Return count sorted hands of hand_size cards, dealt from a full deck (or decks decks, see multi_deck) shuffled with the given seed'''
+
+  rng = random.Random(seed)
+  deck = ct.full_deck(decks)
+  hands = []
+
+  for counter in range(count):
+    hand = type(deck)(rng.sample(deck, hand_size))
+    hand.sort()
+    hands.append(hand)
+
+  return hands
+
+def reset_caches():
+  '''Empty the caches of the move engine, so that a run does not reuse the moves found by the previous one'''
+  card.valid_moves_cache.clear()
+  card.valid_move_list_cache.clear()
+  multi_deck.valid_move_list_cache.clear()
+
+# Reference implementation
+
+def reference_hand_type(cards):
+  '''
+  Return the hand type index (see Move.HAND_TYPES) of a sorted list of cards, worked out from their values and suits
+  the way the rules describe it, independently of card_mask.classify (and so of Move)
+
+  Cards may repeat (see multi_deck), in which case five cards forming more than one hand type take the highest.
+  '''
+
+  if len(cards) == 0: return 0
+
+  if len(cards) <= 4:
+    if all(card.value == cards[0].value for card in cards):
+      return len(cards) + 1   # One card/pair/three/four
+
+    return 1
+
+  if len(cards) > 5: return 1
+
+  values = [card.value for card in cards]
+  repeat_value_counter = sorted(values.count(value) for value in set(values))
+  is_flush = all(card.suit == cards[0].suit for card in cards)
+  is_straight = cards[0].value <= 10 and all(values[index] == values[index - 1] + 1 for index in range(1, 5))
+
+  if is_straight:
+    return 10 if is_flush else 6
+  elif repeat_value_counter == [1, 4]:
+    return 9
+  elif repeat_value_counter == [2, 3]:
+    return 8
+  elif is_flush:
+    return 7
+
+  return 1
+
+def reference_strength(cards):
+  '''
+  Return a tuple that orders moves by strength the way the rules describe it, independently of the strength keys of Move:
+  hand type (see reference_hand_type), then the card that decides between two moves of that type, then the cards from the highest down
+
+  Cards rank by value, then suit. The deciding card is the lowest of a one card to four of a kind, the highest of the three
+  or four of a kind in a full house or four of a kind plus one, and the highest card of a straight, flush or straight flush.
+  '''
+
+  hand_type = card.Move.HAND_TYPES[reference_hand_type(sorted(cards))]
+  ranks = sorted(((card.value, card.suit['value']) for card in cards), reverse=True)
+
+  if hand_type in ('full_house', 'four_of_a_kind_plus_one'):
+    values = [value for value, suit in ranks]
+    deciding_rank = max(rank for rank in ranks if values.count(rank[0]) >= 3)
+  elif hand_type in ('straight', 'flush', 'straight_flush'):
+    deciding_rank = ranks[0]
+  else:
+    deciding_rank = ranks[-1]
+
+  return (card.Move.HAND_TYPES.index(hand_type), deciding_rank, ranks)
+
+def reference_moves(hand, move_class = card.Move):
+  '''
+  Return every move of a hand as (strength, move) pairs (see reference_strength), by trying every combination of one to five of its cards
+
+  move_class -- class of the moves of the hand (multi_deck.MultiDeckMove for hands dealt from several decks)
+  '''
+
+  moves = []
+  seen_masks = set()
+
+  for move_size in range(1, 6):
+    for combo in itertools.combinations(sorted(hand), move_size):
+      if reference_hand_type(combo) > card.Move.HAND_TYPES.index('scattered'):
+        move = move_class(combo)
+
+        # With several decks, the same move can be made from different copies of its cards
+        if move.mask in seen_masks: continue
+
+        seen_masks.add(move.mask)
+        moves.append((reference_strength(combo), move))
+
+  return moves
+
+def reference_valid_moves(hand, previous_move = "*", lowest_card = None, option = 'default', move_class = card.Move, moves = None):
+  '''
+  Return the valid moves of a hand (see Hand.get_valid_moves) by trying every combination of one to five of its cards,
+  and ordering them with reference_strength
+
+  This is far too slow for play, but follows the rules directly, which makes it the reference for the move engine.
+  move_class -- class of the moves of the hand (multi_deck.MultiDeckMove for hands dealt from several decks)
+  moves -- the moves of the hand, if already worked out by reference_moves (which is the slow part)
+  '''
+
+  if moves == None: moves = reference_moves(hand, move_class)
+
+  if isinstance(previous_move, card.Move):
+    previous_strength = reference_strength(list(previous_move))
+    moves = [(strength, move) for strength, move in moves if move.size() == previous_move.size()]
+  else:
+    previous_strength = None
+
+  if lowest_card != None:
+    moves = [(strength, move) for strength, move in moves if lowest_card in move]
+    option = 'default'
+
+  # The highest or lowest move of each hand type is picked before comparing with the previous move
+  if option != 'default':
+    best_moves = {}
+
+    for strength, move in moves:
+      best_move = best_moves.get(strength[0])
+
+      if best_move == None or (option == 'highest' and strength > best_move[0]) or (option == 'lowest' and strength < best_move[0]):
+        best_moves[strength[0]] = (strength, move)
+
+    moves = list(best_moves.values())
+
+  if previous_strength != None:
+    return [move for strength, move in sorted((entry for entry in moves if entry[0] > previous_strength), key=lambda entry: entry[0])]
+
+  return [move for strength, move in sorted(moves, key=lambda entry: (-entry[0][0], entry[0]))]
+
+# Hand sizes checked against the reference, from a single card to the largest hands dealt (see HAND_SIZES)
+EQUIVALENCE_HAND_SIZES = [1, 2, 3, 4, 5, 6, 8, 10, 13, 17, 20, 26]
+
+def equivalence_hand_count(hand_size, num_hands):
+  '''Return the number of hands of hand_size cards to check, fewer above 13 cards, whose every combination takes the reference long to try'''
+  return num_hands if hand_size <= 13 else max(num_hands // 4, 1)
+
+def check_equivalence(seed, num_hands = 20):
+  '''
+  Compare the moves returned by Hand.get_valid_moves and Hand.get_move_list, with and without a move catalogue
+  (see Hand.track_moves), with those of reference_valid_moves, and return the number of queries made and a description of each mismatch.
+  Hands dealt from several decks (see multi_deck) are checked the same way, with half as many hands.
+  '''
+
+  rng = random.Random(seed)
+  mismatches = []
+  num_queries = 0
+
+  # A pool of previous moves of every size, taken from the moves of other hands
+  previous_moves = [move for hand in random_hands(seed + 1, 13, 5) for move in card.valid_moves(hand.to_mask(), option='lowest')]
+
+  for hand_size in EQUIVALENCE_HAND_SIZES:
+    for hand in random_hands(seed + hand_size, hand_size, equivalence_hand_count(hand_size, num_hands)):
+      moves = reference_moves(hand)
+      queries = [("*", None, option) for option in OPTIONS]
+      queries.append(("*", hand[0], 'default'))
+      queries += [(previous_move, None, option) for previous_move in rng.sample(previous_moves, 5) for option in OPTIONS]
+
+      tracked_hand = card.Hand(hand)
+      tracked_hand.track_moves()
+
+      for previous_move, lowest_card, option in queries:
+        expected = [move.mask for move in reference_valid_moves(hand, previous_move, lowest_card, option, moves=moves)]
+        num_queries += 1
+
+        reset_caches()
+
+        for engine_hand in (hand, tracked_hand):
+          actual = [move.mask for move in engine_hand.get_valid_moves(previous_move, lowest_card, option)]
+          actual_list = engine_hand.get_move_list(previous_move, lowest_card, option)
+
+          if actual != expected or list(actual_list.masks) != expected or [move.mask for move in actual_list] != expected:
+            mismatches.append(str(hand) + " previous " + str(previous_move) + ", lowest " + str(lowest_card) + ", option " + option)
+
+  for decks in range(2, multi_deck.MAX_DECKS + 1):
+    previous_moves = [move for hand in random_hands(seed + 1, 13, 5, decks) for move in hand.get_valid_moves(option='lowest')]
+
+    for hand_size in EQUIVALENCE_HAND_SIZES:
+      for hand in random_hands(seed + hand_size, hand_size, equivalence_hand_count(hand_size, num_hands // 2), decks):
+        moves = reference_moves(hand, multi_deck.MultiDeckMove)
+        queries = [("*", None, option) for option in OPTIONS]
+        queries.append(("*", hand[0], 'default'))
+        queries += [(previous_move, None, option) for previous_move in rng.sample(previous_moves, 5) for option in OPTIONS]
+
+        for previous_move, lowest_card, option in queries:
+          expected = [move.mask for move in reference_valid_moves(hand, previous_move, lowest_card, option, multi_deck.MultiDeckMove, moves)]
+          num_queries += 1
+
+          reset_caches()
+
+          actual = [move.mask for move in hand.get_valid_moves(previous_move, lowest_card, option)]
+          actual_list = hand.get_move_list(previous_move, lowest_card, option)
+
+          if actual != expected or list(actual_list.masks) != expected or [move.mask for move in actual_list] != expected:
+            mismatches.append(str(decks) + " decks: " + str(hand) + " previous " + str(previous_move) + ", lowest " + str(lowest_card) + ", option " + option)
+
+  return num_queries, mismatches
+
+# Workloads: each returns the function to time, and the number of operations it performs
+
+def get_valid_moves_workload(seed, hand_size, option, count = 50):
+  hands = random_hands(seed, hand_size, count)
+
+  def run():
+    for hand in hands:
+      hand.get_valid_moves(option=option)
+
+  return run, count
+
+def following_moves_workload(seed, hand_size, count = 50):
+  '''Valid moves after a previous move of each size'''
+
+  hands = random_hands(seed, hand_size, count)
+  previous_moves = [move for hand in random_hands(seed + 1, 13, 2) for move in card.valid_moves(hand.to_mask(), option='lowest')]
+
+  def run():
+    for hand in hands:
+      for previous_move in previous_moves:
+        hand.get_valid_moves(previous_move)
+
+  return run, count * len(previous_moves)
+
+def move_list_workload(seed, hand_size, count = 50):
+  '''Valid moves as a MoveList, sliced by size and filtered against a previous move the way players use them'''
+
+  hands = random_hands(seed, hand_size, count)
+  previous_moves = [move for hand in random_hands(seed + 1, 13, 2) for move in card.valid_moves(hand.to_mask(), option='lowest')]
+
+  def run():
+    for hand in hands:
+      moves = hand.get_move_list()
+
+      for previous_move in previous_moves:
+        moves.above(previous_move)
+
+  return run, count
+
+def sample_moves(seed, count):
+  '''Return count moves sampled from the valid moves of random 13-card hands'''
+
+  rng = random.Random(seed)
+  moves = [move for hand in random_hands(seed, 13, 10) for move in card.valid_moves(hand.to_mask())]
+
+  return [rng.choice(moves) for counter in range(count)]
+
+def move_construction_workload(seed, count = 2000):
+  card_lists = [list(move) for move in sample_moves(seed, count)]
+
+  def run():
+    for cards in card_lists:
+      card.Move(cards)
+
+  return run, count
+
+def move_comparison_workload(seed, count = 2000):
+  moves = sample_moves(seed, count * 2)
+  pairs = [(moves[index], moves[index + count]) for index in range(count)]
+  pairs = [(move1, move2) for move1, move2 in pairs if move1.size() == move2.size()]
+
+  def run():
+    for move1, move2 in pairs:
+      move1 > move2
+      move1 == move2
+      move1 < move2
+
+  return run, len(pairs) * 3
+
+def sorted_by_hand_type_workload(seed, count = 20):
+  rng = random.Random(seed)
+  move_lists = []
+
+  for hand in random_hands(seed, 13, count):
+    moves = card.valid_moves(hand.to_mask())
+    rng.shuffle(moves)
+    move_lists.append(moves)
+
+  def run():
+    for moves in move_lists:
+      card.sorted_by_hand_type(moves)
+
+  return run, count
+
+def subtract_workload(seed, count = 50):
+  hands = random_hands(seed, 13, count)
+  pairs = [(hand, move) for hand in hands for move in card.valid_moves(hand.to_mask(), option='highest')]
+
+  def run():
+    for hand, move in pairs:
+      hand.subtract(move, False)
+
+  return run, len(pairs)
+
+def choose_cards_workload(seed, number_of_cards, count = 50):
+  '''AI.ai_choose_cards without its output, which waits on purpose (see user_interface.print_end_input)'''
+
+  players = []
+
+  for hand in random_hands(seed, 13, count):
+    player = AI("AI")
+    player.hand = hand
+    players.append(player)
+
+  def run():
+    for player in players:
+      player.choose_trade_cards(number_of_cards)
+
+  return run, count
+
+def ai_move_workload(seed, hand_size, following, count = 50):
+  '''AI.ai_move on fresh hands, leading a trick or following the lowest single card of another hand'''
+
+  hands = random_hands(seed, hand_size, count)
+  previous_move = card.valid_moves(random_hands(seed + 1, 13, 1)[0].to_mask(), option='lowest')[-1] if following else "*"
+  player = AI("AI")
+
+  def run():
+    for hand in hands:
+      player.hand = card.Hand(hand)
+      player.ai_move(previous_move)
+
+  return run, count
+
+def minimum_moves_workload(seed, hand_size, count = 10):
+  '''card_tools.minimum_moves_to_victory on fresh hands, each solved from scratch'''
+
+  hand_masks = [hand.to_mask() for hand in random_hands(seed, hand_size, count)]
+
+  def run():
+    for hand_mask in hand_masks:
+      ct.minimum_moves_to_victory(hand_mask)
+
+  return run, count
+
+def multi_deck_moves_workload(seed, hand_size, decks, following, count = 10):
+  '''Valid moves of hands dealt from several decks (see multi_deck) as MoveLists, the way players get them, leading or after a previous move of each size'''
+
+  hands = random_hands(seed, hand_size, count, decks)
+  previous_moves = [move for hand in random_hands(seed + 1, 13, 2, decks) for move in hand.get_valid_moves(option='lowest')] if following else ["*"]
+
+  def run():
+    for hand in hands:
+      for previous_move in previous_moves:
+        hand.get_move_list(previous_move)
+
+  return run, count * len(previous_moves)
+
+def deal_workload(seed, num_players, batch, count = 1000, decks = 1):
+  '''Deals of count games, one at a time or as a batch (see dealing)'''
+
+  def run():
+    rng = dealing.stream(seed)
+
+    if batch:
+      dealing.deal_batch(rng, num_players, count, decks)
+    else:
+      for counter in range(count):
+        dealing.deal(rng, num_players, decks)
+
+  return run, count
+
+def game_workload(seed, num_players, count = 5, decks = None):
+  '''Full headless games between AI players'''
+
+  def run():
+    for game_index in range(count):
+      Game([AI("AI " + str(counter + 1)) for counter in range(num_players)], seed=seed + game_index, decks=decks).play()
+
+  return run, count
+
+def first_choice(input_str, player):
+  '''Answer every prompt of a Person with their first choice, or the next card of their hand when picking cards'''
+
+  if input_str.startswith(user_in.CARD_PROMPT):
+    return input_str[len(user_in.CARD_PROMPT):].split(":")[0]
+
+  return 1
+
+def unattended(run):
+  '''Return a function that runs run with input answered by first_choice and no output, as nobody is watching'''
+
+  def run_unattended():
+    old_provider = user_in.set_provider(user_in.CallbackInput(first_choice))
+    old_renderer = ui.set_renderer(ui.NullRenderer())
+
+    try:
+      run()
+    finally:
+      user_in.set_provider(old_provider)
+      ui.set_renderer(old_renderer)
+
+  return run_unattended
+
+def person_move_workload(seed, hand_size, count = 50):
+  '''Person.choose_move on fresh hands, leading a trick'''
+
+  hands = random_hands(seed, hand_size, count)
+  player = Person("Person")
+
+  def run():
+    for hand in hands:
+      player.hand = card.Hand(hand)
+      player.do_move()
+
+  return unattended(run), count
+
+def person_choose_cards_workload(seed, number_of_cards, count = 50):
+  hands = random_hands(seed, 13, count)
+  player = Person("Person")
+
+  def run():
+    for hand in hands:
+      player.hand = hand
+      player.choose_trade_cards(number_of_cards)
+
+  return unattended(run), count
+
+def person_game_workload(seed, num_players, count = 5):
+  '''Full headless games between people and AI players, half of each'''
+
+  def run():
+    for game_index in range(count):
+      players = [(Person if counter % 2 == 0 else AI)("Player " + str(counter + 1)) for counter in range(num_players)]
+      Game(players, seed=seed + game_index).play()
+
+  return unattended(run), count
+
+def benchmarks(seed):
+  '''Yield (name, function building the workload) for every benchmark'''
+
+  for option in OPTIONS:
+    for hand_size in HAND_SIZES:
+      yield "get_valid_moves/" + option + "/" + str(hand_size), lambda option=option, hand_size=hand_size: get_valid_moves_workload(seed, hand_size, option)
+
+  for hand_size in HAND_SIZES:
+    yield "get_valid_moves/previous/" + str(hand_size), lambda hand_size=hand_size: following_moves_workload(seed, hand_size)
+
+  for hand_size in [13, 26]:
+    yield "move_list/" + str(hand_size), lambda hand_size=hand_size: move_list_workload(seed, hand_size)
+
+  yield "move/construct", lambda: move_construction_workload(seed)
+  yield "move/compare", lambda: move_comparison_workload(seed)
+  yield "sorted_by_hand_type", lambda: sorted_by_hand_type_workload(seed)
+  yield "hand/subtract", lambda: subtract_workload(seed)
+
+  for number_of_cards in [1, 2]:
+    yield "ai/choose_cards/" + str(number_of_cards), lambda number_of_cards=number_of_cards: choose_cards_workload(seed, number_of_cards)
+
+  for hand_size in [13, 17]:
+    yield "ai/move/lead/" + str(hand_size), lambda hand_size=hand_size: ai_move_workload(seed, hand_size, False)
+    yield "ai/move/follow/" + str(hand_size), lambda hand_size=hand_size: ai_move_workload(seed, hand_size, True)
+
+  for hand_size in [13, 26]:
+    yield "card_tools/minimum_moves/" + str(hand_size), lambda hand_size=hand_size: minimum_moves_workload(seed, hand_size)
+
+  for num_players in [4, 7]:
+    yield "deal/" + str(num_players) + "p", lambda num_players=num_players: deal_workload(seed, num_players, False)
+    yield "deal/batch/" + str(num_players) + "p", lambda num_players=num_players: deal_workload(seed, num_players, True)
+
+  for num_players in NUM_PLAYERS:
+    yield "game/" + str(num_players) + "p", lambda num_players=num_players: game_workload(seed, num_players)
+
+  for decks, hand_size in MULTI_DECK_HANDS:
+    yield "multi_deck/moves/" + str(decks) + "d/" + str(hand_size), lambda decks=decks, hand_size=hand_size: multi_deck_moves_workload(seed, hand_size, decks, False)
+    yield "multi_deck/moves/previous/" + str(decks) + "d/" + str(hand_size), lambda decks=decks, hand_size=hand_size: multi_deck_moves_workload(seed, hand_size, decks, True)
+
+  yield "deal/batch/16p/2d", lambda: deal_workload(seed, 16, True, decks=2)
+  yield "game/16p/2d", lambda: game_workload(seed, 16, count=1, decks=2)
+
+  yield "person/move/lead/13", lambda: person_move_workload(seed, 13)
+
+  for number_of_cards in [1, 2]:
+    yield "person/choose_cards/" + str(number_of_cards), lambda number_of_cards=number_of_cards: person_choose_cards_workload(seed, number_of_cards)
+
+  yield "game/person/4p", lambda: person_game_workload(seed, 4)
+
+# Measurement
+
+def measure(workload, num_operations, repeat = 5):
+  '''Return the timings (in microseconds per operation) and allocations (in KiB) of a workload'''
+
+  times = []
+
+  for counter in range(repeat):
+    reset_caches()
+    start = time.perf_counter()
+    workload()
+    times.append(time.perf_counter() - start)
+
+  reset_caches()
+  tracemalloc.start()
+  workload()
+  retained, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+
+  return {
+    'operations': num_operations,
+    'best_us': min(times) / num_operations * 1e6,
+    'median_us': statistics.median(times) / num_operations * 1e6,
+    'peak_kib': peak / 1024,
+    'retained_kib': retained / 1024
+  }
+
+def run_benchmarks(seed = 0, repeat = 5, only = None):
+  '''Run every benchmark whose name contains only (all of them by default), printing and returning their results by name'''
+
+  results = {}
+
+  for name, build in benchmarks(seed):
+    if only != None and only not in name: continue
+
+    workload, num_operations = build()
+    results[name] = measure(workload, num_operations, repeat)
+    print_result(name, results[name])
+
+  return results
+
+def print_result(name, result, baseline = None):
+  '''Output the result of a benchmark as a line of the results table'''
+
+  line = name.ljust(32) + "%12.1f us %12.1f us %10.1f KiB" % (result['best_us'], result['median_us'], result['peak_kib'])
+
+  if baseline != None:
+    line += "   x%.2f" % (baseline['best_us'] / result['best_us'])
+
+  print(line)
+
+def print_comparison(results, baseline_results):
+  '''Output the speed-up of every benchmark over a baseline run (above 1 is faster)'''
+
+  print()
+  print("Compared with baseline (best time, above x1.00 is faster):")
+
+  for name, result in results.items():
+    if name in baseline_results:
+      print_result(name, result, baseline_results[name])
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Benchmark the move engine, the AI and headless games.")
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--repeat', type=int, default=5, help="number of timed runs of each workload")
+  parser.add_argument('--only', default=None, help="only run the benchmarks whose name contains this")
+  parser.add_argument('--check-hands', type=int, default=20, help="number of hands of each size in the reference check")
+  parser.add_argument('--skip-check', action='store_true', help="do not check the move engine against the reference")
+  parser.add_argument('--json', default=None, help="save the results to this file")
+  parser.add_argument('--compare', default=None, help="compare the results with those saved in this file")
+  args = parser.parse_args()
+
+  if not args.skip_check:
+    num_queries, mismatches = check_equivalence(args.seed, args.check_hands)
+
+    for mismatch in mismatches:
+      print("Mismatch:", mismatch)
+
+    print("Reference check:", num_queries, "queries,", len(mismatches), "mismatches")
+    print()
+
+    if mismatches:
+      sys.exit(1)
+
+  print("Benchmark".ljust(32) + "best / op".rjust(15) + "median / op".rjust(15) + "peak".rjust(14))
+  results = run_benchmarks(args.seed, args.repeat, args.only)
+
+  if args.json != None:
+    with open(args.json, 'w') as file:
+      json.dump({'seed': args.seed, 'results': results}, file, indent=2)
+
+  if args.compare != None:
+    with open(args.compare) as file:
+      print_comparison(results, json.load(file)['results'])
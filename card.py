@@ -1,14 +1,25 @@
 import itertools
 import functools
+import card_mask
+import move_gen
+import move_list
+import ranking
+from move_cache import MoveCache
+from move_catalogue import MoveCatalogue
 
 @functools.total_ordering
 class Card:
   '''
   Creates card objects that can be displayed and compared based on their:
-  - Value <number_value> (1 to 13, where 1 = A, 11 = J, 12 = Q, 13 = K)
+  - Value <number_value> (1 to 13, where 1 = A, 11 = J, 12 = Q, 13 = K, or 14 = A and 15 = 2 as ranked)
   - Suit <suit_value> (0 = Diamond, 1 = Club, 2 = Heart, 3 = Spade)
+
+  There is only one object for each of the 52 cards (see CARDS), which Card(number_value, suit_value) returns,
+  so cards never change, and are equal only to themselves.
   '''
 
+  __slots__ = ('value', 'suit', 'display_value', 'ordinal', 'bit', '_str')
+
   # Colour constants
   RED = '\033[31;47m'
   BLACK = '\033[30;47m'
@@ -20,66 +31,92 @@ class Card:
   SPADE = {'value': 3, 'symbol': '\u2660', 'colour': BLACK}
   SUITS = [DIAMOND, CLUB, HEART, SPADE]
 
-  def set_display_value(self, number_value):
-    '''Set the display value of the card.'''
-    if number_value == 1:
-      self.display_value = 'A'
-    elif number_value == 11:
-      self.display_value = 'J'
-    elif number_value == 12:
-      self.display_value = 'Q'
-    elif number_value == 13:
-      self.display_value = 'K'
-    else:
-      self.display_value = number_value
+  # Display values of the cards that are not shown by their value
+  DISPLAY_VALUES = {11: 'J', 12: 'Q', 13: 'K', 14: 'A', 15: 2}
+
+  def __new__(cls, number_value, suit_value):
+    if not (1 <= number_value <= 15 and 0 <= suit_value < len(Card.SUITS)):
+      raise ValueError("There is no card of value " + str(number_value) + " and suit " + str(suit_value) + ".")
+
+    # Aces and twos rank above kings
+    value = number_value + 13 if number_value <= 2 else number_value
+
+    return CARDS[card_mask.ordinal(value, suit_value)]
+
+  @classmethod
+  def _create(cls, value, suit_value):
+    '''Return a new card of the given value (3 to 15) and suit, which should only be done once for each card (see CARDS)'''
+
+    card = object.__new__(cls)
+    suit = Card.SUITS[suit_value]
+    display_value = Card.DISPLAY_VALUES.get(value, value)
+    card_ordinal = card_mask.ordinal(value, suit_value)
+
+    for name, attribute in [('value', value), ('suit', suit), ('display_value', display_value), ('ordinal', card_ordinal), ('bit', 1 << card_ordinal),
+                            ('_str', suit['colour'] + str(display_value) + suit['symbol'] + '\033[m')]:
+      object.__setattr__(card, name, attribute)
+
+    return card
 
-  def set_value(self, number_value):
-    '''Set the value of the card.'''
-    if number_value == 1 or number_value == 2:
-      self.value = number_value + 13
-    else:
-      self.value = number_value
-  
   def get_next(self):
     '''Return the following card, in order of ranking.'''
-    if self.suit['value'] == 3:
-      if self.value == 15:
-        return None
-      else:
-        return Card(self.value + 1, 0)
+    if self.ordinal == card_mask.DECK_SIZE - 1:
+      return None
     else:
-      return Card(self.value, self.suit['value'] + 1)
+      return CARDS[self.ordinal + 1]
 
   def to_hashable(self):
     '''Returns a hashable (string) representation of the card'''
     return "C#" + str(self.value) + "#" + str(self.suit['value'])
 
-  def __init__(self, number_value, suit_value):
-    self.suit = Card.SUITS[suit_value]
-    self.set_display_value(number_value)
-    self.set_value(number_value)
-  
+  def __reduce__(self):
+    return (Card, (self.value, self.suit['value']))
+
+  def __setattr__(self, name, value):
+    raise AttributeError("Cards cannot be changed, as every card is shared.")
+
   def __str__(self):
-    return self.suit['colour'] + str(self.display_value) + self.suit['symbol'] + '\033[m'
+    return self._str
+
+  def __hash__(self):
+    return self.ordinal
 
   def __eq__(self, other):
-    if not isinstance(other, Card): return False
-    return self.value == other.value and self.suit['value'] == other.suit['value']
-  
+    return self is other
+
   def __lt__(self, other):
-    if not isinstance(other, Card): raise TypeError("Cannot compare card with non-card object.")
-    return self.value < other.value or (self.value == other.value and self.suit['value'] < other.suit['value'])
+    try:
+      return self.ordinal < other.ordinal
+    except AttributeError:
+      raise TypeError("Cannot compare card with non-card object.") from None
+
+  def __gt__(self, other):
+    try:
+      return self.ordinal > other.ordinal
+    except AttributeError:
+      raise TypeError("Cannot compare card with non-card object.") from None
+
+# Every card in the deck, indexed by ordinal (see card_mask)
+CARDS = [Card._create(card_mask.value_of(card_ordinal), card_mask.suit_of(card_ordinal)) for card_ordinal in range(card_mask.DECK_SIZE)]
 
 class BlankCard(Card):
-  '''Special card object used specifically to display the reverse side of cards.'''
+  '''Special card object used specifically to display the reverse side of cards (there is only one, see BLANK_CARD).'''
+
+  __slots__ = ()
 
   BLUE = '\033[37;44m'
 
-  def __init__(self):
-    self.display_value = BlankCard.BLUE + "[]" + '\033[m'
+  __hash__ = object.__hash__
 
-  def __str__(self):
-    return self.display_value
+  def __new__(cls):
+    return BLANK_CARD
+
+  def __reduce__(self):
+    return (BlankCard, ())
+
+BLANK_CARD = object.__new__(BlankCard)
+object.__setattr__(BLANK_CARD, 'display_value', BlankCard.BLUE + "[]" + '\033[m')
+object.__setattr__(BLANK_CARD, '_str', BLANK_CARD.display_value)
 
 @functools.total_ordering
 class Hand(list):
@@ -88,6 +125,9 @@ class Hand(list):
   If no argument is given, the constructor creates a new empty hand. The argument must consist of cards and be iterable if specified.
   '''
 
+  # Live catalogue of the hand's moves, in incremental mode (see track_moves)
+  catalogue = None
+
   def get_valid_moves(self, previous_move = "*", lowest_card = None, option = 'default'):
     '''
     Return all valid moves of a hand as an array of moves.
@@ -104,154 +144,73 @@ class Hand(list):
 
     self.sort()
 
-    has_previous_move = isinstance(previous_move, Move)
-    first_move = (lowest_card != None)
-
-    if first_move: option = 'default'
-
-    if has_previous_move and self.size() < previous_move.size():
-      return []
-    elif has_previous_move and self.size() == previous_move.size():
-      return self.__get_same_sized_move(previous_move)
-
-    all_valid_moves = []
-    self_value_frequencies = self.__value_frequencies()
-    
-    get_moves = {
-      self.__get_one_cards: {'range': 1, 'args': [all_valid_moves, option]},
-      self.__get_two_to_four_cards: {'range': [2, 4], 'args': [all_valid_moves, option, self_value_frequencies, has_previous_move, previous_move]},
-      self.__get_five_cards: {'range': 5, 'args': [all_valid_moves, option]}
-    }
-
-    for func in get_moves:
-      within_range = True
-      
-      if has_previous_move:
-        if isinstance(get_moves[func]['range'], list):
-          within_range = get_moves[func]['range'][0] <= previous_move.size() <= get_moves[func]['range'][1]
-        else:
-          within_range = (previous_move.size() == get_moves[func]['range'])
-        
-        if not within_range:
-          continue
-
-      func(*get_moves[func]['args'])
-
-      if has_previous_move:
-        return self.__get_moves_with_previous(all_valid_moves, previous_move)
-
-    return_moves = []
-
-    if first_move:
-      for move_counter in range(len(all_valid_moves)):
-        if lowest_card in all_valid_moves[move_counter]:
-          return_moves.append(all_valid_moves[move_counter])
-    else:
-      return_moves = all_valid_moves[:]
-
-    return sorted_by_hand_type(return_moves)
+    # After a previous move, pruned generation (see iter_valid_moves) beats scanning the whole catalogue
+    if self.catalogue != None and not isinstance(previous_move, Move):
+      self.catalogue.sync(self.to_mask())
+      return catalogue_moves(self.catalogue, previous_move, lowest_card, option)
 
-  def __get_same_sized_move(self, previous_move):
-    '''Return moves if hand is the same size as the previous move'''
+    return valid_moves(self.to_mask(), previous_move, lowest_card, option)
 
-    self_move = Move(self)
-    is_move = True
-    if self_move.hand_type == 'empty' or self_move.hand_type == 'scattered':
-      is_move = False
-
-    if is_move and self_move > previous_move:
-      return [self_move]
-    
-    return []
-
-  def __value_frequencies(self):
-    '''Return a dictionary that represents the frequency of each card value in the hand'''
-
-    self_value_frequencies = {}
-
-    for card in self:  
-      if card.value in self_value_frequencies:
-        self_value_frequencies[card.value].append(card)
-      else:
-        self_value_frequencies[card.value] = [card]
-
-    return self_value_frequencies
+  def get_move_list(self, previous_move = "*", lowest_card = None, option = 'default'):
+    '''
+    Return the moves get_valid_moves returns, in the same order, as a MoveList (see move_list).
+    The list is packed and read-only, and a Move is only made when one is looked up by index or iterated over.
+    '''
 
-  def __get_one_cards(self, moves, option):
-    '''Return a list of all single card moves within the hand'''
+    self.sort()
 
-    if option == 'default':
-      for card in self:
-        moves.append(Move([card]))
-    elif option == 'highest':
-      moves.append(Move([self[-1]]))
-    elif option == 'lowest':
-      moves.append(Move([self[0]]))
+    if self.catalogue != None and not isinstance(previous_move, Move):
+      self.catalogue.sync(self.to_mask())
+      return move_list.MoveList.from_pairs(self.catalogue.select(None, lowest_card.bit if lowest_card != None else 0, option))
 
-  def __get_two_to_four_cards(self, moves, option, value_frequencies, has_previous_move, previous_move):
-    '''Return a list of all two, three, and four card moves within the hand'''
+    return valid_move_list(self.to_mask(), previous_move, lowest_card, option)
 
-    if has_previous_move:
-      move_sizes = [previous_move.size()]
-    else:
-      move_sizes = [2, 3, 4]
-
-    move_type_dict = {}
-
-    for move_size in move_sizes:
-      for value in value_frequencies:
-        if len(value_frequencies[value]) < move_size: continue
+  def capability_profile(self, excluded = 0):
+    '''
+    Return the number of moves of each hand type the hand can form, as a list indexed by hand type index (see Move.HAND_TYPES).
+    The counts come straight from the hand's value and suit counts, without generating any move.
 
-        combinations = itertools.combinations(value_frequencies[value], move_size)
+    excluded -- mask of cards of the hand to leave out (e.g. a move about to be played, see mask_of)
+    '''
 
-        for move in combinations:
-          this_move = Move(move)
+    return move_gen.move_counts(self.to_mask() & ~excluded)
 
-          if option == 'default':
-            moves.append(this_move)
-          elif this_move.size() not in move_type_dict:
-            move_type_dict[this_move.size()] = this_move
-          elif (option == 'highest' and this_move > move_type_dict[this_move.size()]) or (option == 'lowest' and this_move < move_type_dict[this_move.size()]):
-            move_type_dict[this_move.size()] = this_move
+  def iter_valid_moves(self, previous_move = "*", lowest_card = None, hand_type = None, size = None, reverse = False):
+    '''
+    Yield the valid moves of the hand one at a time, generating each only when it is asked for (see iter_valid_moves).
+    Callers that only need the first few moves can stop early without the rest ever being generated.
+    '''
 
-    if option != 'default':
-      for move_type in move_type_dict:
-        moves.append(move_type_dict[move_type])
+    return iter_valid_moves(self.to_mask(), previous_move, lowest_card, hand_type, size, reverse)
 
-  def __get_five_cards(self, moves, option):
-    '''Return a list of all five-card moves within the hand'''
+  def track_moves(self):
+    '''
+    Switch the hand to incremental mode, where it keeps a live catalogue of all its moves (see move_catalogue).
+    Cards leaving the hand then only drop the moves that use them, instead of moves being regenerated on every call.
+    '''
 
-    combinations = itertools.combinations(self, 5)
+    self.catalogue = MoveCatalogue(self.to_mask())
 
-    move_type_dict = {}
+  def to_mask(self):
+    '''Return the bitmask representation of the hand (see card_mask)'''
 
-    for combo in combinations:
-      move = Move(combo)
-      if move.hand_type != 'scattered':
-        if option == 'default':
-          moves.append(move)
-        elif move.hand_type not in move_type_dict:
-          move_type_dict[move.hand_type] = move
-        elif (option == 'highest' and move > move_type_dict[move.hand_type]) or (option == 'lowest' and move < move_type_dict[move.hand_type]):
-          move_type_dict[move.hand_type] = move
+    mask = 0
 
-    if option != 'default':
-      for move_type in move_type_dict:
-        moves.append(move_type_dict[move_type])
+    for card in self:
+      mask |= card.bit
 
-  def __get_moves_with_previous(self, moves, previous_move):
-    '''Return a sorted of all possible moves in the hand when a previous move is provided'''
+    return mask
 
-    return_moves = []
+  @classmethod
+  def from_mask(cls, mask):
+    '''Return a new hand holding the cards of the bitmask, in ascending order'''
 
-    for move_counter in range(len(moves)):
-      if moves[move_counter] > previous_move:
-        # print(str(all_valid_moves[move_counter].__class__) + " " + str(previous_move.__class__))
-        # print(str(Move.HAND_TYPES.index(all_valid_moves[move_counter].hand_type)) + " " + str(Move.HAND_TYPES.index(previous_move.hand_type)))
-        # print(move_counter)
-        return_moves.append(moves[move_counter])
+    return cls([CARDS[card_ordinal] for card_ordinal in card_mask.ordinals(mask)])
 
-    return merge_sort(return_moves)
+  @classmethod
+  def mask_of(cls, cards):
+    '''Return the mask of a card, move or list of them, in the mask layout of the hand (see card_mask.from_cards)'''
+    return card_mask.from_cards(cards)
 
   def size(self):
     '''Return the size of the hand.'''
@@ -263,34 +222,30 @@ class Hand(list):
     - in_place: (True: subtracts from hand in place), (False: returns a copy of the string with cards removed)
     '''
 
-    other_cards = {}
-
-    return_hand = self
-
-    if not in_place:
-      return_hand = Hand()
-
-      for card in self:
-        return_hand.append(card)
-
     if isinstance(other, Card):
-      return_hand.remove(other)
-      return return_hand
+      other_mask = other.bit
+    elif isinstance(other, Move):
+      other_mask = other.mask
     elif not isinstance(other, list):
       raise TypeError("Cannot subtract non-list/hand object from hand")
-
-    for element in other:
-      if isinstance(element, list):
-        return_hand.subtract(element)
-      elif not isinstance(element, Card):
+    else:
+      try:
+        other_mask = card_mask.from_cards(other)
+      except TypeError:
         raise TypeError("Cannot remove non-card objects")
-      elif element.to_hashable() not in other_cards:
-        other_cards[element.to_hashable()] = True
 
-    for other_card in other_cards:
-      return_hand.remove(hashable_to_card(other_card))
+    if other_mask & ~self.to_mask():
+      raise ValueError("Cannot remove cards that are not in the hand")
+
+    remaining_cards = [card for card in self if not card.bit & other_mask]
 
-    if not in_place:
+    if in_place:
+      self[:] = remaining_cards
+      return_hand = self
+    else:
+      return_hand = Hand(remaining_cards)
+
+    if not in_place or isinstance(other, Card):
       return return_hand
 
   def to_blank_hand(self):
@@ -316,15 +271,43 @@ class InvalidMoveError(Exception):
   pass
 
 @functools.total_ordering
-class Move(Hand):
-  '''Hand object that has added functionality of being a playable move by players'''
+class Move:
+  '''
+  Move playable by players: a set of cards held as its bitmask (see card_mask), along with its strength key
+
+  A move reads like the sorted list of its cards (size, indexing, iteration, membership and display),
+  but it cannot be changed, so it can be shared, put in sets and used as a dictionary key.
+  If no argument is given, the constructor creates an empty move. The argument must consist of cards and be iterable if specified.
+  '''
 
-  HAND_TYPES = ['empty', 'scattered', 'one_card', 'pair', 'three_of_a_kind', 'four_of_a_kind', 'straight', 'flush', 'full_house', 'four_of_a_kind_plus_one', 'straight_flush']    
+  __slots__ = ('mask', 'key', '_cards')
+
+  HAND_TYPES = ['empty', 'scattered', 'one_card', 'pair', 'three_of_a_kind', 'four_of_a_kind', 'straight', 'flush', 'full_house', 'four_of_a_kind_plus_one', 'straight_flush']
+
+  # Layout of the strength keys (see card_mask.strength_key), which subclasses with other masks replace (see multi_deck)
+  TYPE_SHIFT = card_mask.TYPE_SHIFT
+  MIN_VALID_KEY = card_mask.MIN_VALID_KEY
+
+  def __init__(self, iterable = (), mask = None, key = None):
+    if mask == None:
+      mask = 0
+
+      for card in iterable:
+        mask |= card.bit
+
+    object.__setattr__(self, 'mask', mask)
+    object.__setattr__(self, 'key', key if key != None else card_mask.strength_key(mask))
+    object.__setattr__(self, '_cards', None)
+
+  @classmethod
+  def from_mask(cls, mask, key = None):
+    '''Return the move made of the cards of the bitmask, given its strength key if it is already known (see card_mask.strength_key)'''
+    return cls((), mask, key)
 
   def get_type(self):
     '''
     Return the type of the move.
-    
+
     Possible hand types:
     'empty' -- move contains no cards
     'scattered' -- cards do not consist of a move
@@ -338,82 +321,58 @@ class Move(Hand):
     'four_of_a_kind_plus_one' -- move is five cards, consisting of a four-of-a-kind and an additional card
     'straight_flush' -- move is both a straight and a flush
     '''
-    self.sort()
+    return Move.HAND_TYPES[self.key >> self.TYPE_SHIFT]
 
-    if self.size() == 0:
-      self.hand_type = Move.HAND_TYPES[0]
-    elif self.size() <= 4:
-      first_card = self[0]
-      all_same = True
+  @property
+  def hand_type(self):
+    return Move.HAND_TYPES[self.key >> self.TYPE_SHIFT]
 
-      for card in self:
-        if card.value != first_card.value:
-          all_same = False
-          break
+  @property
+  def hand_type_index(self):
+    return self.key >> self.TYPE_SHIFT
 
-      if all_same:
-        self.hand_type = Move.HAND_TYPES[self.size() + 1]  # One card/pair/three/four
-      else:
-        self.hand_type = Move.HAND_TYPES[1]            # Scattered
-
-    elif self.size() == 5:
-      first_card = self[0]
-      is_straight = True
-      is_flush = True
-      repeat_value_counter = []
-      repeat_values = 0
-
-      if first_card.value == 11 or first_card.value == 12 or first_card.value == 13:
-        is_straight = False
-
-      for card_counter in range(self.size()):
-        if is_flush and self[card_counter].suit != first_card.suit:
-          is_flush = False
-
-        if is_straight and card_counter > 0 and ((self[card_counter].value != self[card_counter - 1].value + 1) and (self[card_counter].value != self[card_counter - 1].value - 12)):
-          is_straight = False
-
-        if card_counter == 0:
-          repeat_values = 1
-        elif self[card_counter].value == self[card_counter - 1].value:
-          repeat_values += 1
-        else:
-          repeat_value_counter.append(repeat_values)
-          repeat_values = 1
-
-      repeat_value_counter.append(repeat_values)
-
-      if is_straight:
-        if is_flush:
-          self.hand_type = Move.HAND_TYPES[10]
-        else:
-          self.hand_type = Move.HAND_TYPES[6]
-      elif is_flush:
-        self.hand_type = Move.HAND_TYPES[7]
-      elif len(repeat_value_counter) == 2:
-        if 1 in repeat_value_counter and 4 in repeat_value_counter:
-          self.hand_type = Move.HAND_TYPES[9]
-        else:
-          self.hand_type = Move.HAND_TYPES[8]
-      else:
-        self.hand_type = Move.HAND_TYPES[1]
+  def cards(self):
+    '''Return the cards of the move in ascending order, as a tuple'''
 
-    else:
-      self.hand_type = Move.HAND_TYPES[1]
+    # Most moves are only ever compared, so their cards are only looked up when they are needed
+    if self._cards == None:
+      object.__setattr__(self, '_cards', tuple(CARDS[card_ordinal] for card_ordinal in card_mask.ordinals(self.mask)))
 
-  def __init__(self, iterable = ()):
-    try:
-      super().__init__(iterable)
-    except TypeError:
-      super().__init__(*iterable)
+    return self._cards
+
+  def size(self):
+    '''Return the number of cards in the move.'''
+    return card_mask.size(self.mask)
+
+  def to_mask(self):
+    '''Return the bitmask representation of the move (see card_mask)'''
+    return self.mask
+
+  def __setattr__(self, name, value):
+    raise AttributeError("Moves cannot be changed.")
+
+  def __reduce__(self):
+    return (Move, ((), self.mask))
+
+  def __len__(self):
+    return card_mask.size(self.mask)
+
+  def __iter__(self):
+    return iter(self.cards())
+
+  def __getitem__(self, index):
+    return self.cards()[index]
+
+  def __contains__(self, card):
+    return bool(self.mask & getattr(card, 'bit', 0))
 
-    self.get_type()
-    self.hand_type_index = Move.HAND_TYPES.index(self.hand_type)
+  def __hash__(self):
+    return hash(self.mask)
 
   def __str__(self):
     display_hand = ""
-    
-    for card in self:
+
+    for card in self.cards():
       display_hand += (card.__str__() + " ")
 
     return display_hand
@@ -421,137 +380,301 @@ class Move(Hand):
   def __eq__(self, other):
     if not isinstance(other, Move): return False
 
-    if self.hand_type == 'empty' or self.hand_type == 'scattered' or other.hand_type == 'empty' or other.hand_type == 'scattered':
-      raise InvalidMoveError("Cannot compare empty/scattered moves.")
+    # Moves are equal when they hold the same cards, which is always well defined, unlike their order
+    return self.mask == other.mask
 
-    if self.size() != other.size(): return False
+  def __gt__(self, other):
+    if not isinstance(other, Move): raise TypeError("Cannot compare move with non-move object.")
 
-    for card_counter in range(self.size()):
-      if self[card_counter] != other[card_counter]:
-        return False
+    if self.key < self.MIN_VALID_KEY or other.key < other.MIN_VALID_KEY:
+      raise InvalidMoveError("Cannot compare empty/scattered moves.")
 
-    return True
-  
-  def __gt__(self, other):
-    return not self.__lt__(other) and not self.__eq__(other)
+    return self.key > other.key
 
   def __lt__(self, other):
-    if not isinstance(other, Move): raise TypeError("Cannot compare card with non-move object.")
+    if not isinstance(other, Move): raise TypeError("Cannot compare move with non-move object.")
 
-    if self.hand_type == 'empty' or self.hand_type == 'scattered' or other.hand_type == 'empty' or other.hand_type == 'scattered':
+    if self.key < self.MIN_VALID_KEY or other.key < other.MIN_VALID_KEY:
       raise InvalidMoveError("Cannot compare empty/scattered moves.")
 
-    if self.hand_type_index != other.hand_type_index:
-      return self.hand_type_index < other.hand_type_index
-
-    elif 2 <= self.hand_type_index <= 5:
-      return self[0] < other[0]
-
-    elif self.hand_type_index == 8 or self.hand_type_index == 9:
-      major_portion = self.hand_type_index - 5
-      compare_cards = []
-      
-      for move in [self, other]:
-        counter = None
-        for card_counter in range(move.size()):
-          if counter == None or move[card_counter].value != move[card_counter - 1].value:
-            counter = 1
-          else:
-            counter += 1
-            if counter == major_portion: 
-              compare_cards.append(move[card_counter])
-              break
-
-      return compare_cards[0] < compare_cards[1]
-
-    elif self.hand_type_index == 6 or self.hand_type_index == 10:
-      max_self = self[self.size() - 1]
-      max_other = other[other.size() - 1]
-
-      if max_self.value == max_other.value == 2:
-        next_max_self = self.pop(self.size() - 2)
-        next_max_other = other.pop(self.size() - 2)
-
-        if next_max_self.value == next_max_other.value:
-          return max_self.suit['value'] < max_other.suit['value']
-        else:
-          max_self = next_max_self
-          max_other = next_max_other
-
-      if max_self.value != max_other.value: 
-        return max_self < max_other
-
-      return max_self.suit['value'] < max_other.suit['value']
-    
-    else:
-      for card_counter in range(self.size() - 1, -1, -1):
-        if self[card_counter] != other[card_counter]:
-          return self[card_counter] < other[card_counter]
+    return self.key < other.key
 
-      return self[0].suit['value'] < other[0].suit['value']
+# Results of valid_moves(), keyed on the hand mask, previous move key, lowest card ordinal and option
+valid_moves_cache = MoveCache()
 
-def sorted_by_hand_type(in_list, reverse=True, reverse_in_hand_type=False):
-  '''Return list of moves, that is customizable to be sorted within the hand type'''
+def valid_moves(hand_mask, previous_move = "*", lowest_card = None, option = 'default'):
+  '''Return all valid moves of the hand represented by the bitmask hand_mask (see Hand.get_valid_moves)'''
 
-  all_moves = {}
+  cache_key = (
+    hand_mask,
+    previous_move.key if isinstance(previous_move, Move) else None,
+    lowest_card.ordinal if lowest_card != None else None,
+    option
+  )
 
-  for move in in_list:
-    if move.hand_type_index in all_moves:
-      all_moves[move.hand_type_index].append(move)
-    else:
-      all_moves[move.hand_type_index] = [move]
+  moves = valid_moves_cache.get(cache_key)
 
-  for move_type in all_moves:
-    all_moves[move_type] = merge_sort(all_moves[move_type], reverse_in_hand_type)
+  if moves == None:
+    moves = _generate_valid_moves(hand_mask, previous_move, lowest_card, option)
+    valid_moves_cache.put(cache_key, moves)
 
-  hand_types = list(all_moves.keys())
-  hand_types = merge_sort(hand_types, reverse)
+  return moves
 
-  return_list = []
+# Results of valid_move_list(), keyed like valid_moves_cache
+valid_move_list_cache = MoveCache()
 
-  for hand_type in hand_types:
-    return_list.extend(all_moves[hand_type])
+def valid_move_list(hand_mask, previous_move = "*", lowest_card = None, option = 'default'):
+  '''
+  Return the moves valid_moves() returns, in the same order, as a MoveList (see move_list)
+  The moves are generated as masks and strength keys, so no Move is made until one is looked up.
+  '''
 
-  return return_list
+  cache_key = (
+    hand_mask,
+    previous_move.key if isinstance(previous_move, Move) else None,
+    lowest_card.ordinal if lowest_card != None else None,
+    option
+  )
+
+  moves = valid_move_list_cache.get(cache_key)
+
+  if moves == None:
+    moves = move_list.MoveList.from_pairs(_valid_pairs(hand_mask, previous_move, lowest_card, option))
+    valid_move_list_cache.put(cache_key, moves)
+
+  return moves
+
+def _valid_pairs(hand_mask, previous_move, lowest_card, option):
+  '''Return the (strength key, mask) pairs of the moves valid_moves() returns, in the same order'''
+
+  if lowest_card != None: option = 'default'
+
+  if option == 'default':
+    return list(_iter_valid_pairs(hand_mask, previous_move, lowest_card, None, None, False))
+
+  # The highest or lowest move of each hand type is picked before being compared with the previous move
+  has_previous_move = isinstance(previous_move, Move)
+  hand_type_indices = range(card_mask.STRAIGHT_FLUSH, card_mask.ONE_CARD - 1, -1)
+  pairs = []
+
+  if has_previous_move:
+    hand_type_indices = [hand_type_index for hand_type_index in reversed(hand_type_indices) if card_mask.MOVE_SIZES[hand_type_index] == previous_move.size()]
+
+  for hand_type_index in hand_type_indices:
+    for mask in move_gen.iter_moves(hand_mask, hand_type_index, 0, option == 'highest'):
+      key = card_mask.strength_key(mask, hand_type_index)
+
+      if not has_previous_move or key > previous_move.key:
+        pairs.append((key, mask))
 
-def merge(lst1, lst2, reverse = False):
-  i = 0
-  j = 0
-  merged = []
-  
-  while len(merged) < len(lst1) + len(lst2):
-    if i == len(lst1):
-      merged.extend(lst2[j:])
-      break
-    elif j == len(lst2):
-      merged.extend(lst1[i:])
       break
-    elif reverse:
-      if lst1[i] > lst2[j]:
-        merged.append(lst1[i])
-        i += 1
-      else:
-        merged.append(lst2[j])
-        j += 1
-    else:
-      if lst1[i] < lst2[j]:
-        merged.append(lst1[i])
-        i += 1
+
+  return pairs
+
+def iter_valid_moves(hand_mask, previous_move = "*", lowest_card = None, hand_type = None, size = None, reverse = False):
+  '''
+  Yield the valid moves of the hand represented by the bitmask hand_mask lazily, in the same order as Hand.get_valid_moves:
+  highest hand type first, each from lowest to highest, or from lowest to highest overall if there is a previous move.
+
+  hand_type -- only yield moves of this hand type (see Move.HAND_TYPES)
+  size -- only yield moves of this number of cards
+  reverse -- yield the moves of each hand type from highest to lowest (and, after a previous move, from highest to lowest overall)
+  If lowest card is specified (and there is no previous move), only moves containing it are generated.
+  After a previous move, only moves beating it are generated: hand types below it are skipped, and
+  its own hand type is generated from its primary card up (see card_mask.primary_card).
+  '''
+
+  for key, mask in _iter_valid_pairs(hand_mask, previous_move, lowest_card, hand_type, size, reverse):
+    yield Move.from_mask(mask, key)
+
+def _iter_valid_pairs(hand_mask, previous_move, lowest_card, hand_type, size, reverse):
+  '''Yield the (strength key, mask) pairs of the moves iter_valid_moves yields, in the same order'''
+
+  has_previous_move = isinstance(previous_move, Move)
+  required = 0
+  hand_type_indices = range(card_mask.STRAIGHT_FLUSH, card_mask.ONE_CARD - 1, -1)
+
+  if has_previous_move:
+    if size != None and size != previous_move.size(): return
+    size = previous_move.size()
+
+    if not reverse:
+      hand_type_indices = reversed(hand_type_indices)
+  elif lowest_card != None:
+    required = lowest_card.bit
+
+  for hand_type_index in hand_type_indices:
+    if hand_type != None and Move.HAND_TYPES[hand_type_index] != hand_type: continue
+    if size != None and card_mask.MOVE_SIZES[hand_type_index] != size: continue
+
+    if not has_previous_move or hand_type_index > previous_move.hand_type_index:
+      for mask in move_gen.iter_moves(hand_mask, hand_type_index, required, reverse):
+        yield card_mask.strength_key(mask, hand_type_index), mask
+    elif hand_type_index == previous_move.hand_type_index:
+      # Only moves from the previous move's primary card up can beat it
+      previous_primary = card_mask.primary_card(previous_move.mask, hand_type_index)
+
+      for mask in move_gen.iter_moves(hand_mask, hand_type_index, required, reverse, previous_primary):
+        key = card_mask.strength_key(mask, hand_type_index)
+
+        if key > previous_move.key:
+          yield key, mask
+
+def catalogue_moves(catalogue, previous_move = "*", lowest_card = None, option = 'default', excluded = 0):
+  '''Return the valid moves of a move catalogue (see Hand.get_valid_moves), leaving out the moves using the excluded cards'''
+
+  previous_key = previous_move.key if isinstance(previous_move, Move) else None
+  lowest_bit = lowest_card.bit if lowest_card != None else 0
+
+  return [Move.from_mask(mask, key) for key, mask in catalogue.select(previous_key, lowest_bit, option, excluded)]
+
+def _generate_valid_moves(hand_mask, previous_move, lowest_card, option):
+  '''Return all valid moves of the hand represented by the bitmask hand_mask, without looking them up in the cache'''
+
+  has_previous_move = isinstance(previous_move, Move)
+  first_move = (lowest_card != None)
+
+  if first_move: option = 'default'
+
+  hand_size = card_mask.size(hand_mask)
+
+  if has_previous_move and hand_size < previous_move.size():
+    return []
+  elif has_previous_move and hand_size == previous_move.size():
+    return _get_same_sized_move(hand_mask, previous_move)
+  elif has_previous_move and option == 'default':
+    return list(iter_valid_moves(hand_mask, previous_move))
+
+  all_valid_moves = []
+
+  get_moves = {
+    _get_one_cards: {'range': 1, 'args': [hand_mask, all_valid_moves, option]},
+    _get_two_to_four_cards: {'range': [2, 4], 'args': [hand_mask, all_valid_moves, option, has_previous_move, previous_move]},
+    _get_five_cards: {'range': 5, 'args': [hand_mask, all_valid_moves, option]}
+  }
+
+  for func in get_moves:
+    within_range = True
+
+    if has_previous_move:
+      if isinstance(get_moves[func]['range'], list):
+        within_range = get_moves[func]['range'][0] <= previous_move.size() <= get_moves[func]['range'][1]
       else:
-        merged.append(lst2[j])
-        j += 1
-      
-  return merged
-      
-
-def merge_sort(lst, reverse = False):
-  if len(lst) <= 1:
-    return lst
-  
-  left = merge_sort(lst[:len(lst)//2], reverse)
-  right = merge_sort(lst[len(lst)//2:], reverse)
-  
-  return merge(left, right, reverse)
+        within_range = (previous_move.size() == get_moves[func]['range'])
+
+      if not within_range:
+        continue
+
+    func(*get_moves[func]['args'])
+
+    if has_previous_move:
+      return _get_moves_with_previous(all_valid_moves, previous_move)
+
+  return_moves = []
+
+  if first_move:
+    for move in all_valid_moves:
+      if move.mask & lowest_card.bit:
+        return_moves.append(move)
+  else:
+    return_moves = all_valid_moves[:]
+
+  return sorted_by_hand_type(return_moves)
+
+def _get_same_sized_move(hand_mask, previous_move):
+  '''Return moves if hand is the same size as the previous move'''
+
+  hand_type_index = card_mask.classify(hand_mask)
+
+  if hand_type_index == card_mask.EMPTY or hand_type_index == card_mask.SCATTERED:
+    return []
+
+  self_move = Move.from_mask(hand_mask, card_mask.strength_key(hand_mask, hand_type_index))
+
+  if self_move > previous_move:
+    return [self_move]
+
+  return []
+
+def _get_one_cards(hand_mask, moves, option):
+  '''Add all single card moves within the hand to moves'''
+
+  if hand_mask == 0: return
+
+  if option == 'default':
+    for card_bit in card_mask.bits(hand_mask):
+      moves.append(Move.from_mask(card_bit, card_mask.strength_key(card_bit, card_mask.ONE_CARD)))
+  elif option == 'highest':
+    card_bit = 1 << card_mask.highest(hand_mask)
+    moves.append(Move.from_mask(card_bit, card_mask.strength_key(card_bit, card_mask.ONE_CARD)))
+  elif option == 'lowest':
+    card_bit = hand_mask & -hand_mask
+    moves.append(Move.from_mask(card_bit, card_mask.strength_key(card_bit, card_mask.ONE_CARD)))
+
+def _get_two_to_four_cards(hand_mask, moves, option, has_previous_move, previous_move):
+  '''Add all two, three, and four card moves within the hand to moves'''
+
+  if has_previous_move:
+    move_sizes = [previous_move.size()]
+  else:
+    move_sizes = [2, 3, 4]
+
+  move_type_dict = {}
+
+  for move_size in move_sizes:
+    for value_mask in card_mask.VALUE_MASKS:
+      value_bits = card_mask.bits(hand_mask & value_mask)
+      if len(value_bits) < move_size: continue
+
+      for combo in itertools.combinations(value_bits, move_size):
+        combo_mask = sum(combo)
+        this_move = Move.from_mask(combo_mask, card_mask.strength_key(combo_mask, move_size + 1))
+
+        if option == 'default':
+          moves.append(this_move)
+        elif this_move.size() not in move_type_dict:
+          move_type_dict[this_move.size()] = this_move
+        elif (option == 'highest' and this_move > move_type_dict[this_move.size()]) or (option == 'lowest' and this_move < move_type_dict[this_move.size()]):
+          move_type_dict[this_move.size()] = this_move
+
+  if option != 'default':
+    for move_type in move_type_dict:
+      moves.append(move_type_dict[move_type])
+
+def _get_five_cards(hand_mask, moves, option):
+  '''Add all five-card moves within the hand to moves'''
+
+  move_type_dict = {}
+
+  for hand_type_index, combo_mask in move_gen.five_card_moves(hand_mask):
+    move = Move.from_mask(combo_mask, card_mask.strength_key(combo_mask, hand_type_index))
+
+    if option == 'default':
+      moves.append(move)
+    elif move.hand_type not in move_type_dict:
+      move_type_dict[move.hand_type] = move
+    elif (option == 'highest' and move > move_type_dict[move.hand_type]) or (option == 'lowest' and move < move_type_dict[move.hand_type]):
+      move_type_dict[move.hand_type] = move
+
+  if option != 'default':
+    for move_type in move_type_dict:
+      moves.append(move_type_dict[move_type])
+
+def _get_moves_with_previous(moves, previous_move):
+  '''Return a sorted list of all moves that are greater than the previous move'''
+
+  return_moves = []
+
+  for move in moves:
+    if move.key > previous_move.key:
+      return_moves.append(move)
+
+  return ranking.sort_by_key(return_moves)
+
+def sorted_by_hand_type(in_list, reverse=True, reverse_in_hand_type=False):
+  '''Return list of moves, that is customizable to be sorted within the hand type (see ranking.by_hand_type)'''
+
+  return ranking.by_hand_type(in_list, reverse, reverse_in_hand_type)
 
 def hashable_to_card(hashable):
   '''Converts hashable representation of card [see Card.to_hashable()] to its corresponding Card object'''
@@ -0,0 +1,211 @@
+'''
+Integer bitmask representation of cards, hands and moves.
+
+Each of the 52 cards owns one bit, numbered by its ordinal (value - 3) * 4 + suit, so that
+bit order is the same as card order (3 of diamonds is bit 0, 2 of spades is bit 51).
+A hand or a move is then simply the integer with the bits of its cards set:
+- union -- a | b
+- difference -- a & ~b
+- membership -- a & (1 << ordinal)
+- size -- size(a)
+'''
+
+NUM_VALUES = 13
+NUM_SUITS = 4
+DECK_SIZE = NUM_VALUES * NUM_SUITS
+
+# Hand type indices (same order as Move.HAND_TYPES)
+EMPTY = 0
+SCATTERED = 1
+ONE_CARD = 2
+PAIR = 3
+THREE_OF_A_KIND = 4
+FOUR_OF_A_KIND = 5
+STRAIGHT = 6
+FLUSH = 7
+FULL_HOUSE = 8
+FOUR_OF_A_KIND_PLUS_ONE = 9
+STRAIGHT_FLUSH = 10
+
+# Number of cards in a move of each hand type
+MOVE_SIZES = [0, 0, 1, 2, 3, 4, 5, 5, 5, 5, 5]
+
+FULL_DECK = (1 << DECK_SIZE) - 1
+
+# VALUE_MASKS[i] holds the four cards of the i-th lowest value (i = value - 3)
+VALUE_MASKS = [0xF << (NUM_SUITS * index) for index in range(NUM_VALUES)]
+
+# SUIT_MASKS[s] holds the thirteen cards of suit s
+SUIT_MASKS = [sum(1 << (NUM_SUITS * index + suit) for index in range(NUM_VALUES)) for suit in range(NUM_SUITS)]
+
+# Straights may start from 3 up to 10 (10, J, Q, K, A being the highest), and never contain a 2
+STRAIGHT_STARTS = range(0, 8)
+
+# Number of set bits in a nibble
+_NIBBLE_SIZES = [bin(nibble).count('1') for nibble in range(16)]
+
+# Maps each byte (two values' nibbles) to the byte holding the number of cards of each of the two values
+_BYTE_VALUE_COUNTS = bytes(_NIBBLE_SIZES[byte & 0xF] | _NIBBLE_SIZES[byte >> 4] << 4 for byte in range(256))
+
+def ordinal(value, suit):
+  '''Return the ordinal of the card with the given value (3 to 15) and suit (0 to 3)'''
+  return (value - 3) * NUM_SUITS + suit
+
+def value_of(card_ordinal):
+  '''Return the card value (3 to 15) of an ordinal'''
+  return card_ordinal // NUM_SUITS + 3
+
+def suit_of(card_ordinal):
+  '''Return the suit value (0 to 3) of an ordinal'''
+  return card_ordinal % NUM_SUITS
+
+def size(mask):
+  '''Return the number of cards in the mask'''
+  return bin(mask).count('1')
+
+# Python 3.10 and later count the bits of an integer directly
+if hasattr(int, 'bit_count'): size = int.bit_count
+
+def lowest(mask):
+  '''Return the ordinal of the lowest card in the mask, or None if the mask is empty'''
+  if mask == 0: return None
+  return (mask & -mask).bit_length() - 1
+
+def highest(mask):
+  '''Return the ordinal of the highest card in the mask, or None if the mask is empty'''
+  if mask == 0: return None
+  return mask.bit_length() - 1
+
+def ordinals(mask):
+  '''Return the ordinals of all cards in the mask, in ascending order'''
+
+  result = []
+
+  while mask:
+    low_bit = mask & -mask
+    result.append(low_bit.bit_length() - 1)
+    mask ^= low_bit
+
+  return result
+
+def bits(mask):
+  '''Return the single-card masks of all cards in the mask, in ascending order'''
+
+  result = []
+
+  while mask:
+    low_bit = mask & -mask
+    result.append(low_bit)
+    mask ^= low_bit
+
+  return result
+
+def value_counts(mask):
+  '''Return a list with the number of cards of each value (index = value - 3) in the mask'''
+  return [_NIBBLE_SIZES[(mask >> (NUM_SUITS * index)) & 0xF] for index in range(NUM_VALUES)]
+
+def value_counts_key(mask):
+  '''Return an integer holding the number of cards of each value in the mask, in the nibble of that value'''
+  return int.from_bytes(mask.to_bytes(7, 'little').translate(_BYTE_VALUE_COUNTS), 'little')
+
+def suit_counts(mask):
+  '''Return a list with the number of cards of each suit in the mask'''
+  return [size(mask & suit_mask) for suit_mask in SUIT_MASKS]
+
+def value_presence(mask):
+  '''Return a 13-bit integer with bit i set if the mask holds at least one card of value index i'''
+
+  # Folds each nibble onto its lowest bit, then packs those bits together
+  folded = mask | (mask >> 1)
+  folded |= folded >> 2
+  presence = 0
+
+  for index in range(NUM_VALUES):
+    if (folded >> (NUM_SUITS * index)) & 1:
+      presence |= 1 << index
+
+  return presence
+
+def from_cards(cards):
+  '''Return the mask of a card or move, or of a (possibly nested) list of them'''
+
+  if hasattr(cards, 'ordinal'):
+    return 1 << cards.ordinal
+  elif hasattr(cards, 'mask'):
+    return cards.mask
+  elif not isinstance(cards, list) and not isinstance(cards, tuple):
+    raise TypeError("Cannot convert non-card/non-list object to a mask")
+
+  mask = 0
+
+  for element in cards:
+    mask |= from_cards(element)
+
+  return mask
+
+def classify(mask):
+  '''Return the hand type index of the move represented by the mask (see Move.get_type)'''
+
+  num_cards = size(mask)
+
+  if num_cards == 0:
+    return EMPTY
+  elif num_cards <= 4:
+    value_index = lowest(mask) // NUM_SUITS
+    if mask & ~VALUE_MASKS[value_index]:
+      return SCATTERED
+    return num_cards + 1
+  elif num_cards > 5:
+    return SCATTERED
+
+  low_ordinal = lowest(mask)
+  is_flush = (mask & ~SUIT_MASKS[suit_of(low_ordinal)]) == 0
+  presence = value_presence(mask)
+  low_index = low_ordinal // NUM_SUITS
+
+  if low_index in STRAIGHT_STARTS and presence == (0x1F << low_index):
+    return STRAIGHT_FLUSH if is_flush else STRAIGHT
+  elif is_flush:
+    return FLUSH
+  elif size(presence) == 2:
+    counts = [count for count in value_counts(mask) if count != 0]
+    if 4 in counts:
+      return FOUR_OF_A_KIND_PLUS_ONE
+    return FULL_HOUSE
+
+  return SCATTERED
+
+# Layout of a strength key: hand type index, then the tie-break card, then the whole mask
+PRIMARY_SHIFT = DECK_SIZE
+TYPE_SHIFT = PRIMARY_SHIFT + 6
+
+def primary_card(mask, hand_type_index):
+  '''Return the ordinal of the card that decides between two moves of the same hand type'''
+
+  if ONE_CARD <= hand_type_index <= FOUR_OF_A_KIND:
+    return lowest(mask)
+  elif hand_type_index == FULL_HOUSE or hand_type_index == FOUR_OF_A_KIND_PLUS_ONE:
+    # Highest card of the three/four of a kind
+    major_size = hand_type_index - 5
+
+    for index in range(NUM_VALUES):
+      value_bits = mask & VALUE_MASKS[index]
+      if value_bits and size(value_bits) == major_size:
+        return highest(value_bits)
+  elif hand_type_index == STRAIGHT or hand_type_index == FLUSH or hand_type_index == STRAIGHT_FLUSH:
+    return highest(mask)
+
+  return 0
+
+def strength_key(mask, hand_type_index = None):
+  '''
+  Return an integer that orders moves by strength: moves of a higher hand type are stronger,
+  and within a hand type the primary card (see primary_card) decides, then the cards from the highest down.
+  '''
+
+  if hand_type_index == None: hand_type_index = classify(mask)
+
+  return (hand_type_index << TYPE_SHIFT) | (primary_card(mask, hand_type_index) << PRIMARY_SHIFT) | mask
+
+# Every key below this belongs to an empty or scattered move
+MIN_VALID_KEY = ONE_CARD << TYPE_SHIFT
@@ -1,11 +1,23 @@
 from card import Hand, Card, Move
+import card_mask
+import move_gen
+import ranking
+import multi_deck
+from card_mask import DECK_SIZE, NUM_VALUES, NUM_SUITS, VALUE_MASKS, SUIT_MASKS, STRAIGHT_STARTS
 
 deck = Hand() 
 
-def full_deck():
-  '''Return, and in essence, store the full deck of cards.'''
+# For each start of a straight, the lowest bit of each of its five values (see _moves_bounds) and all of their cards
+_STRAIGHT_WINDOWS = [(sum(VALUE_MASKS[start:start + 5]) & SUIT_MASKS[0], sum(VALUE_MASKS[start:start + 5]))
+                     for start in STRAIGHT_STARTS]
+
+def full_deck(decks = 1):
+  '''Return, and in essence, store the full deck of cards (or a new MultiDeckHand of decks decks shuffled together, see multi_deck).'''
   global deck
 
+  if decks != 1:
+    return multi_deck.MultiDeckHand.from_mask(multi_deck.full_deck(decks))
+
   # Only fills deck with cards on the first run of full_deck()
   if deck == []:
     for suit in range(4):
@@ -39,33 +51,244 @@ def highest(cards):
 def cards_remaining(*used_cards):
   '''Return the hand of cards remaining after the used_cards specified are removed'''
 
-  cards_left = full_deck()[:]
+  used_mask = 0
 
   for cards in used_cards:
-    cards_left.subtract(cards)
+    used_mask |= card_mask.from_cards(cards)
+
+  return Hand.from_mask(card_mask.FULL_DECK & ~used_mask)
+
+def minimum_moves_to_victory(hand_mask, table = None):
+  '''
+  Return the minimum number of moves needed to play every card in the hand represented by hand_mask (see card_mask),
+  along with the set of masks of the first moves that achieve it
+
+  table -- dictionary of already solved hand masks, which can be kept between calls for the same hand as it shrinks
+  '''
+
+  if table == None: table = {}
+
+  minimum = _minimum_moves(hand_mask, table)
+
+  return minimum, _optimal_moves(hand_mask, minimum, table)
+
+def move_with_minimum_possible_moves_to_victory(hand):
+  '''Return the minimum possible moves to victory, and the moves that allow that case to occur (ordered from lowest to highest)'''
+
+  minimum, first_moves = minimum_moves_to_victory(hand.to_mask())
+
+  return minimum, ranking.sort_by_key(Move.from_mask(move_mask) for move_mask in first_moves)
+
+def _moves_bounds(hand_mask):
+  '''
+  Return (lower, upper) bounds on the number of moves needed to play every card in the hand
+
+  Playing each value as one move (single, pair, three or four of a kind) works, and so does merging a three of a kind
+  with a pair, or a four of a kind with a single, which gives the upper bound.
+  No move has more than five cards, and the cards that cannot be part of any five-card move in the hand can only
+  be played with cards of the same value, so each of their values needs at least a move of its own. The only
+  exceptions are the pair of a full house and the one of a four-of-a-kind plus one, and there are no more of those
+  than three and four of a kinds to go with them. Every other move plays a single value too, so there must also be
+  enough five-card moves in the hand for the rest of the cards.
+  '''
+
+  if hand_mask == 0: return 0, 0
+
+  value_counts = card_mask.value_counts(hand_mask)
+  num_cards = sum(value_counts)
+  num_values = NUM_VALUES - value_counts.count(0)
+  num_singles = value_counts.count(1)
+  num_doubles = value_counts.count(2)
+  num_threes = value_counts.count(3)
+  num_fours = value_counts.count(4) if num_cards >= 5 else 0
+  num_pairs = num_values - num_singles
+
+  # Values whose three or four of a kind can start a full house or a four-of-a-kind plus one
+  num_anchors = num_threes + value_counts.count(4) if num_pairs >= 2 else num_fours
+
+  # Every card of a value in some straight, or of a suit with at least five cards, is part of a five-card move
+  folded = hand_mask | (hand_mask >> 1)
+  folded |= folded >> 2
+  straight_mask = 0
+
+  for low_bits, window_mask in _STRAIGHT_WINDOWS:
+    if folded & low_bits == low_bits:
+      straight_mask |= window_mask
+
+  flush_mask = 0
+  num_flushes = 0
+
+  for suit_mask in SUIT_MASKS:
+    suit_size = card_mask.size(hand_mask & suit_mask)
+
+    if suit_size >= 5:
+      flush_mask |= suit_mask
+      num_flushes += suit_size // 5
+
+  other_mask = hand_mask & ~straight_mask & ~flush_mask
+
+  fixed_values = 0
+  fixed_cards = 0
+  fixed_singles = 0
+  fixed_doubles = 0
+
+  while other_mask:
+    index = card_mask.lowest(other_mask) // NUM_SUITS
+    other_mask &= ~VALUE_MASKS[index]
+
+    count = value_counts[index]
+    if (count >= 3 and num_pairs >= 2) or (count == 4 and num_fours): continue
+
+    fixed_values += 1
+    fixed_cards += count
+
+    if count == 1: fixed_singles += 1
+    if count == 2: fixed_doubles += 1
+
+  # Each anchor value is part of at most one such move, which can take along one of these values: a single
+  # as the one of a four-of-a-kind plus one, or a pair as the pair of a full house
+  absorbed_singles = min(fixed_singles, num_fours)
+  absorbed_doubles = min(fixed_doubles, num_anchors - absorbed_singles)
+
+  fixed_values -= absorbed_singles + absorbed_doubles
+  fixed_cards -= absorbed_singles + 2 * absorbed_doubles
+
+  lower = fixed_values + -(-(num_cards - fixed_cards) // 5)
+
+  # There are no more five-card moves than full houses and four-of-a-kinds plus one, flushes, and straights
+  # (five cards of the straight values each)
+  num_straights = card_mask.size(hand_mask & straight_mask) // 5
+  num_five_card_moves = min(num_anchors + num_flushes + num_straights, num_cards // 5)
+  largest_value = 4 if value_counts.count(4) else 3 if num_threes else 2 if num_doubles else 1
+
+  lower = max(lower, num_five_card_moves + -(-(num_cards - 5 * num_five_card_moves) // largest_value))
+  upper = num_values - min(num_threes, num_doubles) - min(num_fours, num_singles)
+
+  return lower, upper
+
+def _minimum_moves(hand_mask, table):
+  '''Return the minimum number of moves needed to play every card in the hand, memoized in table'''
+
+  limit = _moves_bounds(hand_mask)[0]
+
+  # Searches for a solution with as few moves as possible, one more move at a time
+  while _search(hand_mask, limit, table) > limit:
+    limit += 1
+
+  return limit
+
+def _optimal_moves(hand_mask, minimum, table):
+  '''
+  Return the set of masks of the moves that are part of some way to play every card in the hand in minimum moves
+  (which is the hand's minimum)
+
+  As moves can be played in any order, these are also the first moves that achieve the minimum: the moves that
+  leave the rest of the hand playable in minimum - 1 moves. Each way of playing the rest that is found shows some
+  more of them, which then need no checking of their own.
+  '''
+
+  num_cards = card_mask.size(hand_mask)
+  moves = set()
+
+  for move_key, move_mask in move_gen.all_moves(hand_mask):
+    # The rest of the hand must fit in minimum - 1 moves
+    if move_mask in moves or num_cards - card_mask.size(move_mask) > 5 * (minimum - 1): continue
+
+    remaining_mask = hand_mask & ~move_mask
+
+    if _search(remaining_mask, minimum - 1, table, minimum - 1) == minimum - 1:
+      moves.add(move_mask)
+      moves.update(_solution(remaining_mask, minimum - 1, table))
+
+  return moves
+
+def _solution(hand_mask, minimum, table):
+  '''Return the masks of a way to play every card in the hand in minimum moves (which is the hand's minimum)'''
+
+  solution = []
+
+  while hand_mask:
+    for move_mask in move_gen.moves_with_card(hand_mask, hand_mask & -hand_mask):
+      if _search(hand_mask & ~move_mask, minimum - 1, table, minimum - 1) == minimum - 1: break
+
+    solution.append(move_mask)
+    hand_mask &= ~move_mask
+    minimum -= 1
+
+  return solution
+
+def _search(hand_mask, limit, table, floor = 0):
+  '''
+  Return the minimum number of moves needed to play every card in the hand if it is at most limit,
+  and a lower bound greater than limit otherwise
+
+  table maps hand masks and keys to the (lower, upper) bounds known on their minimum number of moves.
+  floor -- a lower bound already known by the caller, which stops the search as soon as a way to play it is found
+  '''
+
+  if hand_mask == 0: return 0
+
+  # Hands are looked up by mask first, which saves working out their key (see _table_key) when they were seen before
+  key = hand_mask
+
+  if hand_mask in table:
+    lower, upper = table[hand_mask]
+  else:
+    key = _table_key(hand_mask)
+    lower, upper = table[key] if key in table else _moves_bounds(hand_mask)
+    table[hand_mask] = table[key] = (lower, upper)
+
+  if lower < floor:
+    lower = floor
+    table[hand_mask] = table[key] = (lower, upper)
 
-  return cards_left
+  if lower == upper or lower > limit:
+    return lower
 
-# UNUSED, BUT HAS POTENTIAL:
-# def move_with_minimum_possible_moves_to_victory(hand):
-#   '''Return the minimum possible moves to victory, and the move that allows that case to occur'''
-#   if hand.size() <= 5 and Move(hand).hand_type != 'scattered':
-#     return 1, [1]
+  num_cards = card_mask.size(hand_mask)
+  child_lower = upper
+  target = min(limit, upper - 1)
 
-#   valid_moves = hand.get_valid_moves()
-#   minimum = None
-#   move_options = None
+  # The lowest card has to be played by some move, so only the moves containing it need to be tried
+  for move_mask in move_gen.moves_with_card(hand_mask, hand_mask & -hand_mask):
+    move_size = card_mask.size(move_mask)
 
-#   for move_index in range(len(valid_moves)):
-#     min_moves = move_with_minimum_possible_moves_to_victory(hand.subtract(valid_moves[move_index], False))[0]
+    # Moves come out from largest to smallest, and the rest of the hand must fit in target - 1 moves
+    if num_cards - move_size > 5 * (target - 1):
+      child_lower = min(child_lower, 1 + -(-(num_cards - move_size) // 5))
+      break
 
-#     if minimum == None or min_moves + 1 < minimum:
-#       minimum = min_moves + 1
-#       move_options = [move_index]
-#     elif min_moves + 1 == minimum:
-#       move_options.append(move_index)
+    # Playing a move takes at most one move off the minimum
+    moves = 1 + _search(hand_mask & ~move_mask, target - 1, table, lower - 1)
 
-#   return minimum, move_options
+    if moves <= target:
+      upper = moves
+      target = moves - 1
+      if upper == lower: break
+    else:
+      child_lower = min(child_lower, moves)
+
+  # Every move was tried, so the minimum is either the best one found or above what could be found below limit
+  lower = upper if upper <= limit else max(lower, min(upper, child_lower))
+
+  table[hand_mask] = table[key] = (lower, upper)
+  return lower
+
+def _table_key(hand_mask):
+  '''
+  Return the key of the hand in the table of _search
+
+  Cards of a suit with fewer than five cards in the hand can never be part of a flush again, so they only matter
+  by value, and hands that differ only in which of these cards they hold at each value share a key.
+  '''
+
+  flush_mask = 0
+
+  for suit_mask in SUIT_MASKS:
+    if card_mask.size(hand_mask & suit_mask) >= 5:
+      flush_mask |= suit_mask
+
+  return hand_mask & flush_mask | card_mask.value_counts_key(hand_mask & ~flush_mask) << DECK_SIZE
 
 def greater_than(moves1, moves2):
   '''Return whether the first set of moves is greater than the second, based on the hand types each set of moves consists of'''
@@ -94,6 +317,32 @@ def greater_than(moves1, moves2):
 
   return len(moves1_type_indices) > len(moves2_type_indices)
 
+def profile_greater_than(profile1, profile2):
+  '''
+  Return whether the first capability profile (see Hand.capability_profile) is greater than the second,
+  with the same result as greater_than() on the valid moves of the two hands
+  '''
+
+  # The valid moves of a hand list its hand types from highest to lowest
+  profile1_type_indices = [index for index in range(len(profile1) - 1, -1, -1) if profile1[index] > 0]
+  profile2_type_indices = [index for index in range(len(profile2) - 1, -1, -1) if profile2[index] > 0]
+
+  return profile1_type_indices > profile2_type_indices
+
+def profile_key(profile):
+  '''
+  Return an integer key of a capability profile, ordering profiles like profile_greater_than:
+  the set of hand types the hand can form, one bit per hand type index
+  '''
+
+  # Comparing the hand types from highest to lowest is comparing the bits from the highest one down
+  key = 0
+
+  for hand_type_index, count in enumerate(profile):
+    if count > 0: key |= 1 << hand_type_index
+
+  return key
+
 def ranking_in_card_list(card, card_list):
   '''
   Return integer starting from 0 (highest) to last index of card_list (lowest) representing ranking within card_list\n
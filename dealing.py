@@ -0,0 +1,105 @@
+'''
+Dealing of cards as bitmasks (see card_mask), from explicitly seeded random number generators.
+
+A deal is one permutation of the deck: each player gets the next equal share of it, and the cards
+left over make up the remainder, so dealing takes one sort and no list shifting. The lowest card
+dealt to a player, which decides who plays first, then follows from the remainder's mask alone.
+
+Every random number generator comes from a seed (see stream), so deals are reproducible. Independent
+streams are derived from a seed and a path of indices (e.g. a game number), which keeps the deals of
+each game the same whatever order, or process, the games are played in.
+
+With several decks (see multi_deck), the cards of every deck are shuffled together, and hands are count masks.
+'''
+
+import hashlib
+import random
+import struct
+import multi_deck
+from card_mask import DECK_SIZE, FULL_DECK
+
+_ORDINALS = list(range(DECK_SIZE))
+_BITS = [1 << card_ordinal for card_ordinal in range(DECK_SIZE)]
+
+def _deck_masks(decks):
+  '''Return the mask of each card of decks decks, in order: single-card bits with one deck, count masks otherwise'''
+  return _BITS if decks == 1 else multi_deck.UNITS * decks
+
+def stream_seed(seed, *indices):
+  '''Return the 64-bit seed of the stream with the given indices, derived from seed'''
+
+  digest = hashlib.sha256("#".join(str(part) for part in (seed,) + indices).encode()).digest()
+
+  return int.from_bytes(digest[:8], 'big')
+
+def stream(seed = None, *indices):
+  '''
+  Return a random number generator for dealing
+
+  Without indices, the generator is seeded with seed itself (from the system if seed is None), like random.Random(seed).
+  With indices, it is seeded with the seed derived from them (see stream_seed), independent of every other stream.
+  '''
+
+  if indices:
+    return random.Random(stream_seed(seed, *indices))
+
+  return random.Random(seed)
+
+def deal(rng, num_players, decks = 1):
+  '''
+  Deal an equal number of cards to each player from decks full decks shuffled with rng,
+  and return the masks of their hands along with the mask of the cards left over, as (hand_masks, remainder_mask)
+  '''
+
+  return deal_batch(rng, num_players, 1, decks)[0]
+
+def deal_batch(rng, num_players, count, decks = 1):
+  '''
+  Deal count games in a row with rng, and return the list of their (hand_masks, remainder_mask)
+
+  The deals are the same as those of count calls to deal() with the same rng, only faster to make.
+  '''
+
+  deck_size = DECK_SIZE * decks
+
+  # The deck is shuffled by sorting its cards by random 64-bit keys, drawn for every game at once,
+  # and read as little-endian whatever the machine, so a seed deals the same cards everywhere
+  keys = struct.unpack('<%dQ' % (deck_size * count), rng.randbytes(8 * deck_size * count))
+
+  bit = _deck_masks(decks).__getitem__
+  positions = _ORDINALS if decks == 1 else list(range(deck_size))
+  hand_size = deck_size // num_players
+  starts = range(0, hand_size * num_players, hand_size)
+  remainder_start = hand_size * num_players
+  deals = []
+
+  for offset in range(0, deck_size * count, deck_size):
+    permutation = sorted(positions, key=keys[offset:offset + deck_size].__getitem__)
+
+    # The bits of a hand are all different, so adding them up sets each of them (or counts each copy, in count masks)
+    deals.append(([sum(map(bit, permutation[start:start + hand_size])) for start in starts], sum(map(bit, permutation[remainder_start:]))))
+
+  return deals
+
+def lowest_dealt_card(remainder_mask, decks = 1):
+  '''Return the ordinal of the lowest card dealt to a player, given the mask of the cards left over after dealing'''
+
+  if decks != 1:
+    return multi_deck.lowest(multi_deck.full_deck(decks) - remainder_mask)
+
+  dealt_mask = FULL_DECK & ~remainder_mask
+
+  return (dealt_mask & -dealt_mask).bit_length() - 1
+
+def first_player(hand_masks, remainder_mask, decks = 1):
+  '''
+  Return the index of the player holding the lowest card dealt, who plays first in the first round
+  (with several decks, the first player in order holding a copy of it)
+  '''
+
+  card_ordinal = lowest_dealt_card(remainder_mask, decks)
+  lowest_bit = _BITS[card_ordinal] if decks == 1 else multi_deck.field(card_ordinal)
+
+  for index, hand_mask in enumerate(hand_masks):
+    if hand_mask & lowest_bit:
+      return index
@@ -0,0 +1,317 @@
+'''
+Headless engine that plays full games of President without any input or output.
+
+Unlike base_game, which keeps its state in module-level variables and waits for the user
+between turns, a Game holds its own players, number of rounds and random number generator,
+so games can be played unattended, one after another, in the same process.
+
+Large tables are played with several decks shuffled together (see multi_deck), and up to MAX_PLAYERS players per deck.
+'''
+
+import math
+import time
+import card
+import dealing
+import instrumentation
+import multi_deck
+from player import Player
+
+MIN_PLAYERS = 3
+MAX_PLAYERS = 8
+
+def max_players(decks = 1):
+  '''Return the largest number of players of a game played with decks decks'''
+  return MAX_PLAYERS * decks
+
+def decks_needed(num_players):
+  '''Return the smallest number of decks a game of num_players players is played with'''
+  return max(1, math.ceil(num_players / MAX_PLAYERS))
+
+def assign_roles(players):
+  '''Sort players by the order in which they last finished, and give each of them their role'''
+
+  players.sort()
+  num_players = len(players)
+
+  for counter in range(math.ceil(num_players / 2)):
+    if counter >= 2 or (counter == (num_players - 1 - counter)):
+      players[counter].role = players[(counter * -1) - 1].role = Player.FINISHING_ROLES[2]
+      continue
+
+    players[counter].role = Player.FINISHING_ROLES[counter]
+    players[(counter * -1) - 1].role = Player.FINISHING_ROLES[(counter * -1) - 1]
+
+def trade_pairs(players):
+  '''Return the (president, bum) pairs that trade cards, in order, for players sorted by finishing order'''
+
+  num_players = len(players)
+  pairs = []
+
+  for counter in range(math.ceil(num_players / 2)):
+    if counter >= 2 or (counter == (num_players - 1 - counter)):
+      break
+
+    pairs.append((players[counter], players[(counter * -1) - 1]))
+
+  return pairs
+
+def trade_between(president, bum, president_cards = None):
+  '''
+  Trade cards between two players, and return the cards given by each as (president_cards, bum_cards)
+
+  If president_cards is not specified, the president picks them through choose_trade_cards().
+  The bum always gives their highest cards, so their hand must be sorted.
+  '''
+
+  recorder = instrumentation.recorder
+  if recorder != None: start_time = time.perf_counter()
+
+  num_cards = 3 - president.finishing_record[-1]
+
+  if president_cards == None:
+    president_cards = president.choose_trade_cards(num_cards)
+
+  bum_cards = bum.hand[(-1 * num_cards):]
+
+  president.give_cards(bum, *president_cards)
+  bum.give_cards(president, *bum_cards)
+
+  if recorder != None: recorder.observe('trade', time.perf_counter() - start_time)
+
+  return president_cards, bum_cards
+
+class Game:
+  '''
+  Game of President between players that choose their moves without input (e.g. AI), played with no output
+
+  The seed makes the deals, and therefore the whole game, reproducible.
+  With several decks (up to multi_deck.MAX_DECKS, by default as few as the number of players needs), hands are
+  MultiDeckHands and moves MultiDeckMoves, and every mask of the game is a count mask (see multi_deck).
+  If instrument is set (to True, or to latency budgets, see instrumentation.Recorder), the game is recorded
+  (see instrumentation), and its results include the summary of what was recorded.
+  '''
+
+  def __init__(self, players, total_rounds = 1, seed = None, instrument = False, decks = None):
+    if decks == None: decks = decks_needed(len(players))
+
+    self.hand_class = multi_deck.hand_class(decks)
+
+    if not MIN_PLAYERS <= len(players) <= max_players(decks):
+      raise ValueError("President needs " + str(MIN_PLAYERS) + " to " + str(max_players(decks)) + " players with " + str(decks) + " deck(s).")
+
+    self.players = list(players)
+    self.decks = decks
+    self.num_players = len(self.players)
+    self.total_rounds = total_rounds
+    self.seed = seed
+    self.random = dealing.stream(seed)
+    self.instrument = instrument
+
+    # State of the round in progress, which players can look at through observation()
+    self.remainder_mask = 0
+    self.played_mask = 0
+    self.prev_move = "*"
+    self.num_passes = 0
+
+    for player in self.players:
+      player.game = self
+
+  def deal(self):
+    '''Deal an equal number of cards to each player (see dealing), and return the masks of their hands and of the cards left over'''
+
+    hand_masks, remainder_mask = dealing.deal(self.random, self.num_players, self.decks)
+
+    for counter in range(self.num_players):
+      self.players[counter].hand = self.hand_class.from_mask(hand_masks[counter])
+
+    return hand_masks, remainder_mask
+
+  def observation(self, player):
+    '''
+    Return what the given player can see of the round in progress, as a dictionary:
+    'seat' -- the player's index in players (which is also the order of play)
+    'hand_sizes', 'finished' -- number of cards held by, and finished status of, each player
+    'played_mask' -- mask of the cards played so far this round (see card_mask)
+    'remainder_mask' -- mask of the cards left over after dealing, which nobody holds
+    'previous_move', 'num_passes' -- move to beat ("*" if none) and number of passes since it was played
+    'decks' -- number of decks the game is played with (count masks above one, see multi_deck)
+    '''
+
+    return {
+      'seat': self.players.index(player),
+      'hand_sizes': [other.hand.size() for other in self.players],
+      'finished': [other.finished for other in self.players],
+      'played_mask': self.played_mask,
+      'remainder_mask': self.remainder_mask,
+      'previous_move': self.prev_move,
+      'num_passes': self.num_passes,
+      'decks': self.decks
+    }
+
+  def start(self):
+    '''Get the players ready for the first round, clearing anything left from a previous game'''
+
+    for player in self.players:
+      player.reset()
+      player.finishing_record = []
+      player.role = None
+
+  def play(self):
+    '''Play every round of the game, and return its results as a dictionary'''
+
+    self.start()
+    seating = [player.name for player in self.players]
+    rounds = []
+
+    if self.instrument: instrumentation.start(self.instrument if isinstance(self.instrument, dict) else None)
+
+    try:
+      for round_number in range(1, self.total_rounds + 1):
+        rounds.append(self.play_round(round_number))
+    finally:
+      recorder = instrumentation.stop() if self.instrument else None
+
+    results = self.results(seating, rounds)
+
+    if recorder != None: results['instrumentation'] = recorder.summary()
+
+    return results
+
+  def results(self, seating, rounds):
+    '''Return the results of the game as a dictionary, given the seating of the first round and the results of every round'''
+
+    return {
+      'seed': self.seed,
+      'decks': self.decks,
+      'players': seating,
+      'rounds': rounds,
+      'finishing_records': {player.name: player.finishing_record[:] for player in self.players},
+      'roles': {player.name: player.role for player in self.players}
+    }
+
+  def play_round(self, round_number):
+    '''
+    Play one round, from dealing to the assignment of roles, and return its results as a dictionary
+
+    Along with the finishing order, roles and trades, the results hold the names of the players by seat ('seating'),
+    the mask of the hand dealt to each seat before trading ('hands'), and every turn as a (seat, move mask) pair,
+    with a mask of 0 for a pass ('turns').
+    '''
+
+    steps = self.round_steps(round_number)
+    choice = None
+
+    try:
+      while True:
+        choice = self.decide(*steps.send(choice))
+    except StopIteration as stop:
+      return stop.value
+
+  def decide(self, kind, player, *args):
+    '''Return the choice asked of a player by round_steps, made without input'''
+
+    if kind == 'trade':
+      return None   # The president picks the cards in trade_between, which times the whole trade
+
+    recorder = instrumentation.recorder
+    if recorder != None: start_time = time.perf_counter()
+
+    move = player.do_move(*args)
+
+    if recorder != None: recorder.observe('turn/' + type(player).__name__, time.perf_counter() - start_time)
+
+    return move
+
+  def round_steps(self, round_number):
+    '''
+    Generator that plays one round (see play_round), yielding every choice a player has to make, and returning the results of the round
+
+    Each choice is yielded as a tuple, and is made by sending back:
+    ('trade', president, number of cards) -- the cards the president gives to the bum, or None to have them picked (see trade_between)
+    ('move', player, previous move, lowest card) -- the move the player plays (see Player.do_move), or "*" to pass
+
+    This lets the rules of a round be played out by callers that make the choices some other way (e.g. see table_server).
+    '''
+
+    players = self.players
+    hands, self.remainder_mask = self.deal()
+
+    self.played_mask = 0
+    self.prev_move = "*"
+    self.num_passes = 0
+
+    # Seats are the order of play, which changes between rounds as players are sorted by finishing order
+    seating = [player.name for player in players]
+
+    starting_player_index = 0
+    lowest_card = None
+    trades = []
+
+    if round_number == 1:
+      lowest_card = card.CARDS[dealing.lowest_dealt_card(self.remainder_mask, self.decks)]
+      starting_player_index = dealing.first_player(hands, self.remainder_mask, self.decks)
+    else:
+      # Players are already sorted by finishing order, so the president starts after trading
+      for president, bum in trade_pairs(players):
+        president_cards = yield ('trade', president, 3 - president.finishing_record[-1])
+        president_cards, bum_cards = trade_between(president, bum, president_cards)
+        trades.append({'president': president.name, 'bum': bum.name, 'given': president_cards, 'received': bum_cards})
+
+    num_turns = 0
+    turns = []
+    finishing_order = []
+    index = starting_player_index
+
+    while len(finishing_order) < self.num_players - 1:
+      seat = index
+      player = players[index]
+      index = (index + 1) % self.num_players
+
+      if player.finished:
+        continue
+
+      if num_turns == 0:
+        move = yield ('move', player, self.prev_move, lowest_card)
+        self.prev_move = move
+      else:
+        move = yield ('move', player, self.prev_move, None)
+
+        if move == "*":
+          self.num_passes += 1
+          if self.num_passes == self.num_players - 1:
+            self.prev_move = "*"
+        else:
+          self.num_passes = 0
+          self.prev_move = move
+
+      # Moves never share a card, so adding their masks sets (or, with several decks, counts) each card played
+      if move != "*":
+        self.played_mask += move.mask
+
+      turns.append((seat, move.mask if move != "*" else 0))
+      num_turns += 1
+
+      if player.finished:
+        finishing_order.append(player)
+        player.finishing_record.append(len(finishing_order))
+
+    for player in players:
+      if len(player.finishing_record) < round_number:
+        finishing_order.append(player)
+        player.finishing_record.append(self.num_players)
+
+    assign_roles(players)
+
+    for player in players:
+      player.reset()
+
+    return {
+      'round': round_number,
+      'seating': seating,
+      'hands': hands,
+      'finishing_order': [player.name for player in finishing_order],
+      'roles': {player.name: player.role for player in players},
+      'trades': trades,
+      'turns': turns,
+      'num_turns': num_turns
+    }
@@ -0,0 +1,288 @@
+'''
+Compact binary log of games, written by appending one game at a time, and read back one game at a time.
+
+A log file starts with MAGIC, followed by one record per game: the length of the record (4 bytes),
+then the record itself. Hands and moves are stored as 7-byte card masks (see card_mask), and players
+by seat number, so a typical four-player game takes a few hundred bytes. Games with several decks
+store 26-byte count masks instead (see multi_deck).
+
+Record layout (integers are little-endian):
+  flags (1 byte, bit 0 set if there is a seed, bit 1 if there are several decks), seed (8 bytes, if any), number of decks (1 byte, if several)
+  number of players (1 byte), then each player's name (1 byte of length, then UTF-8)
+  number of rounds (1 byte), then for each round:
+    seating: the index of the player (in the list of names) in each seat, 1 byte each
+    hands: the mask of the hand dealt to each seat, before trading
+    number of trades (1 byte), then for each: president seat, bum seat, mask of the cards given, mask of the cards received
+    number of turns (2 bytes), then for each: seat (1 byte, with PLAYED_FLAG set if it is not a pass), and the move mask if played
+    finishing order: the seat of each player, from first to last, 1 byte each
+
+Records are decoded only when their contents are looked at, and into Hands and Moves only when replayed.
+'''
+
+import struct
+import multi_deck
+
+MAGIC = b'PRESLOG1'
+
+MASK_BYTES = 7
+PLAYED_FLAG = 0x80
+SEED_FLAG = 0x01
+DECKS_FLAG = 0x02
+
+_LENGTH = struct.Struct('<I')
+_SEED = struct.Struct('<Q')
+_NUM_TURNS = struct.Struct('<H')
+
+def mask_bytes(decks = 1):
+  '''Return the number of bytes of each card mask in the record of a game with decks decks'''
+  return MASK_BYTES if decks == 1 else multi_deck.MASK_BYTES
+
+def encode_game(results):
+  '''Return the record of a game, given its results (see engine.Game.play)'''
+
+  names = results['players']
+  player_indices = {name: index for index, name in enumerate(names)}
+  decks = results.get('decks', 1)
+  hand_class = multi_deck.hand_class(decks)
+  num_mask_bytes = mask_bytes(decks)
+  record = bytearray()
+
+  def _mask_bytes(mask):
+    return mask.to_bytes(num_mask_bytes, 'little')
+
+  flags = (SEED_FLAG if results['seed'] != None else 0) | (DECKS_FLAG if decks != 1 else 0)
+  record.append(flags)
+
+  if results['seed'] != None:
+    if not 0 <= results['seed'] < 1 << 64:
+      raise ValueError("Game seeds must fit in 64 bits to be logged.")
+
+    record += _SEED.pack(results['seed'])
+
+  if decks != 1:
+    record.append(decks)
+
+  record.append(len(names))
+
+  for name in names:
+    encoded_name = name.encode('utf-8')
+    if len(encoded_name) > 255: raise ValueError("Player names must fit in 255 bytes to be logged.")
+
+    record.append(len(encoded_name))
+    record += encoded_name
+
+  if len(results['rounds']) > 255: raise ValueError("Games of more than 255 rounds cannot be logged.")
+
+  record.append(len(results['rounds']))
+
+  for game_round in results['rounds']:
+    seats = {name: seat for seat, name in enumerate(game_round['seating'])}
+
+    for name in game_round['seating']:
+      record.append(player_indices[name])
+
+    for hand_mask in game_round['hands']:
+      record += _mask_bytes(hand_mask)
+
+    record.append(len(game_round['trades']))
+
+    for trade in game_round['trades']:
+      record.append(seats[trade['president']])
+      record.append(seats[trade['bum']])
+      record += _mask_bytes(hand_class.mask_of(list(trade['given'])))
+      record += _mask_bytes(hand_class.mask_of(list(trade['received'])))
+
+    record += _NUM_TURNS.pack(len(game_round['turns']))
+
+    for seat, move_mask in game_round['turns']:
+      if move_mask:
+        record.append(seat | PLAYED_FLAG)
+        record += _mask_bytes(move_mask)
+      else:
+        record.append(seat)
+
+    for name in game_round['finishing_order']:
+      record.append(seats[name])
+
+  return bytes(record)
+
+class GameRecord:
+  '''Game read from a log, decoded on first access to its contents'''
+
+  def __init__(self, data):
+    self.data = data
+    self._decoded = None
+
+  def __decode(self):
+    '''Decode the whole record into a dictionary shaped like the results of engine.Game.play (with masks instead of cards)'''
+
+    data = self.data
+    offset = 1
+    seed = None
+    decks = 1
+
+    if data[0] & SEED_FLAG:
+      seed = _SEED.unpack_from(data, offset)[0]
+      offset += _SEED.size
+
+    if data[0] & DECKS_FLAG:
+      decks = data[offset]
+      offset += 1
+
+    num_mask_bytes = mask_bytes(decks)
+
+    num_players = data[offset]
+    offset += 1
+    names = []
+
+    for counter in range(num_players):
+      length = data[offset]
+      names.append(data[offset + 1:offset + 1 + length].decode('utf-8'))
+      offset += 1 + length
+
+    num_rounds = data[offset]
+    offset += 1
+    rounds = []
+
+    for round_number in range(1, num_rounds + 1):
+      seating = [names[index] for index in data[offset:offset + num_players]]
+      offset += num_players
+
+      hands = []
+
+      for seat in range(num_players):
+        hands.append(int.from_bytes(data[offset:offset + num_mask_bytes], 'little'))
+        offset += num_mask_bytes
+
+      num_trades = data[offset]
+      offset += 1
+      trades = []
+
+      for counter in range(num_trades):
+        trades.append({
+          'president': seating[data[offset]],
+          'bum': seating[data[offset + 1]],
+          'given': int.from_bytes(data[offset + 2:offset + 2 + num_mask_bytes], 'little'),
+          'received': int.from_bytes(data[offset + 2 + num_mask_bytes:offset + 2 + 2 * num_mask_bytes], 'little')
+        })
+        offset += 2 + 2 * num_mask_bytes
+
+      num_turns = _NUM_TURNS.unpack_from(data, offset)[0]
+      offset += _NUM_TURNS.size
+      turns = []
+
+      for counter in range(num_turns):
+        header = data[offset]
+        offset += 1
+
+        if header & PLAYED_FLAG:
+          turns.append((header & ~PLAYED_FLAG, int.from_bytes(data[offset:offset + num_mask_bytes], 'little')))
+          offset += num_mask_bytes
+        else:
+          turns.append((header, 0))
+
+      finishing_order = [seating[seat] for seat in data[offset:offset + num_players]]
+      offset += num_players
+
+      rounds.append({'round': round_number, 'seating': seating, 'hands': hands, 'trades': trades, 'turns': turns, 'finishing_order': finishing_order})
+
+    return {'seed': seed, 'decks': decks, 'players': names, 'rounds': rounds}
+
+  def decoded(self):
+    '''Return the contents of the record as a dictionary (see engine.Game.play), with every card set as a mask'''
+
+    if self._decoded == None:
+      self._decoded = self.__decode()
+
+    return self._decoded
+
+  @property
+  def seed(self):
+    if not self.data[0] & SEED_FLAG: return None
+    return _SEED.unpack_from(self.data, 1)[0]
+
+  @property
+  def decks(self):
+    if not self.data[0] & DECKS_FLAG: return 1
+    return self.data[1 + (_SEED.size if self.data[0] & SEED_FLAG else 0)]
+
+  @property
+  def players(self):
+    return self.decoded()['players']
+
+  @property
+  def rounds(self):
+    return self.decoded()['rounds']
+
+  def replay(self, round_number = 1):
+    '''
+    Return a round of the game with its cards as Hands and Moves, as a dictionary of:
+    'hands' -- hand dealt to each player (before trading), by name
+    'trades' -- (president, bum, cards given, cards received) for each trade
+    'turns' -- (name, move) for each turn, where move is "*" for a pass
+    'finishing_order' -- names of the players from first to last
+    '''
+
+    game_round = self.rounds[round_number - 1]
+    seating = game_round['seating']
+    hand_class = multi_deck.hand_class(self.decks)
+    move_class = multi_deck.move_class(self.decks)
+
+    return {
+      'hands': {seating[seat]: hand_class.from_mask(hand_mask) for seat, hand_mask in enumerate(game_round['hands'])},
+      'trades': [(trade['president'], trade['bum'], hand_class.from_mask(trade['given']), hand_class.from_mask(trade['received'])) for trade in game_round['trades']],
+      'turns': [(seating[seat], move_class.from_mask(move_mask) if move_mask else "*") for seat, move_mask in game_round['turns']],
+      'finishing_order': game_round['finishing_order'][:]
+    }
+
+class GameLogWriter:
+  '''Appends games to a log file, which is created (with its header) if it does not exist'''
+
+  def __init__(self, path):
+    self.file = open(path, 'ab')
+
+    if self.file.tell() == 0:
+      self.file.write(MAGIC)
+
+  def write(self, results):
+    '''Append a game, given its results (see engine.Game.play)'''
+    self.write_record(encode_game(results))
+
+  def write_record(self, record):
+    '''Append an already encoded game (see encode_game)'''
+
+    self.file.write(_LENGTH.pack(len(record)))
+    self.file.write(record)
+
+  def flush(self):
+    self.file.flush()
+
+  def close(self):
+    self.file.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+class GameLogReader:
+  '''Iterates through the games of a log file one at a time, as GameRecords, without loading the whole file'''
+
+  def __init__(self, path):
+    self.path = path
+
+  def __iter__(self):
+    with open(self.path, 'rb') as file:
+      if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError(self.path + " is not a game log.")
+
+      while True:
+        length_bytes = file.read(_LENGTH.size)
+        if len(length_bytes) < _LENGTH.size: return
+
+        length = _LENGTH.unpack(length_bytes)[0]
+        data = file.read(length)
+        if len(data) < length: return   # Game cut short while being written
+
+        yield GameRecord(data)
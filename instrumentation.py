@@ -0,0 +1,153 @@
+'''
+Opt-in instrumentation of games: turn and trade latencies, move generation, Move objects and time spent on output.
+
+Nothing is recorded until start() is called. The game code only checks whether the module-level
+recorder is set before recording (a single comparison per turn when disabled), and Move construction
+and comparisons are only counted while recording, through wrappers that stop() removes again.
+
+Summaries are plain dictionaries, with latencies kept as histograms rather than every sample,
+so summaries of many games (e.g. a tournament, played across processes) can be merged exactly.
+'''
+
+import functools
+import card
+
+# Recorder in use, if any
+recorder = None
+
+# Move methods counted while recording, by counter name
+COUNTED_MOVE_METHODS = {'__init__': 'moves_constructed', '__eq__': 'move_comparisons', '__lt__': 'move_comparisons', '__gt__': 'move_comparisons'}
+
+# Latencies are counted in buckets of microseconds: bucket i holds latencies below 2**i microseconds
+NUM_BUCKETS = 40
+
+def bucket_of(seconds):
+  '''Return the histogram bucket of a latency in seconds'''
+  return min(int(seconds * 1e6).bit_length(), NUM_BUCKETS - 1)
+
+class Recorder:
+  '''
+  Counters and latency histograms of the game code run while it is the recorder in use
+
+  budgets -- latency budget in seconds of some timings (e.g. {'turn/AI': 0.05}), whose overruns are counted
+  '''
+
+  def __init__(self, budgets = None):
+    self.budgets = budgets if budgets != None else {}
+    self.counters = {}
+    self.timings = {}   # Timing name -> {'count', 'total', 'max', 'over_budget', 'histogram'}
+
+  def count(self, name, amount = 1):
+    '''Add amount to a counter'''
+    self.counters[name] = self.counters.get(name, 0) + amount
+
+  def observe(self, name, seconds):
+    '''Record a latency, in seconds'''
+
+    if name not in self.timings:
+      self.timings[name] = {'count': 0, 'total': 0.0, 'max': 0.0, 'over_budget': 0, 'histogram': [0] * NUM_BUCKETS}
+
+    timing = self.timings[name]
+    timing['count'] += 1
+    timing['total'] += seconds
+    timing['histogram'][bucket_of(seconds)] += 1
+
+    if seconds > timing['max']: timing['max'] = seconds
+    if name in self.budgets and seconds > self.budgets[name]: timing['over_budget'] += 1
+
+  def summary(self):
+    '''Return everything recorded as a dictionary (see merge_summaries and print_summary)'''
+
+    return {
+      'counters': dict(self.counters),
+      'timings': {name: dict(timing, histogram=timing['histogram'][:]) for name, timing in self.timings.items()}
+    }
+
+def start(budgets = None):
+  '''Start recording with a new recorder, and return it'''
+
+  global recorder
+
+  if recorder == None:
+    for method_name, counter_name in COUNTED_MOVE_METHODS.items():
+      setattr(card.Move, method_name, _counted(getattr(card.Move, method_name), counter_name))
+
+  recorder = Recorder(budgets)
+
+  return recorder
+
+def stop():
+  '''Stop recording, and return the recorder that was in use'''
+
+  global recorder
+
+  if recorder != None:
+    for method_name in COUNTED_MOVE_METHODS:
+      setattr(card.Move, method_name, getattr(card.Move, method_name).__wrapped__)
+
+  stopped, recorder = recorder, None
+
+  return stopped
+
+def _counted(method, counter_name):
+  '''Return a wrapper of method that counts its calls in the counter of the recorder in use'''
+
+  @functools.wraps(method)
+  def wrapper(*args, **kwargs):
+    recorder.count(counter_name)
+    return method(*args, **kwargs)
+
+  return wrapper
+
+def merge_summaries(*summaries):
+  '''Return the summary of everything recorded in the given summaries (e.g. of every game of a tournament)'''
+
+  merged = {'counters': {}, 'timings': {}}
+
+  for summary in summaries:
+    for name, value in summary['counters'].items():
+      merged['counters'][name] = merged['counters'].get(name, 0) + value
+
+    for name, timing in summary['timings'].items():
+      if name not in merged['timings']:
+        merged['timings'][name] = dict(timing, histogram=timing['histogram'][:])
+        continue
+
+      merged_timing = merged['timings'][name]
+
+      for key in ['count', 'total', 'over_budget']:
+        merged_timing[key] += timing[key]
+
+      merged_timing['max'] = max(merged_timing['max'], timing['max'])
+      merged_timing['histogram'] = [count1 + count2 for count1, count2 in zip(merged_timing['histogram'], timing['histogram'])]
+
+  return merged
+
+def percentile(timing, fraction):
+  '''Return an upper bound, in seconds, on the given percentile (from 0 to 1) of a timing in a summary'''
+
+  target = fraction * timing['count']
+  seen = 0
+
+  for bucket, count in enumerate(timing['histogram']):
+    seen += count
+    if count and seen >= target:
+      return min((1 << bucket) / 1e6, timing['max'])
+
+  return timing['max']
+
+def print_summary(summary):
+  '''Output a summary as tables of timings and counters'''
+
+  print("Timing".ljust(24) + "count".rjust(8) + "mean".rjust(12) + "p50".rjust(12) + "p95".rjust(12) + "max".rjust(12) + "over budget".rjust(13))
+
+  for name, timing in sorted(summary['timings'].items()):
+    mean = timing['total'] / timing['count'] if timing['count'] else 0.0
+    milliseconds = [mean * 1e3, percentile(timing, 0.5) * 1e3, percentile(timing, 0.95) * 1e3, timing['max'] * 1e3]
+
+    print(name.ljust(24) + str(timing['count']).rjust(8) + "".join(("%.3f ms" % value).rjust(12) for value in milliseconds) + str(timing['over_budget']).rjust(13))
+
+  print()
+
+  for name, value in sorted(summary['counters'].items()):
+    print(name.ljust(40) + str(value).rjust(12))
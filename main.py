@@ -1,6 +1,9 @@
 import base_game as b
+import user_interface as ui
 
 b.TEST = False            # Prints extra information to console if true
+b.INSTRUMENT = False      # Records and prints turn latencies, move generation and output time if true
+ui.set_renderer(ui.TerminalRenderer(delay=True))   # Output backend: delay=False skips pauses, ui.NullRenderer() skips all output
 continue_playing = True   # Boolean that controls whether a new game restarts after game completes
 
 while continue_playing:
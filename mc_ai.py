@@ -0,0 +1,197 @@
+'''
+AI that searches within a time budget by sampling the hidden hands of its opponents (information set Monte Carlo).
+
+For every sample, the unseen cards (those not in its hand, not played this round and not left over after
+dealing) are dealt at random to the opponents, in the numbers they hold, and the rest of the round is played
+out with a fast rollout policy over card masks. Candidate moves are sampled by UCB1 until the deadline, and
+the move with the best average finishing position so far is played, so more time gives better estimates.
+'''
+
+import math
+import random
+import time
+import card_mask
+import move_gen
+from ai import AI
+
+def lowest_move_above(hand_mask, previous_key):
+  '''Return (strength key, mask) of the lowest move in the hand beating the move with strength key previous_key, or None'''
+
+  previous_type_index = previous_key >> card_mask.TYPE_SHIFT
+  previous_primary = (previous_key >> card_mask.PRIMARY_SHIFT) & 0x3F
+  move_size = card_mask.MOVE_SIZES[previous_type_index]
+
+  for hand_type_index in range(previous_type_index, card_mask.STRAIGHT_FLUSH + 1):
+    if card_mask.MOVE_SIZES[hand_type_index] != move_size: continue
+
+    min_primary = previous_primary if hand_type_index == previous_type_index else 0
+
+    for mask in move_gen.iter_moves(hand_mask, hand_type_index, min_primary=min_primary):
+      key = card_mask.strength_key(mask, hand_type_index)
+      if key > previous_key:
+        return key, mask
+
+  return None
+
+def lowest_move_of_type(hand_mask, hand_type_index):
+  '''Return (strength key, mask) of the lowest move of a hand type in the hand, or None'''
+
+  for mask in move_gen.iter_moves(hand_mask, hand_type_index):
+    return card_mask.strength_key(mask, hand_type_index), mask
+
+  return None
+
+class MonteCarloAI(AI):
+  '''
+  AI that picks each move by playing out sampled deals within time_budget seconds (see mc_ai).
+  Outside of a headless game (see engine), where it cannot see the round, or with several decks, it plays like AI.
+  '''
+
+  # Hand types tried, in random order, when leading a trick during rollouts (singles being the fallback)
+  LEAD_TYPES = [card_mask.PAIR, card_mask.THREE_OF_A_KIND, card_mask.STRAIGHT, card_mask.FULL_HOUSE]
+
+  def __init__(self, name, time_budget = 0.05, follow_probability = 0.8, exploration = 0.7, seed = None):
+    super().__init__(name)
+    self.time_budget = time_budget
+    self.follow_probability = follow_probability
+    self.exploration = exploration
+    self.random = random.Random(seed)
+    self.last_search = None   # Statistics of the latest search
+
+  def ai_move(self, previous_move = "*", lowest_card = None):
+    '''Return the move with the best average finishing position found within the time budget'''
+
+    # Rollouts work on single-deck masks, so games with several decks (see multi_deck) are played like AI
+    if self.game == None or self.game.decks > 1:
+      return super().ai_move(previous_move, lowest_card)
+
+    self._get_move_parameters(previous_move, lowest_card)
+
+    if self._last_choice <= 1:
+      return self._get_move(1)
+
+    return self._get_move(self.search(time.perf_counter() + self.time_budget))
+
+  def search(self, deadline):
+    '''Sample rollouts of every move choice (see _get_move_parameters) until the deadline, and return the best choice'''
+
+    observation = self.game.observation(self)
+    num_choices = self._last_choice
+    totals = [0.0] * num_choices
+    visits = [0] * num_choices
+    rollouts = 0
+
+    while time.perf_counter() < deadline:
+      if rollouts < num_choices:
+        choice_index = rollouts
+      else:
+        log_rollouts = math.log(rollouts)
+        choice_index = max(range(num_choices), key=lambda index: totals[index] / visits[index] + self.exploration * math.sqrt(log_rollouts / visits[index]))
+
+      totals[choice_index] += self.__play_out(choice_index + 1, observation)
+      visits[choice_index] += 1
+      rollouts += 1
+
+    self.last_search = {'rollouts': rollouts, 'visits': visits, 'totals': totals}
+
+    if rollouts == 0:
+      return 1
+
+    # Choices that were never sampled are ranked last
+    return max(range(num_choices), key=lambda index: totals[index] / visits[index] if visits[index] else -1.0) + 1
+
+  def __sample_hands(self, observation):
+    '''Return the masks of every player's hand, dealing the cards this player cannot see at random to the opponents'''
+
+    seat = observation['seat']
+    own_mask = self.hand.to_mask()
+    unseen = card_mask.ordinals(card_mask.FULL_DECK & ~own_mask & ~observation['played_mask'] & ~observation['remainder_mask'])
+    self.random.shuffle(unseen)
+
+    hands = []
+    dealt = 0
+
+    for other_seat in range(len(observation['hand_sizes'])):
+      if other_seat == seat:
+        hands.append(own_mask)
+        continue
+
+      hand_mask = 0
+      for card_ordinal in unseen[dealt:dealt + observation['hand_sizes'][other_seat]]:
+        hand_mask |= 1 << card_ordinal
+
+      dealt += observation['hand_sizes'][other_seat]
+      hands.append(hand_mask)
+
+    return hands
+
+  def __rollout_move(self, hand_mask, previous_key):
+    '''Return (strength key, mask) of the move played by the rollout policy, or None to pass'''
+
+    if previous_key != None:
+      if self.random.random() > self.follow_probability:
+        return None
+      return lowest_move_above(hand_mask, previous_key)
+
+    lead_types = self.LEAD_TYPES[:]
+    self.random.shuffle(lead_types)
+
+    for hand_type_index in lead_types[:2]:
+      move = lowest_move_of_type(hand_mask, hand_type_index)
+      if move != None:
+        return move
+
+    return lowest_move_of_type(hand_mask, card_mask.ONE_CARD)
+
+  def __play_out(self, move_choice, observation):
+    '''Play out the rest of the round after making the given move choice, and return a reward from 0 (last) to 1 (first)'''
+
+    hands = self.__sample_hands(observation)
+    num_players = len(hands)
+    seat = observation['seat']
+    finished = observation['finished'][:]
+    num_finished = sum(finished)
+
+    previous_move = observation['previous_move']
+    previous_key = previous_move.key if previous_move != "*" else None
+    num_passes = observation['num_passes']
+
+    position = None
+    turn_seat = seat
+    first_turn = True
+
+    while position == None:
+      if finished[turn_seat]:
+        turn_seat = (turn_seat + 1) % num_players
+        continue
+
+      if first_turn:
+        first_turn = False
+        move = None
+
+        if not (move_choice == self._last_choice and self._can_pass):
+          move = (self._valid_moves.keys[move_choice - 1], self._valid_moves.masks[move_choice - 1])
+      else:
+        move = self.__rollout_move(hands[turn_seat], previous_key)
+
+      if move == None:
+        num_passes += 1
+        if num_passes == num_players - 1:
+          previous_key = None
+      else:
+        previous_key, move_mask = move
+        num_passes = 0
+        hands[turn_seat] &= ~move_mask
+
+        if hands[turn_seat] == 0:
+          finished[turn_seat] = True
+          num_finished += 1
+
+          if turn_seat == seat:
+            position = num_finished
+          elif num_finished == num_players - 1:
+            position = num_players
+
+      turn_seat = (turn_seat + 1) % num_players
+
+    return (num_players - position) / (num_players - 1)
@@ -0,0 +1,77 @@
+'''Size-bounded least-recently-used cache for the results of move generation.'''
+
+from collections import OrderedDict
+
+class MoveCache:
+  '''
+  Maps keys to lists of moves, keeping at most max_size entries and evicting the least recently used one first.
+  Lists are stored as tuples and copied on every read, so callers cannot change what is cached.
+  Read-only containers (e.g. move_list.MoveList, whose columns can only be read) are stored and returned as they are.
+  A max_size of 0 disables caching.
+  '''
+
+  def __init__(self, max_size = 4096):
+    self.max_size = max_size
+    self.__entries = OrderedDict()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def get(self, key):
+    '''Return a copy of the moves cached under key (or the moves themselves if read-only), or None if there are none'''
+
+    moves = self.__entries.get(key)
+
+    if moves == None:
+      self.misses += 1
+      return None
+
+    self.hits += 1
+    self.__entries.move_to_end(key)
+
+    return list(moves) if isinstance(moves, tuple) else moves
+
+  def put(self, key, moves):
+    '''Cache the moves under key'''
+
+    if self.max_size <= 0: return
+
+    self.__entries[key] = moves if getattr(moves, 'read_only', False) else tuple(moves)
+    self.__entries.move_to_end(key)
+    self.__evict()
+
+  def resize(self, max_size):
+    '''Change the maximum number of cached entries, evicting entries if needed'''
+
+    self.max_size = max_size
+    self.__evict()
+
+  def clear(self):
+    '''Remove every cached entry and reset the counters'''
+
+    self.__entries.clear()
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def stats(self):
+    '''Return the cache counters as a dictionary'''
+
+    lookups = self.hits + self.misses
+
+    return {
+      'size': len(self.__entries),
+      'max_size': self.max_size,
+      'hits': self.hits,
+      'misses': self.misses,
+      'evictions': self.evictions,
+      'hit_rate': self.hits / lookups if lookups else 0.0
+    }
+
+  def __evict(self):
+    while len(self.__entries) > max(self.max_size, 0):
+      self.__entries.popitem(last=False)
+      self.evictions += 1
+
+  def __len__(self):
+    return len(self.__entries)
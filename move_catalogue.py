@@ -0,0 +1,121 @@
+'''
+Live catalogue of every move in a hand, kept up to date as cards leave or join the hand.
+
+Whether a set of cards is a move depends only on those cards, so the moves of a smaller hand are
+exactly the moves of the larger hand that do not use any removed card. Removing cards therefore only
+drops the moves that contain them (found through a card-to-moves index), without regenerating anything,
+and adding cards only generates the moves that contain at least one of them.
+'''
+
+import operator
+import card_mask
+import move_gen
+import ranking
+
+# Strength key of a (strength key, mask) pair
+PAIR_KEY = operator.itemgetter(0)
+
+class MoveCatalogue:
+  '''Every move (as a strength key and a mask, see card_mask) of the hand represented by hand_mask'''
+
+  def __init__(self, hand_mask = 0):
+    self.hand_mask = 0
+    self.moves = {}   # Move mask -> strength key
+    self.card_moves = [set() for card_ordinal in range(card_mask.DECK_SIZE)]   # Card ordinal -> masks of the moves using it
+
+    self.add(hand_mask)
+
+  def add(self, mask):
+    '''Add cards to the hand, along with the new moves they make possible'''
+
+    new_cards = mask & ~self.hand_mask
+    if not new_cards: return
+
+    if not self.hand_mask:
+      # Every move of the hand is new
+      self.hand_mask = new_cards
+
+      for key, move_mask in move_gen.all_moves(new_cards):
+        self.__insert(key, move_mask)
+
+      return
+
+    self.hand_mask |= new_cards
+
+    for card_bit in card_mask.bits(new_cards):
+      for move_mask in move_gen.moves_with_card(self.hand_mask, card_bit):
+        # Moves with several new cards come up once for each of them
+        if move_mask not in self.moves:
+          self.__insert(card_mask.strength_key(move_mask), move_mask)
+
+  def __insert(self, key, move_mask):
+    '''Add a move to the catalogue and to the index of each of its cards'''
+
+    self.moves[move_mask] = key
+    for card_ordinal in card_mask.ordinals(move_mask):
+      self.card_moves[card_ordinal].add(move_mask)
+
+  def remove(self, mask):
+    '''Remove cards from the hand, along with the moves that use them'''
+
+    removed_cards = mask & self.hand_mask
+    self.hand_mask &= ~removed_cards
+
+    for card_ordinal in card_mask.ordinals(removed_cards):
+      for move_mask in self.card_moves[card_ordinal]:
+        del self.moves[move_mask]
+
+        for other_ordinal in card_mask.ordinals(move_mask & ~(1 << card_ordinal)):
+          self.card_moves[other_ordinal].discard(move_mask)
+
+      self.card_moves[card_ordinal] = set()
+
+  def sync(self, hand_mask):
+    '''Bring the catalogue up to date with the cards now in the hand'''
+
+    self.remove(self.hand_mask & ~hand_mask)
+    self.add(hand_mask)
+
+  def select(self, previous_key = None, lowest_bit = 0, option = 'default', excluded = 0):
+    '''
+    Return the (strength key, mask) pairs of the valid moves, in the same order as Hand.get_valid_moves
+
+    previous_key -- strength key of the previous move, if there is one
+    lowest_bit -- bit of the card every move must contain (first move of the game), if any
+    option -- 'default', 'highest' or 'lowest' (see Hand.get_valid_moves)
+    excluded -- mask of cards to leave out, to look at the moves of what remains of the hand after playing them
+    '''
+
+    if lowest_bit: option = 'default'
+
+    previous_size = None
+    if previous_key != None:
+      previous_size = card_mask.MOVE_SIZES[previous_key >> card_mask.TYPE_SHIFT]
+
+    selected = []
+
+    for move_mask, key in self.moves.items():
+      if move_mask & excluded: continue
+      if lowest_bit and not move_mask & lowest_bit: continue
+      if previous_size != None and card_mask.MOVE_SIZES[key >> card_mask.TYPE_SHIFT] != previous_size: continue
+
+      selected.append((key, move_mask))
+
+    if option != 'default':
+      best_moves = {}
+
+      for key, move_mask in selected:
+        hand_type_index = key >> card_mask.TYPE_SHIFT
+
+        if hand_type_index not in best_moves or (option == 'highest' and key > best_moves[hand_type_index][0]) or (option == 'lowest' and key < best_moves[hand_type_index][0]):
+          best_moves[hand_type_index] = (key, move_mask)
+
+      selected = list(best_moves.values())
+
+    if previous_key != None:
+      return ranking.sort_by_key((move for move in selected if move[0] > previous_key), key=PAIR_KEY)
+
+    return ranking.by_hand_type(selected, key=PAIR_KEY)
+
+  def __len__(self):
+    return len(self.moves)
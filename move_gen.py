@@ -0,0 +1,427 @@
+'''
+Move generation over card bitmasks (see card_mask).
+
+Five-card moves are built category by category from the value and suit buckets of the hand,
+so the cost is bounded by the number of moves produced instead of the C(n, 5) combinations
+of the hand, and no scattered combination is ever looked at.
+'''
+
+import itertools
+import card_mask
+from card_mask import NUM_SUITS, VALUE_MASKS, SUIT_MASKS, STRAIGHT_STARTS
+
+def value_buckets(hand_mask):
+  '''Return a list with the single-card masks of each value (index = value - 3) in the hand'''
+  return [card_mask.bits(hand_mask & value_mask) for value_mask in VALUE_MASKS]
+
+def straight_flushes(hand_mask):
+  '''Return the masks of all straight flushes in the hand'''
+
+  moves = []
+
+  for start in STRAIGHT_STARTS:
+    window = 0
+    for value_mask in VALUE_MASKS[start:start + 5]:
+      window |= value_mask
+
+    for suit_mask in SUIT_MASKS:
+      straight_flush = window & suit_mask
+      if hand_mask & straight_flush == straight_flush:
+        moves.append(straight_flush)
+
+  return moves
+
+def straights(hand_mask, buckets = None):
+  '''Return the masks of all straights in the hand that are not straight flushes'''
+
+  if buckets == None: buckets = value_buckets(hand_mask)
+
+  moves = []
+
+  for start in STRAIGHT_STARTS:
+    window_buckets = buckets[start:start + 5]
+    if not all(window_buckets): continue
+
+    for combo in itertools.product(*window_buckets):
+      straight = sum(combo)
+      # Leaves out the straight flushes, whose cards all share the suit of the lowest card
+      if straight & ~SUIT_MASKS[card_mask.suit_of(combo[0].bit_length() - 1)]:
+        moves.append(straight)
+
+  return moves
+
+def flushes(hand_mask):
+  '''Return the masks of all flushes in the hand that are not straight flushes'''
+
+  moves = []
+
+  for suit_mask in SUIT_MASKS:
+    suit_bits = card_mask.bits(hand_mask & suit_mask)
+    if len(suit_bits) < 5: continue
+
+    for combo in itertools.combinations(suit_bits, 5):
+      flush = sum(combo)
+      low_index = (combo[0].bit_length() - 1) // NUM_SUITS
+      # Skips the straight flushes, whose five values are consecutive
+      if low_index in STRAIGHT_STARTS and (combo[4].bit_length() - 1) // NUM_SUITS - low_index == 4:
+        continue
+      moves.append(flush)
+
+  return moves
+
+def full_houses(hand_mask, buckets = None):
+  '''Return the masks of all full houses in the hand'''
+
+  if buckets == None: buckets = value_buckets(hand_mask)
+
+  pairs = []
+  triples = []
+
+  for index in range(len(buckets)):
+    pairs.append([sum(combo) for combo in itertools.combinations(buckets[index], 2)])
+    triples.append([sum(combo) for combo in itertools.combinations(buckets[index], 3)])
+
+  moves = []
+
+  for triple_index in range(len(buckets)):
+    for pair_index in range(len(buckets)):
+      if triple_index == pair_index: continue
+
+      for triple in triples[triple_index]:
+        for pair in pairs[pair_index]:
+          moves.append(triple | pair)
+
+  return moves
+
+def four_of_a_kind_plus_ones(hand_mask):
+  '''Return the masks of all four-of-a-kind plus one moves in the hand'''
+
+  moves = []
+
+  for value_mask in VALUE_MASKS:
+    if hand_mask & value_mask != value_mask: continue
+
+    for kicker in card_mask.bits(hand_mask & ~value_mask):
+      moves.append(value_mask | kicker)
+
+  return moves
+
+def five_card_moves(hand_mask):
+  '''Return (hand type index, mask) pairs for every five-card move in the hand'''
+
+  buckets = value_buckets(hand_mask)
+  moves = []
+
+  for hand_type_index, masks in [
+    (card_mask.STRAIGHT, straights(hand_mask, buckets)),
+    (card_mask.FLUSH, flushes(hand_mask)),
+    (card_mask.FULL_HOUSE, full_houses(hand_mask, buckets)),
+    (card_mask.FOUR_OF_A_KIND_PLUS_ONE, four_of_a_kind_plus_ones(hand_mask)),
+    (card_mask.STRAIGHT_FLUSH, straight_flushes(hand_mask))
+  ]:
+    for mask in masks:
+      moves.append((hand_type_index, mask))
+
+  return moves
+
+def n_of_a_kind_moves(hand_mask, move_size):
+  '''Return the masks of all moves made of move_size cards of the same value, in ascending order'''
+
+  moves = []
+
+  for value_mask in VALUE_MASKS:
+    value_bits = card_mask.bits(hand_mask & value_mask)
+    if len(value_bits) < move_size: continue
+
+    for combo in itertools.combinations(value_bits, move_size):
+      moves.append(sum(combo))
+
+  return moves
+
+def all_moves(hand_mask):
+  '''Return (strength key, mask) pairs for every move in the hand'''
+
+  moves = []
+
+  for move_size in range(1, 5):
+    for mask in n_of_a_kind_moves(hand_mask, move_size):
+      moves.append((card_mask.strength_key(mask, move_size + 1), mask))
+
+  for hand_type_index, mask in five_card_moves(hand_mask):
+    moves.append((card_mask.strength_key(mask, hand_type_index), mask))
+
+  return moves
+
+# Lazy generation: each generator below yields the masks of one hand type in ascending order of
+# strength key (descending if reverse), one group of moves sharing a primary card (see
+# card_mask.primary_card) at a time. If required is set, only moves containing that card are made,
+# and groups whose primary card is below the ordinal min_primary are skipped without being built.
+
+def _ordered(items, reverse):
+  return reversed(items) if reverse else items
+
+def _at_least(min_primary):
+  '''Return the mask of every card from the ordinal min_primary up'''
+  return card_mask.FULL_DECK & ~((1 << min_primary) - 1)
+
+def iter_singles(hand_mask, required = 0, reverse = False, min_primary = 0):
+  '''Yield the masks of all single card moves'''
+
+  hand_mask &= _at_least(min_primary)
+
+  if required:
+    if hand_mask & required: yield required
+    return
+
+  yield from _ordered(card_mask.bits(hand_mask), reverse)
+
+def iter_n_of_a_kind(hand_mask, move_size, required = 0, reverse = False, min_primary = 0):
+  '''Yield the masks of all moves made of move_size cards of the same value'''
+
+  value_masks = VALUE_MASKS[min_primary // NUM_SUITS:]
+
+  if required:
+    value_masks = [value_mask for value_mask in value_masks if value_mask & required]
+
+  for value_mask in _ordered(value_masks, reverse):
+    value_bits = card_mask.bits(hand_mask & value_mask)
+    if len(value_bits) < move_size: continue
+
+    # Combinations of ascending cards come out ordered by lowest card, then by mask
+    combos = [sum(combo) for combo in itertools.combinations(value_bits, move_size)]
+
+    for mask in _ordered(combos, reverse):
+      if (not required or mask & required) and card_mask.lowest(mask) >= min_primary:
+        yield mask
+
+def iter_straights(hand_mask, required = 0, reverse = False, min_primary = 0):
+  '''Yield the masks of all straights that are not straight flushes'''
+
+  buckets = value_buckets(hand_mask)
+
+  if required:
+    required_index = (required.bit_length() - 1) // NUM_SUITS
+    buckets[required_index] = [required] if hand_mask & required else []
+
+  for start in _ordered(STRAIGHT_STARTS, reverse):
+    if required and not start <= required_index < start + 5: continue
+    if (start + 5) * NUM_SUITS - 1 < min_primary: continue
+
+    window_buckets = buckets[start:start + 5]
+    if not all(window_buckets): continue
+
+    for top in _ordered(window_buckets[4], reverse):
+      if top.bit_length() - 1 < min_primary: continue
+
+      top_suit_mask = SUIT_MASKS[card_mask.suit_of(top.bit_length() - 1)]
+      group = []
+
+      for combo in itertools.product(*window_buckets[:4]):
+        straight = sum(combo) | top
+        if straight & ~top_suit_mask:
+          group.append(straight)
+
+      yield from sorted(group, reverse=reverse)
+
+def iter_flushes(hand_mask, required = 0, reverse = False, min_primary = 0):
+  '''Yield the masks of all flushes that are not straight flushes'''
+
+  for top in _ordered(card_mask.bits(hand_mask & _at_least(min_primary)), reverse):
+    top_ordinal = top.bit_length() - 1
+    suit_mask = SUIT_MASKS[card_mask.suit_of(top_ordinal)]
+
+    if required and (not required & suit_mask or required > top): continue
+
+    lower_bits = card_mask.bits(hand_mask & suit_mask & (top - 1))
+    if len(lower_bits) < 4: continue
+
+    top_index = top_ordinal // NUM_SUITS
+    group = []
+
+    for combo in itertools.combinations(lower_bits, 4):
+      flush = sum(combo) | top
+      if required and not flush & required: continue
+
+      low_index = (combo[0].bit_length() - 1) // NUM_SUITS
+      if low_index in STRAIGHT_STARTS and top_index - low_index == 4: continue
+
+      group.append(flush)
+
+    yield from sorted(group, reverse=reverse)
+
+def iter_full_houses(hand_mask, required = 0, reverse = False, min_primary = 0):
+  '''Yield the masks of all full houses'''
+
+  pairs = []
+
+  for value_mask in VALUE_MASKS:
+    pairs.append([sum(combo) for combo in itertools.combinations(card_mask.bits(hand_mask & value_mask), 2)])
+
+  for top in _ordered(card_mask.bits(hand_mask & _at_least(min_primary)), reverse):
+    top_index = (top.bit_length() - 1) // NUM_SUITS
+    lower_bits = card_mask.bits(hand_mask & VALUE_MASKS[top_index] & (top - 1))
+    if len(lower_bits) < 2: continue
+
+    triples = [sum(combo) | top for combo in itertools.combinations(lower_bits, 2)]
+    group = []
+
+    for pair_index in range(len(pairs)):
+      if pair_index == top_index: continue
+
+      for pair in pairs[pair_index]:
+        for triple in triples:
+          if not required or (triple | pair) & required:
+            group.append(triple | pair)
+
+    yield from sorted(group, reverse=reverse)
+
+def iter_four_of_a_kind_plus_ones(hand_mask, required = 0, reverse = False, min_primary = 0):
+  '''Yield the masks of all four-of-a-kind plus one moves'''
+
+  for value_mask in _ordered(VALUE_MASKS, reverse):
+    if hand_mask & value_mask != value_mask or value_mask.bit_length() - 1 < min_primary: continue
+
+    kickers = card_mask.bits(hand_mask & ~value_mask)
+
+    if required and not required & value_mask:
+      kickers = [kicker for kicker in kickers if kicker == required]
+
+    for kicker in _ordered(kickers, reverse):
+      yield value_mask | kicker
+
+def iter_straight_flushes(hand_mask, required = 0, reverse = False, min_primary = 0):
+  '''Yield the masks of all straight flushes'''
+
+  for start in _ordered(STRAIGHT_STARTS, reverse):
+    if (start + 5) * NUM_SUITS - 1 < min_primary: continue
+
+    window = 0
+    for value_mask in VALUE_MASKS[start:start + 5]:
+      window |= value_mask
+
+    for suit_mask in _ordered(SUIT_MASKS, reverse):
+      straight_flush = window & suit_mask
+      if hand_mask & straight_flush == straight_flush and (not required or straight_flush & required) and straight_flush.bit_length() - 1 >= min_primary:
+        yield straight_flush
+
+def iter_moves(hand_mask, hand_type_index, required = 0, reverse = False, min_primary = 0):
+  '''Yield the masks of all moves of one hand type, in ascending order of strength key (descending if reverse)'''
+
+  if card_mask.ONE_CARD < hand_type_index <= card_mask.FOUR_OF_A_KIND:
+    return iter_n_of_a_kind(hand_mask, hand_type_index - 1, required, reverse, min_primary)
+
+  return _TYPE_GENERATORS[hand_type_index](hand_mask, required, reverse, min_primary)
+
+_TYPE_GENERATORS = {
+  card_mask.ONE_CARD: iter_singles,
+  card_mask.STRAIGHT: iter_straights,
+  card_mask.FLUSH: iter_flushes,
+  card_mask.FULL_HOUSE: iter_full_houses,
+  card_mask.FOUR_OF_A_KIND_PLUS_ONE: iter_four_of_a_kind_plus_ones,
+  card_mask.STRAIGHT_FLUSH: iter_straight_flushes
+}
+
+def moves_with_card(hand_mask, card_bit):
+  '''
+  Yield the masks of all moves in the hand that contain the card card_bit (the mask of a single card in the hand),
+  five-card moves first and in no particular order otherwise
+  '''
+
+  card_ordinal = card_bit.bit_length() - 1
+  value_index = card_ordinal // NUM_SUITS
+  value_mask = VALUE_MASKS[value_index]
+  same_value_bits = card_mask.bits(hand_mask & value_mask & ~card_bit)
+  buckets = value_buckets(hand_mask)
+  buckets[value_index] = [card_bit]
+
+  # Straights and straight flushes
+  for start in STRAIGHT_STARTS:
+    if start <= value_index < start + 5 and all(buckets[start:start + 5]):
+      for combo in itertools.product(*buckets[start:start + 5]):
+        yield sum(combo)
+
+  # Flushes, leaving out the straight flushes
+  suit_bits = card_mask.bits(hand_mask & SUIT_MASKS[card_mask.suit_of(card_ordinal)] & ~card_bit)
+
+  for combo in itertools.combinations(suit_bits, 4):
+    flush = sum(combo) | card_bit
+    low_index = card_mask.lowest(flush) // NUM_SUITS
+    if not (low_index in STRAIGHT_STARTS and card_mask.highest(flush) // NUM_SUITS - low_index == 4):
+      yield flush
+
+  # Full houses, with the card in the three or in the pair
+  for other_index in range(len(VALUE_MASKS)):
+    if other_index == value_index or len(buckets[other_index]) < 2: continue
+
+    for triple in itertools.combinations(same_value_bits, 2):
+      for pair in itertools.combinations(buckets[other_index], 2):
+        yield card_bit | sum(triple) | sum(pair)
+
+    for single in same_value_bits:
+      for triple in itertools.combinations(buckets[other_index], 3):
+        yield card_bit | single | sum(triple)
+
+  # Four-of-a-kind plus ones, with the card in the four or as the fifth card
+  if len(same_value_bits) == 3:
+    for kicker in card_mask.bits(hand_mask & ~value_mask):
+      yield value_mask | kicker
+
+  for other_index in range(len(VALUE_MASKS)):
+    if other_index != value_index and len(buckets[other_index]) == 4:
+      yield VALUE_MASKS[other_index] | card_bit
+
+  # Singles, pairs, three and four of a kinds
+  for move_size in range(len(same_value_bits), -1, -1):
+    for combo in itertools.combinations(same_value_bits, move_size):
+      yield card_bit | sum(combo)
+
+def _choose(n, k):
+  '''Return the number of ways to choose k cards out of n'''
+
+  if n < k: return 0
+
+  result = 1
+  for counter in range(k):
+    result = result * (n - counter) // (counter + 1)
+
+  return result
+
+def move_counts(hand_mask):
+  '''
+  Return the number of moves of each hand type (index = hand type index, see Move.HAND_TYPES) in the hand,
+  counted from its value and suit counts without generating any move
+  '''
+
+  counts = [0] * (card_mask.STRAIGHT_FLUSH + 1)
+  value_counts = card_mask.value_counts(hand_mask)
+  num_cards = sum(value_counts)
+
+  counts[card_mask.ONE_CARD] = num_cards
+
+  for move_size in range(2, 5):
+    counts[move_size + 1] = sum(_choose(count, move_size) for count in value_counts)
+
+  straight_flush_counts = [0] * NUM_SUITS
+  for straight_flush in straight_flushes(hand_mask):
+    straight_flush_counts[card_mask.suit_of(card_mask.lowest(straight_flush))] += 1
+
+  counts[card_mask.STRAIGHT_FLUSH] = sum(straight_flush_counts)
+
+  for start in STRAIGHT_STARTS:
+    window_moves = 1
+    for count in value_counts[start:start + 5]:
+      window_moves *= count
+    counts[card_mask.STRAIGHT] += window_moves
+
+  counts[card_mask.STRAIGHT] -= counts[card_mask.STRAIGHT_FLUSH]
+
+  for suit in range(NUM_SUITS):
+    counts[card_mask.FLUSH] += _choose(card_mask.size(hand_mask & SUIT_MASKS[suit]), 5) - straight_flush_counts[suit]
+
+  for count in value_counts:
+    counts[card_mask.FULL_HOUSE] += _choose(count, 3) * (counts[card_mask.PAIR] - _choose(count, 2))
+
+    if count == 4:
+      counts[card_mask.FOUR_OF_A_KIND_PLUS_ONE] += num_cards - 4
+
+  return counts
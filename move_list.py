@@ -0,0 +1,148 @@
+'''
+Packed list of moves, stored as parallel columns of card masks, strength keys and hand types (see card_mask).
+
+Large move sets (e.g. every move of a big hand) then take a few bytes per move instead of one object each,
+and can be sliced by hand type or size, or filtered against a previous move, with a pass over a column.
+A Move is only made when one is looked up by index or iterated over.
+
+A MoveList is read-only once made, so it can be shared, and cached without being copied (see move_cache):
+its columns are private, and only shown as read-only memoryviews.
+Masks and keys too wide for 64 bits (e.g. with several decks, see multi_deck) are kept in tuples instead.
+'''
+
+import itertools
+from array import array
+import card
+import card_mask
+
+class MoveList:
+  '''
+  Sequence of moves, read like a list of Moves (size, indexing, slicing, iteration and membership)
+
+  masks, keys -- card mask and strength key of each move, as a read-only memoryview of an array('Q') (or a tuple, see _column)
+  types -- hand type index of each move (see Move.HAND_TYPES), as a read-only memoryview of an array('B')
+  move_class -- class of the moves, which sets the layout of their masks and keys (card.Move if None)
+  '''
+
+  __slots__ = ('_masks', '_keys', '_types', 'move_class')
+
+  # Callers may keep a MoveList as it is instead of copying it (see move_cache)
+  read_only = True
+
+  def __init__(self, masks = (), keys = (), types = None, move_class = None):
+    self._masks = _column(masks)
+    self._keys = _column(keys)
+    self.move_class = move_class
+
+    if types == None:
+      type_shift = move_class.TYPE_SHIFT if move_class != None else card_mask.TYPE_SHIFT
+      types = (key >> type_shift for key in self._keys)
+
+    self._types = array('B', types)
+
+  @property
+  def masks(self):
+    return _read_only(self._masks)
+
+  @property
+  def keys(self):
+    return _read_only(self._keys)
+
+  @property
+  def types(self):
+    return _read_only(self._types)
+
+  @classmethod
+  def from_pairs(cls, pairs, move_class = None):
+    '''Return the list of the moves given as (strength key, mask) pairs (see move_catalogue.MoveCatalogue.select)'''
+
+    pairs = list(pairs)
+    if not pairs and cls is MoveList and move_class == None: return EMPTY
+
+    return cls([mask for key, mask in pairs], [key for key, mask in pairs], move_class=move_class)
+
+  @classmethod
+  def from_moves(cls, moves):
+    '''Return the list of the given Moves, which must all be of the same class'''
+
+    moves = list(moves)
+    if not moves and cls is MoveList: return EMPTY
+
+    move_class = type(moves[0]) if type(moves[0]) is not card.Move else None
+
+    return cls([move.mask for move in moves], [move.key for move in moves], move_class=move_class)
+
+  def of_type(self, hand_type_index):
+    '''Return the moves of one hand type (see Move.HAND_TYPES), in the same order'''
+    return self.__select(map(hand_type_index.__eq__, self._types))
+
+  def of_size(self, size):
+    '''Return the moves of size cards, in the same order'''
+
+    type_sizes = bytes(card_mask.MOVE_SIZES)
+
+    return self.__select(type_sizes[hand_type_index] == size for hand_type_index in self._types)
+
+  def above(self, previous_move):
+    '''Return the moves that can be played on previous_move (the moves of its size with a higher strength key), in the same order'''
+
+    same_size = self.of_size(previous_move.size())
+
+    return same_size.__select(map(previous_move.key.__lt__, same_size._keys))
+
+  def to_list(self):
+    '''Return the moves as a list of Moves'''
+    return list(self)
+
+  def index(self, move):
+    '''Return the index of move in the list, raising ValueError if it is not in it'''
+    return self._masks.index(move.mask)
+
+  def __select(self, flags):
+    '''Return the moves whose flag is true, in the same order'''
+
+    indices = list(itertools.compress(range(len(self._masks)), flags))
+
+    return MoveList(map(self._masks.__getitem__, indices), map(self._keys.__getitem__, indices), map(self._types.__getitem__, indices), self.move_class)
+
+  def __len__(self):
+    return len(self._masks)
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return MoveList(self._masks[index], self._keys[index], self._types[index], self.move_class)
+
+    return (self.move_class or card.Move).from_mask(self._masks[index], self._keys[index])
+
+  def __iter__(self):
+    return map((self.move_class or card.Move).from_mask, self._masks, self._keys)
+
+  def __contains__(self, move):
+    return getattr(move, 'mask', None) in self._masks
+
+  def __eq__(self, other):
+    if not isinstance(other, MoveList): return NotImplemented
+    return self._masks == other._masks and self._keys == other._keys
+
+  __hash__ = None
+
+  def __reduce__(self):
+    return (MoveList, (self._masks, self._keys, self._types, self.move_class))
+
+def _column(values):
+  '''Return a column of integers as an array('Q'), or as a tuple if some of them do not fit in 64 bits'''
+
+  if isinstance(values, array): return values
+  if not isinstance(values, list): values = list(values)
+
+  try:
+    return array('Q', values)
+  except OverflowError:
+    return tuple(values)
+
+def _read_only(column):
+  '''Return a view of a column that cannot be used to change it'''
+  return memoryview(column).toreadonly() if isinstance(column, array) else column
+
+# Shared list of no moves (e.g. when nothing beats the previous move), which is common enough not to make one each time
+EMPTY = MoveList()
@@ -0,0 +1,628 @@
+'''
+Games played with several decks (up to MAX_DECKS), for large tables: cards, hands and moves with copies of each card.
+
+With several decks, a hand is a multiset of the 52 cards, held as a count mask: instead of the single bit
+it has in card_mask, each card owns a field of FIELD_BITS bits, holding the number of copies of it. So:
+- union -- a + b
+- difference -- a - b (when b is part of a)
+- copies of a card -- copies(a, ordinal)
+- size -- size(a)
+Copies of a card are the same Card (see card.CARDS), so moves are multisets too: two moves that only differ
+by which copy of a card they use are the same move. Five cards take the highest hand type they make
+(e.g. three 5♠ and two 9♠ make a full house rather than a flush), and five cards of one value make no move.
+With one copy of each card, the moves, their hand types and their order are exactly those of a single deck.
+
+Moves are generated hand type by hand type from the number of copies of each card, and counted (see
+move_counts) from those numbers alone, so costs follow the number of moves and of distinct cards in the hand,
+never the number of combinations of its cards.
+'''
+
+import bisect
+import itertools
+import card
+import card_mask
+import move_list
+from card import Hand, Move, CARDS
+from card_mask import NUM_VALUES, NUM_SUITS, DECK_SIZE, MOVE_SIZES, STRAIGHT_STARTS
+from card_mask import EMPTY, SCATTERED, ONE_CARD, PAIR, FOUR_OF_A_KIND, STRAIGHT, FLUSH, FULL_HOUSE, FOUR_OF_A_KIND_PLUS_ONE, STRAIGHT_FLUSH
+from move_cache import MoveCache
+
+MAX_DECKS = 4
+
+FIELD_BITS = 4
+FIELD = (1 << FIELD_BITS) - 1
+MASK_BYTES = DECK_SIZE * FIELD_BITS // 8
+
+# UNITS[ordinal] is the count mask of one copy of the card
+UNITS = [1 << (FIELD_BITS * card_ordinal) for card_ordinal in range(DECK_SIZE)]
+
+# Count mask of one full deck
+FULL_DECK = sum(UNITS)
+
+# Layout of a strength key, as in card_mask, above the wider count mask
+PRIMARY_SHIFT = DECK_SIZE * FIELD_BITS
+TYPE_SHIFT = PRIMARY_SHIFT + 6
+MIN_VALID_KEY = ONE_CARD << TYPE_SHIFT
+
+# Number of copies held in the two fields of each byte of a count mask, and their sum
+_BYTE_FIELDS = [(byte & FIELD, byte >> FIELD_BITS) for byte in range(256)]
+_BYTE_SIZES = [low + high for low, high in _BYTE_FIELDS]
+
+def full_deck(decks = 1):
+  '''Return the count mask of decks full decks'''
+  return FULL_DECK * decks
+
+def field(card_ordinal):
+  '''Return the mask of the field holding the copies of a card, to test whether a count mask holds any'''
+  return FIELD << (FIELD_BITS * card_ordinal)
+
+def copies(mask, card_ordinal):
+  '''Return the number of copies of a card in the count mask'''
+  return (mask >> (FIELD_BITS * card_ordinal)) & FIELD
+
+def counts(mask):
+  '''Return a list with the number of copies of each card (index = ordinal) in the count mask'''
+  return list(itertools.chain.from_iterable(map(_BYTE_FIELDS.__getitem__, mask.to_bytes(MASK_BYTES, 'little'))))
+
+def size(mask):
+  '''Return the number of cards in the count mask'''
+  return sum(map(_BYTE_SIZES.__getitem__, mask.to_bytes(MASK_BYTES, 'little')))
+
+def lowest(mask):
+  '''Return the ordinal of the lowest card in the count mask, or None if it is empty'''
+  if mask == 0: return None
+  return ((mask & -mask).bit_length() - 1) // FIELD_BITS
+
+def highest(mask):
+  '''Return the ordinal of the highest card in the count mask, or None if it is empty'''
+  if mask == 0: return None
+  return (mask.bit_length() - 1) // FIELD_BITS
+
+def ordinals(mask):
+  '''Return the ordinals of all cards in the count mask, each as many times as it has copies, in ascending order'''
+  return [card_ordinal for card_ordinal, count in enumerate(counts(mask)) for copy in range(count)]
+
+def units(mask):
+  '''Return the count masks of all cards in the count mask, one per copy, in ascending order'''
+  return [UNITS[card_ordinal] for card_ordinal in ordinals(mask)]
+
+def from_cards(cards):
+  '''Return the count mask of a card or multi-deck move, or of a (possibly nested) list of them'''
+
+  if hasattr(cards, 'ordinal'):
+    return UNITS[cards.ordinal]
+  elif hasattr(cards, 'mask'):
+    return cards.mask
+  elif not isinstance(cards, list) and not isinstance(cards, tuple):
+    raise TypeError("Cannot convert non-card/non-list object to a mask")
+
+  return sum(from_cards(element) for element in cards)
+
+def from_single_deck(mask):
+  '''Return the count mask of the cards of a single-deck mask (see card_mask)'''
+  return sum(UNITS[card_ordinal] for card_ordinal in card_mask.ordinals(mask))
+
+def classify(mask):
+  '''Return the hand type index of the move represented by the count mask (see Move.get_type)'''
+
+  card_counts = counts(mask)
+  num_cards = sum(card_counts)
+
+  if num_cards == 0:
+    return EMPTY
+  elif num_cards > 5:
+    return SCATTERED
+
+  present = [card_ordinal for card_ordinal in range(DECK_SIZE) if card_counts[card_ordinal]]
+  value_indices = sorted({card_ordinal // NUM_SUITS for card_ordinal in present})
+
+  if num_cards <= 4:
+    return num_cards + 1 if len(value_indices) == 1 else SCATTERED
+
+  is_flush = len({card_ordinal % NUM_SUITS for card_ordinal in present}) == 1
+
+  if len(value_indices) == 5:
+    if value_indices[0] in STRAIGHT_STARTS and value_indices[4] - value_indices[0] == 4:
+      return STRAIGHT_FLUSH if is_flush else STRAIGHT
+
+    return FLUSH if is_flush else SCATTERED
+
+  pattern = sorted(sum(card_counts[index * NUM_SUITS:(index + 1) * NUM_SUITS]) for index in value_indices)
+
+  if pattern == [1, 4]:
+    return FOUR_OF_A_KIND_PLUS_ONE
+  elif pattern == [2, 3]:
+    return FULL_HOUSE
+  elif is_flush and len(value_indices) > 1:
+    return FLUSH
+
+  return SCATTERED
+
+def primary_card(mask, hand_type_index):
+  '''Return the ordinal of the card that decides between two moves of the same hand type (see card_mask.primary_card)'''
+
+  if ONE_CARD <= hand_type_index <= FOUR_OF_A_KIND:
+    return lowest(mask)
+  elif hand_type_index == FULL_HOUSE or hand_type_index == FOUR_OF_A_KIND_PLUS_ONE:
+    # Highest card of the three/four of a kind
+    major_size = hand_type_index - 5
+    card_counts = counts(mask)
+
+    for index in range(NUM_VALUES):
+      value_counts = card_counts[index * NUM_SUITS:(index + 1) * NUM_SUITS]
+
+      if sum(value_counts) == major_size:
+        return index * NUM_SUITS + max(suit for suit in range(NUM_SUITS) if value_counts[suit])
+  elif hand_type_index == STRAIGHT or hand_type_index == FLUSH or hand_type_index == STRAIGHT_FLUSH:
+    return highest(mask)
+
+  return 0
+
+def strength_key(mask, hand_type_index = None):
+  '''Return the integer that orders moves by strength (see card_mask.strength_key) of the move represented by the count mask'''
+
+  if hand_type_index == None: hand_type_index = classify(mask)
+
+  return (hand_type_index << TYPE_SHIFT) | (primary_card(mask, hand_type_index) << PRIMARY_SHIFT) | mask
+
+# Move generation
+
+def _picks(options, num_cards):
+  '''
+  Return every way of taking num_cards cards from options, a list of (card ordinal, copies available) in ascending order,
+  as (count mask, ordinal of the highest card taken) pairs
+  '''
+
+  picks = [(0, num_cards, None)]   # (mask so far, cards still to take, highest card taken)
+  remaining = sum(available for card_ordinal, available in options)
+
+  for card_ordinal, available in options:
+    remaining -= available
+    unit = UNITS[card_ordinal]
+    extended = []
+
+    for mask, needed, top in picks:
+      # Only takes as few copies as the cards after this one can still complete
+      if needed <= remaining:
+        extended.append((mask, needed, top))
+
+      for taken in range(max(1, needed - remaining), min(available, needed) + 1):
+        extended.append((mask + unit * taken, needed - taken, card_ordinal))
+
+    picks = extended
+
+  return [(mask, top) for mask, needed, top in picks if needed == 0]
+
+def _value_options(card_counts, value_index):
+  '''Return the (card ordinal, copies) of the cards of one value in the hand'''
+
+  start = value_index * NUM_SUITS
+
+  return [(card_ordinal, card_counts[card_ordinal]) for card_ordinal in range(start, start + NUM_SUITS) if card_counts[card_ordinal]]
+
+def _singles(card_counts):
+  head = ONE_CARD << TYPE_SHIFT
+
+  return [(head | (card_ordinal << PRIMARY_SHIFT) | UNITS[card_ordinal], UNITS[card_ordinal]) for card_ordinal in range(DECK_SIZE) if card_counts[card_ordinal]]
+
+def _n_of_a_kind(card_counts, num_cards):
+  hand_type_index = num_cards + 1
+  head = hand_type_index << TYPE_SHIFT
+  moves = []
+
+  for index in range(NUM_VALUES):
+    options = _value_options(card_counts, index)
+    if sum(available for card_ordinal, available in options) < num_cards: continue
+
+    for mask, top in _picks(options, num_cards):
+      moves.append((head | (lowest(mask) << PRIMARY_SHIFT) | mask, mask))
+
+  moves.sort()
+
+  return moves
+
+def _straights(card_counts):
+  '''Return the straights of the hand: one card of each value of a window, not all of the same suit'''
+
+  head = STRAIGHT << TYPE_SHIFT
+  moves = []
+
+  for start in STRAIGHT_STARTS:
+    choices = [[card_ordinal for card_ordinal in range(index * NUM_SUITS, (index + 1) * NUM_SUITS) if card_counts[card_ordinal]] for index in range(start, start + 5)]
+    if not all(choices): continue
+
+    # Builds the masks one value at a time, with the suit they all share so far (None once they differ)
+    partials = [(UNITS[card_ordinal], card_ordinal % NUM_SUITS) for card_ordinal in choices[0]]
+
+    for value_choices in choices[1:-1]:
+      partials = [(mask + UNITS[card_ordinal], suit if suit == card_ordinal % NUM_SUITS else None) for mask, suit in partials for card_ordinal in value_choices]
+
+    for card_ordinal in choices[-1]:
+      top_head = head | (card_ordinal << PRIMARY_SHIFT)
+      top_suit = card_ordinal % NUM_SUITS
+      unit = UNITS[card_ordinal]
+
+      for mask, suit in partials:
+        if suit != top_suit:
+          mask += unit
+          moves.append((top_head | mask, mask))
+
+  moves.sort()
+
+  return moves
+
+def _straight_flushes(card_counts):
+  head = STRAIGHT_FLUSH << TYPE_SHIFT
+  moves = []
+
+  for start in STRAIGHT_STARTS:
+    for suit in range(NUM_SUITS):
+      window = range(start * NUM_SUITS + suit, (start + 5) * NUM_SUITS, NUM_SUITS)
+
+      if all(card_counts[card_ordinal] for card_ordinal in window):
+        mask = sum(UNITS[card_ordinal] for card_ordinal in window)
+        moves.append((head | (window[-1] << PRIMARY_SHIFT) | mask, mask))
+
+  moves.sort()
+
+  return moves
+
+# Ways five cards of a suit can hold several copies of some cards and still be a flush (3 or 4 values):
+# the copies of each repeated card, and the number of other cards, each taken once
+_FLUSH_REPEATS = [((2,), 3), ((2, 2), 1), ((3,), 2)]
+
+def _flushes(card_counts):
+  '''
+  Return the flushes of the hand: five cards of a suit, except those making a higher hand type (or none).
+  Five cards of 5 values are a flush unless they are a straight flush, and of 3 or 4 values always are,
+  while five cards of 1 or 2 values would be five of a kind, a full house or a four of a kind plus one.
+  '''
+
+  head = FLUSH << TYPE_SHIFT
+  moves = []
+
+  for suit in range(NUM_SUITS):
+    suit_ordinals = [card_ordinal for card_ordinal in range(suit, DECK_SIZE, NUM_SUITS) if card_counts[card_ordinal]]
+
+    for combo in itertools.combinations([UNITS[card_ordinal] for card_ordinal in suit_ordinals], 5):
+      mask = sum(combo)
+      top = (mask.bit_length() - 1) // FIELD_BITS
+      bottom = ((mask & -mask).bit_length() - 1) // FIELD_BITS
+
+      if top - bottom == 4 * NUM_SUITS and bottom // NUM_SUITS in STRAIGHT_STARTS: continue
+
+      moves.append((head | (top << PRIMARY_SHIFT) | mask, mask))
+
+    for repeats, num_others in _FLUSH_REPEATS:
+      for repeated in itertools.combinations([card_ordinal for card_ordinal in suit_ordinals if card_counts[card_ordinal] >= repeats[0]], len(repeats)):
+        repeated_mask = sum(UNITS[card_ordinal] * repeats[0] for card_ordinal in repeated)
+        others = [UNITS[card_ordinal] for card_ordinal in suit_ordinals if card_ordinal not in repeated]
+
+        for combo in itertools.combinations(others, num_others):
+          mask = repeated_mask + sum(combo)
+          moves.append((head | (highest(mask) << PRIMARY_SHIFT) | mask, mask))
+
+  moves.sort()
+
+  return moves
+
+def _major_plus_minor(card_counts, hand_type_index):
+  '''Return the full houses (three of a kind and a pair) or four of a kind plus ones of the hand'''
+
+  head = hand_type_index << TYPE_SHIFT
+  major_size, minor_size = (3, 2) if hand_type_index == FULL_HOUSE else (4, 1)
+  options = [_value_options(card_counts, index) for index in range(NUM_VALUES)]
+  totals = [sum(available for card_ordinal, available in value_options) for value_options in options]
+  minors = [_picks(options[index], minor_size) if totals[index] >= minor_size else [] for index in range(NUM_VALUES)]
+  moves = []
+
+  for major_index in range(NUM_VALUES):
+    if totals[major_index] < major_size: continue
+
+    for major_mask, top in _picks(options[major_index], major_size):
+      major_head = head | (top << PRIMARY_SHIFT)
+
+      for minor_index in range(NUM_VALUES):
+        if minor_index == major_index: continue
+
+        for minor_mask, minor_top in minors[minor_index]:
+          mask = major_mask + minor_mask
+          moves.append((major_head | mask, mask))
+
+  moves.sort()
+
+  return moves
+
+_TYPE_GENERATORS = {
+  ONE_CARD: _singles,
+  PAIR: lambda card_counts: _n_of_a_kind(card_counts, 2),
+  card_mask.THREE_OF_A_KIND: lambda card_counts: _n_of_a_kind(card_counts, 3),
+  FOUR_OF_A_KIND: lambda card_counts: _n_of_a_kind(card_counts, 4),
+  STRAIGHT: _straights,
+  FLUSH: _flushes,
+  FULL_HOUSE: lambda card_counts: _major_plus_minor(card_counts, FULL_HOUSE),
+  FOUR_OF_A_KIND_PLUS_ONE: lambda card_counts: _major_plus_minor(card_counts, FOUR_OF_A_KIND_PLUS_ONE),
+  STRAIGHT_FLUSH: _straight_flushes
+}
+
+def moves_of_type(hand_mask, hand_type_index):
+  '''Return the (strength key, count mask) pairs of all moves of one hand type in the hand, in ascending order of strength key'''
+  return _TYPE_GENERATORS[hand_type_index](counts(hand_mask))
+
+def all_moves(hand_mask):
+  '''Return the (strength key, count mask) pairs of every move in the hand, in no particular order'''
+
+  card_counts = counts(hand_mask)
+
+  return [move for hand_type_index in range(ONE_CARD, STRAIGHT_FLUSH + 1) for move in _TYPE_GENERATORS[hand_type_index](card_counts)]
+
+def valid_pairs(hand_mask, previous_key = None, lowest_ordinal = None, option = 'default'):
+  '''
+  Return the (strength key, count mask) pairs of the valid moves of the hand, in the same order as Hand.get_valid_moves
+
+  previous_key -- strength key of the previous move, if there is one
+  lowest_ordinal -- ordinal of the card every move must contain (first move of the game), if any
+  option -- 'default', 'highest' or 'lowest' (see Hand.get_valid_moves)
+  '''
+
+  card_counts = counts(hand_mask)
+  hand_type_indices = range(STRAIGHT_FLUSH, ONE_CARD - 1, -1)
+
+  if lowest_ordinal != None: option = 'default'
+
+  if previous_key != None:
+    # Only moves of the previous move's size, and of its hand type or above, can beat it
+    previous_type = previous_key >> TYPE_SHIFT
+    hand_type_indices = [hand_type_index for hand_type_index in range(previous_type, STRAIGHT_FLUSH + 1) if MOVE_SIZES[hand_type_index] == MOVE_SIZES[previous_type]]
+
+  pairs = []
+
+  for hand_type_index in hand_type_indices:
+    type_pairs = _TYPE_GENERATORS[hand_type_index](card_counts)
+
+    if lowest_ordinal != None:
+      lowest_field = field(lowest_ordinal)
+      type_pairs = [pair for pair in type_pairs if pair[1] & lowest_field]
+
+    # The highest or lowest move of each hand type is picked before being compared with the previous move
+    if option == 'highest':
+      type_pairs = type_pairs[-1:]
+    elif option == 'lowest':
+      type_pairs = type_pairs[:1]
+
+    if previous_key != None:
+      type_pairs = type_pairs[bisect.bisect_right(type_pairs, (previous_key, float('inf'))):]
+
+    pairs.extend(type_pairs)
+
+  return pairs
+
+def _pick_ways(availables, num_cards):
+  '''Return the number of ways of taking 0 to num_cards cards from cards with the given numbers of copies, as a list'''
+
+  ways = [1] + [0] * num_cards
+
+  for available in availables:
+    if not available: continue
+
+    ways = [sum(ways[total - taken] for taken in range(min(available, total) + 1)) for total in range(num_cards + 1)]
+
+  return ways
+
+def move_counts(hand_mask):
+  '''
+  Return the number of moves of each hand type (index = hand type index, see Move.HAND_TYPES) in the hand,
+  counted from the number of copies of each card without generating any move (see move_gen.move_counts)
+  '''
+
+  move_type_counts = [0] * (STRAIGHT_FLUSH + 1)
+  card_counts = counts(hand_mask)
+  present = [1 if count else 0 for count in card_counts]
+  num_distinct = sum(present)
+
+  move_type_counts[ONE_CARD] = num_distinct
+
+  value_ways = [_pick_ways(card_counts[index * NUM_SUITS:(index + 1) * NUM_SUITS], 4) for index in range(NUM_VALUES)]
+  value_distinct = [sum(present[index * NUM_SUITS:(index + 1) * NUM_SUITS]) for index in range(NUM_VALUES)]
+
+  for num_cards in range(2, 5):
+    move_type_counts[num_cards + 1] = sum(ways[num_cards] for ways in value_ways)
+
+  # Straights pick one card of each value of their window, straight flushes one of a single suit
+  suit_straight_flushes = [0] * NUM_SUITS
+
+  for start in STRAIGHT_STARTS:
+    window_moves = 1
+    for index in range(start, start + 5):
+      window_moves *= value_distinct[index]
+
+    window_flushes = 0
+    for suit in range(NUM_SUITS):
+      if all(present[index * NUM_SUITS + suit] for index in range(start, start + 5)):
+        suit_straight_flushes[suit] += 1
+        window_flushes += 1
+
+    move_type_counts[STRAIGHT] += window_moves - window_flushes
+    move_type_counts[STRAIGHT_FLUSH] += window_flushes
+
+  total_pairs = move_type_counts[PAIR]
+  move_type_counts[FULL_HOUSE] = sum(ways[3] * (total_pairs - ways[2]) for ways in value_ways)
+  move_type_counts[FOUR_OF_A_KIND_PLUS_ONE] = sum(value_ways[index][4] * (num_distinct - value_distinct[index]) for index in range(NUM_VALUES))
+
+  # Five cards of a suit, less those making a straight flush, full house or four of a kind plus one (or no move)
+  for suit in range(NUM_SUITS):
+    suit_counts = card_counts[suit::NUM_SUITS]
+    num_present = sum(1 for count in suit_counts if count)
+    full_houses = sum(1 for count in suit_counts if count >= 3) * sum(1 for count in suit_counts if count >= 2) - sum(1 for count in suit_counts if count >= 3)
+    four_plus_ones = sum(1 for count in suit_counts if count >= 4) * (num_present - 1)
+    five_of_a_kinds = sum(1 for count in suit_counts if count >= 5)
+
+    move_type_counts[FLUSH] += _pick_ways(suit_counts, 5)[5] - suit_straight_flushes[suit] - full_houses - four_plus_ones - five_of_a_kinds
+
+  return move_type_counts
+
+# Hands and moves
+
+# Results of valid_move_list(), keyed on the count mask of the hand, previous move key, lowest card ordinal and option
+valid_move_list_cache = MoveCache()
+
+def valid_move_list(hand_mask, previous_move = "*", lowest_card = None, option = 'default'):
+  '''Return the valid moves of the hand represented by the count mask hand_mask as a MoveList of MultiDeckMoves (see Hand.get_valid_moves)'''
+
+  cache_key = (
+    hand_mask,
+    previous_move.key if isinstance(previous_move, Move) else None,
+    lowest_card.ordinal if lowest_card != None else None,
+    option
+  )
+
+  moves = valid_move_list_cache.get(cache_key)
+
+  if moves == None:
+    moves = move_list.MoveList.from_pairs(valid_pairs(*cache_key), MultiDeckMove)
+    valid_move_list_cache.put(cache_key, moves)
+
+  return moves
+
+class MultiDeckMove(Move):
+  '''Move made of cards from several decks, held as its count mask, which may hold several copies of a card'''
+
+  __slots__ = ()
+
+  TYPE_SHIFT = TYPE_SHIFT
+  MIN_VALID_KEY = MIN_VALID_KEY
+
+  def __init__(self, iterable = (), mask = None, key = None):
+    if mask == None:
+      mask = sum(UNITS[card.ordinal] for card in iterable)
+
+    object.__setattr__(self, 'mask', mask)
+    object.__setattr__(self, 'key', key if key != None else strength_key(mask))
+    object.__setattr__(self, '_cards', None)
+
+  def cards(self):
+    '''Return the cards of the move in ascending order, with any copies, as a tuple'''
+
+    if self._cards == None:
+      object.__setattr__(self, '_cards', tuple(CARDS[card_ordinal] for card_ordinal in ordinals(self.mask)))
+
+    return self._cards
+
+  def size(self):
+    return size(self.mask)
+
+  def __len__(self):
+    return size(self.mask)
+
+  def __contains__(self, card):
+    return hasattr(card, 'ordinal') and copies(self.mask, card.ordinal) > 0
+
+  def __reduce__(self):
+    return (MultiDeckMove, ((), self.mask))
+
+  def __eq__(self, other):
+    if not isinstance(other, MultiDeckMove): return False
+    return self.mask == other.mask
+
+  __hash__ = Move.__hash__
+
+class MultiDeckHand(Hand):
+  '''
+  Hand of cards from several decks, which may hold several copies of a card (the same Card, once per copy)
+
+  Its masks are count masks, and its moves MultiDeckMoves. Move catalogues (see Hand.track_moves) are
+  single-deck only, so moves are always generated, and looked up in the cache.
+  '''
+
+  def get_valid_moves(self, previous_move = "*", lowest_card = None, option = 'default'):
+    return list(self.get_move_list(previous_move, lowest_card, option))
+
+  def get_move_list(self, previous_move = "*", lowest_card = None, option = 'default'):
+    self.sort()
+    return valid_move_list(self.to_mask(), previous_move, lowest_card, option)
+
+  def iter_valid_moves(self, previous_move = "*", lowest_card = None, hand_type = None, size = None, reverse = False):
+    '''Yield the valid moves of the hand (see card.iter_valid_moves), which are all generated up front with several decks'''
+
+    moves = self.get_move_list(previous_move, lowest_card)
+
+    if hand_type != None: moves = moves.of_type(Move.HAND_TYPES.index(hand_type))
+    if size != None: moves = moves.of_size(size)
+
+    if not reverse:
+      return iter(moves)
+
+    if isinstance(previous_move, Move):
+      return iter(moves[::-1])
+
+    # Highest hand type first still, but each from highest to lowest
+    return itertools.chain.from_iterable(reversed(moves.of_type(hand_type_index)) for hand_type_index in range(STRAIGHT_FLUSH, ONE_CARD - 1, -1))
+
+  def capability_profile(self, excluded = 0):
+    return move_counts(self.to_mask() - excluded)
+
+  def track_moves(self):
+    '''Leave the hand without a move catalogue, which only works with a single deck'''
+    pass
+
+  def to_mask(self):
+    '''Return the count mask of the hand'''
+    return sum(UNITS[card.ordinal] for card in self)
+
+  @classmethod
+  def from_mask(cls, mask):
+    '''Return a new hand holding the cards of the count mask, in ascending order'''
+    return cls([CARDS[card_ordinal] for card_ordinal in ordinals(mask)])
+
+  @classmethod
+  def mask_of(cls, cards):
+    return from_cards(cards)
+
+  def subtract(self, other, in_place = True):
+    '''Return the hand after the other cards/moves/hands have been removed, one copy for each copy in other (see Hand.subtract)'''
+
+    if isinstance(other, card.Card):
+      other_mask = UNITS[other.ordinal]
+    elif isinstance(other, Move):
+      other_mask = other.mask
+    elif not isinstance(other, list):
+      raise TypeError("Cannot subtract non-list/hand object from hand")
+    else:
+      try:
+        other_mask = from_cards(other)
+      except TypeError:
+        raise TypeError("Cannot remove non-card objects")
+
+    to_remove = counts(other_mask)
+
+    if any(count > held for count, held in zip(to_remove, counts(self.to_mask()))):
+      raise ValueError("Cannot remove cards that are not in the hand")
+
+    remaining_cards = []
+
+    for hand_card in self:
+      if to_remove[hand_card.ordinal]:
+        to_remove[hand_card.ordinal] -= 1
+      else:
+        remaining_cards.append(hand_card)
+
+    if in_place:
+      self[:] = remaining_cards
+      return_hand = self
+    else:
+      return_hand = MultiDeckHand(remaining_cards)
+
+    if not in_place or isinstance(other, card.Card):
+      return return_hand
+
+def hand_class(decks = 1):
+  '''Return the class of the hands of a game played with the given number of decks'''
+
+  if not 1 <= decks <= MAX_DECKS:
+    raise ValueError("Games are played with 1 to " + str(MAX_DECKS) + " decks.")
+
+  return Hand if decks == 1 else MultiDeckHand
+
+def move_class(decks = 1):
+  '''Return the class of the moves of a game played with the given number of decks'''
+  return Move if hand_class(decks) is Hand else MultiDeckMove
@@ -19,7 +19,7 @@ class Person(Player):
     while get_choices:
       for card_number in range(1, number_of_cards + 1):
         # Adds player choice (in the form of choice number) to list of card choices
-        card_choices.append(user_in.valid_input_with_range(("Card " + str(card_number) + ": "), int, 1, len(self.hand)))
+        card_choices.append(user_in.valid_input_with_range((user_in.CARD_PROMPT + str(card_number) + ": "), int, 1, len(self.hand), self))
 
       get_choices = False
 
@@ -41,6 +41,11 @@ class Person(Player):
     # Returns a list of cards according to the choice numbers as indices in the player's hand within the card_choices list
     return list(map(lambda card_choice: self.hand[card_choice - 1], card_choices))
 
+  def choose_trade_cards(self, number_of_cards = 1):
+    '''Overrided method from parent class to allow player to manually choose which cards to give'''
+
+    return self.choose_cards(number_of_cards)
+
   def choose_move(self, previous_move = "*", lowest_card = None):
     '''Allow player to choose move out of valid moves or pass.'''
 
@@ -48,7 +53,7 @@ class Person(Player):
 
     ui.print_moves(self)
 
-    move_choice = user_in.valid_input_with_range("Move #: ", int, 1, self._last_choice)
+    move_choice = user_in.valid_input_with_range(user_in.MOVE_PROMPT, int, 1, self._last_choice, self)
     return self._get_move(move_choice)
 
   def do_move(self, previous_move = "*", lowest_card = None):
@@ -1,5 +1,8 @@
 import card
 import functools
+import time
+import instrumentation
+import ranking
 import user_interface as ui
 
 @functools.total_ordering
@@ -25,11 +28,26 @@ class Player():
     
     other.hand.extend(cards)
 
+  def choose_trade_cards(self, number_of_cards = 1):
+    '''Return the cards given away when trading, without any input/output (the lowest cards by default)'''
+
+    return ranking.bottom_k(self.hand, number_of_cards, key=ranking.card_rank)
+
   def _get_move_parameters(self, previous_move = "*", lowest_card = None):
     '''Sets parameters to enable move selection'''
 
-    # Sets own valid moves and ability to pass, so it can be accessed afterwards without re-evaluation
-    self._valid_moves = self.hand.get_valid_moves(previous_move, lowest_card)
+    recorder = instrumentation.recorder
+    if recorder != None: start_time = time.perf_counter()
+
+    # Sets own valid moves (as a MoveList) and ability to pass, so it can be accessed afterwards without re-evaluation
+    self._valid_moves = self.hand.get_move_list(previous_move, lowest_card)
+
+    if recorder != None:
+      recorder.observe('move_generation', time.perf_counter() - start_time)
+      recorder.count('move_generation/calls')
+      recorder.count('move_generation/moves', len(self._valid_moves))
+      recorder.count('move_generation/hand_size/' + str(len(self.hand)).zfill(2))
+
     self._can_pass = not ((lowest_card != None) or (previous_move == "*"))
     
     try:
@@ -42,7 +60,7 @@ class Player():
   def print_from_valid_moves(self, index):
     '''Allows protected attribute, _valid_moves, to be printed outside of class'''
 
-    print(self._valid_moves[index])
+    ui.renderer.write(str(self._valid_moves[index]) + "\n")
 
   def _get_move(self, move_choice):
     '''Performs and returns move specified'''
@@ -50,14 +68,17 @@ class Player():
     if move_choice == self._last_choice and self._can_pass:
       return "*"  # Return pass
     else:
-      move = self._valid_moves[move_choice - 1]   # Gets move based on specified index
-      
-      self.hand.subtract(move)  # Removes move from hand
-      
-      if len(self.hand) == 0:
-        self.finished = True    # Sets attribute finished to true if no more cards remain in hand
+      return self.play_move(self._valid_moves[move_choice - 1])   # Gets move based on specified index
+
+  def play_move(self, move):
+    '''Performs and returns a move chosen elsewhere (e.g. by a worker process, see table_server), which must be in the hand'''
+
+    self.hand.subtract(move)  # Removes move from hand
+
+    if len(self.hand) == 0:
+      self.finished = True    # Sets attribute finished to true if no more cards remain in hand
 
-      return move
+    return move
 
   def test_move(self, previous_move = "*", lowest_card = None, move_choice = 1):
     '''Return the first available move every time'''
@@ -76,6 +97,7 @@ class Player():
     self.finished = False
     self.finishing_record = []
     self.role = None
+    self.game = None    # Headless game (see engine) the player is seated at, if any
 
   def __lt__(self, other):
     return self.finishing_record[-1] < other.finishing_record[-1]
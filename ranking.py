@@ -0,0 +1,78 @@
+'''
+Ranking of moves, cards and other collections by a precomputed key: sorting in one pass, and top-k / bottom-k selection.
+
+Each key is worked out once per item and compared as a plain integer, instead of going through the
+rich comparison methods of Move or Card at every step. Orders are stable: items with equal keys keep
+their original order (distinct moves never tie, as a strength key includes the mask of the move).
+'''
+
+import heapq
+import operator
+import card_mask
+
+# Key functions of moves (their strength key, see card_mask.strength_key) and cards (their ordinal)
+move_strength = operator.attrgetter('key')
+card_rank = operator.attrgetter('ordinal')
+
+# Up to this many items, sorting them all beats a heap, which pays for every item it looks at in Python (e.g. a hand of cards)
+HEAP_THRESHOLD = 128
+
+def sort_by_key(items, key = move_strength, reverse = False):
+  '''Return a new list of the items, from lowest to highest key (highest to lowest if reverse)'''
+  return sorted(items, key=key, reverse=reverse)
+
+def top_k(items, k, key = move_strength):
+  '''Return the k items with the highest keys, from highest to lowest, without sorting the rest of a large collection'''
+
+  if not hasattr(items, '__len__'): items = list(items)
+
+  if len(items) <= HEAP_THRESHOLD:
+    return sorted(items, key=key, reverse=True)[:k]
+
+  return heapq.nlargest(k, items, key=key)
+
+def bottom_k(items, k, key = move_strength):
+  '''Return the k items with the lowest keys, from lowest to highest, without sorting the rest of a large collection'''
+
+  if not hasattr(items, '__len__'): items = list(items)
+
+  if len(items) <= HEAP_THRESHOLD:
+    return sorted(items, key=key)[:k]
+
+  return heapq.nsmallest(k, items, key=key)
+
+def hand_type_order(reverse = True, reverse_in_hand_type = False, type_shift = card_mask.TYPE_SHIFT):
+  '''
+  Return the mask that, XORed into a strength key, gives a key ordering moves by hand type (highest first if reverse),
+  then within each hand type from lowest to highest (highest to lowest if reverse_in_hand_type)
+
+  type_shift -- position of the hand type index in the strength keys (the TYPE_SHIFT of the move class, e.g. multi_deck.MultiDeckMove)
+  '''
+
+  # Bits of a strength key holding the hand type index, and those ranking moves within their hand type
+  type_bits = 0xF << type_shift
+  within_type_bits = (1 << type_shift) - 1
+
+  return (type_bits if reverse else 0) | (within_type_bits if reverse_in_hand_type else 0)
+
+def by_hand_type(items, reverse = True, reverse_in_hand_type = False, key = move_strength, type_shift = None):
+  '''
+  Return a new list of the moves, grouped by hand type (highest first if reverse), from lowest to highest
+  within each hand type (highest to lowest if reverse_in_hand_type), in a single sort
+
+  key -- function returning the strength key of an item, for items other than Moves (e.g. (strength key, mask) pairs)
+  type_shift -- position of the hand type index in the keys, by default the TYPE_SHIFT of the class of the first item
+                (single-deck keys for items without one, e.g. pairs)
+  '''
+
+  items = list(items)
+
+  if type_shift == None:
+    type_shift = getattr(type(items[0]), 'TYPE_SHIFT', card_mask.TYPE_SHIFT) if items else card_mask.TYPE_SHIFT
+
+  order = hand_type_order(reverse, reverse_in_hand_type, type_shift)
+
+  if order == 0:
+    return sorted(items, key=key)
+
+  return sorted(items, key=lambda item: key(item) ^ order)
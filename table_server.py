@@ -0,0 +1,444 @@
+'''
+Asyncio host of many President tables in one process, played by people over connections and by AI (see TableServer).
+
+Every table plays a game (see engine.Game) as a coroutine, with the same rounds, trades and turns (see engine.Game.round_steps),
+but awaits each choice instead of blocking the interpreter on it:
+- a Person is shown their hand and options on their connection, and their choice is read from it, a line at a time
+- AI (or any other player) chooses in a pool of worker processes, on a copy of itself (see detached)
+A table waiting for someone never holds up the others, and an idle table takes no CPU at all, so a process can host hundreds.
+
+Connections are in-process queues (QueueConnection), or the streams of a client of a Unix socket (StreamConnection).
+
+Usage: python table_server.py --socket /tmp/president.sock --tables 100 --players Person AI AI AI
+       then join a table with e.g. nc -U /tmp/president.sock, by sending the line "<table> <player name>" (e.g. "1 Person 1")
+'''
+
+import argparse
+import asyncio
+import concurrent.futures
+import copy
+import functools
+import logging
+import multiprocessing
+import dealing
+import engine
+import multi_deck
+import user_input as user_in
+import user_interface as ui
+from player import Player
+from person import Person
+from ai import AI
+from mc_ai import MonteCarloAI
+
+PLAYER_TYPES = {'Person': Person, 'AI': AI, 'MonteCarloAI': MonteCarloAI, 'Player': Player}
+
+logger = logging.getLogger(__name__)
+
+class Connection:
+  '''Line-based connection of a person to their table'''
+
+  async def read_line(self):
+    '''Return the next line sent by the person, without its line ending, or raise EOFError if the connection was closed'''
+    raise NotImplementedError
+
+  def write(self, text):
+    '''Send text (which may span several lines) to the person'''
+    raise NotImplementedError
+
+  async def drain(self):
+    '''Wait until everything written has been sent, if the connection holds it back'''
+    pass
+
+  def close(self):
+    '''Close the connection (again closing it does nothing)'''
+    pass
+
+class QueueConnection(Connection):
+  '''
+  Connection held in process: lines are sent to the table with push, and what the table writes is put in the output queue
+
+  Closing it ends both ways, with None put in each queue.
+  '''
+
+  def __init__(self, lines = ()):
+    self.input = asyncio.Queue()
+    self.output = asyncio.Queue()
+    self.closed = False
+    self.push(*lines)
+
+  def push(self, *lines):
+    '''Send lines to the table'''
+
+    for line in lines:
+      self.input.put_nowait(str(line))
+
+  async def read_line(self):
+    line = await self.input.get()
+
+    if line == None:
+      raise EOFError("The connection was closed.")
+
+    return line
+
+  def write(self, text):
+    self.output.put_nowait(text)
+
+  def close(self):
+    if self.closed: return
+
+    self.closed = True
+    self.input.put_nowait(None)
+    self.output.put_nowait(None)
+
+class StreamConnection(Connection):
+  '''Connection over a pair of asyncio streams (e.g. those of a client of a Unix socket, see TableServer.serve_unix), in UTF-8'''
+
+  def __init__(self, reader, writer):
+    self.reader = reader
+    self.writer = writer
+
+  async def read_line(self):
+    line = await self.reader.readline()
+
+    if not line:
+      raise EOFError("The connection was closed.")
+
+    return line.decode('utf-8', 'replace').rstrip('\r\n')
+
+  def write(self, text):
+    if not self.writer.is_closing():
+      self.writer.write(text.encode('utf-8'))
+
+  async def drain(self):
+    await self.writer.drain()
+
+  def close(self):
+    self.writer.close()
+
+async def valid_input_with_range(connection, input_str, low, high):
+  '''Return a number from low to high read from the connection, asking again until one is sent (see user_input.valid_input_with_range)'''
+
+  error_message = ("Please enter a number from " + str(low) + " to " + str(high) + ".")
+
+  while True:
+    connection.write(input_str)
+    await connection.drain()
+
+    try:
+      user_in = int(await connection.read_line())
+
+      if low <= user_in <= high:
+        return user_in
+    except ValueError:
+      pass
+
+    connection.write(error_message + "\n")
+
+def format_moves(player):
+  '''Return the player's valid moves (see Player._get_move_parameters), and pass if they can, numbered from 1 as they are chosen'''
+
+  choice_length = len(str(player._last_choice)) + 2
+  lines = []
+
+  for counter, move in enumerate(player._valid_moves, 1):
+    lines.append(("[" + str(counter) + "]").ljust(choice_length) + " " + str(move).strip().ljust(20) + " " + ui.hand_type_name(move.hand_type))
+
+  if player._can_pass:
+    lines.append(("[" + str(player._last_choice) + "]").ljust(choice_length) + " Pass")
+
+  return "\n".join(lines) + "\n"
+
+def format_cards(hand):
+  '''Return the cards of a hand, numbered from 1 as they are chosen'''
+
+  choice_length = len(str(len(hand))) + 2
+
+  return "".join(("[" + str(counter) + "]").ljust(choice_length) + " " + str(hand_card) + "\n" for counter, hand_card in enumerate(hand, 1))
+
+# Choices made in worker processes, by copies of the players (see detached)
+
+def detached(player):
+  '''Return a copy of the player to send to a worker, without its hand (sent as a mask instead) or game'''
+
+  player_copy = copy.copy(player)
+  player_copy.hand = None
+  player_copy.game = None
+  player_copy.__dict__.pop('_valid_moves', None)
+
+  return player_copy
+
+def choose_move(player, hand_mask, decks, previous_move, lowest_card):
+  '''Return the mask of the move (0 for a pass) a detached player chooses with the hand of hand_mask (see Player.do_move)'''
+
+  player.hand = multi_deck.hand_class(decks).from_mask(hand_mask)
+  move = player.do_move(previous_move, lowest_card)
+
+  return move.mask if move != "*" else 0
+
+def choose_trade_cards(player, hand_mask, decks, number_of_cards):
+  '''Return the cards a detached player gives away when trading with the hand of hand_mask (see Player.choose_trade_cards)'''
+
+  player.hand = multi_deck.hand_class(decks).from_mask(hand_mask)
+
+  return player.choose_trade_cards(number_of_cards)
+
+class Table:
+  '''
+  Game of President between people at connections and other players (e.g. AI), played as a coroutine (see play)
+
+  Other players choose in the executor, which must be able to run the functions of this module (e.g. a process pool),
+  as copies of themselves that only see their own hand (see detached), so MonteCarloAI plays like AI.
+  An executor of None runs them in the default executor of the event loop (a thread pool).
+
+  connections -- connection of each Person, by name, which can also be given later (see seat)
+  Other arguments are those of engine.Game.
+  '''
+
+  def __init__(self, players, connections = None, total_rounds = 1, seed = None, decks = None, executor = None):
+    self.game = engine.Game(players, total_rounds, seed, decks=decks)
+    self.connections = dict(connections) if connections != None else {}
+    self.executor = executor
+
+  def waiting_for(self):
+    '''Return the names of the people at the table without a connection yet'''
+    return [player.name for player in self.game.players if isinstance(player, Person) and player.name not in self.connections]
+
+  def seat(self, name, connection):
+    '''Give the Person called name the connection they play from'''
+
+    if name not in self.waiting_for():
+      raise ValueError("There is no free seat for " + name + " at the table.")
+
+    self.connections[name] = connection
+
+  def broadcast(self, text):
+    '''Send a line of text to every person at the table'''
+
+    for connection in self.connections.values():
+      connection.write(text + "\n")
+
+  def close(self):
+    '''Close the connection of every person at the table'''
+
+    for connection in self.connections.values():
+      connection.close()
+
+  async def play(self):
+    '''Play every round of the game, and return its results (see engine.Game.play)'''
+
+    if self.waiting_for():
+      raise ValueError("The table is still waiting for " + ", ".join(self.waiting_for()) + ".")
+
+    game = self.game
+    game.start()
+    seating = [player.name for player in game.players]
+    rounds = []
+
+    for round_number in range(1, game.total_rounds + 1):
+      rounds.append(await self.play_round(round_number))
+
+    self.broadcast("Final roles: " + ", ".join(name + " -- " + role for name, role in rounds[-1]['roles'].items()))
+
+    return game.results(seating, rounds)
+
+  async def play_round(self, round_number):
+    '''Play one round (see engine.Game.play_round), awaiting the choice of every player, and return its results'''
+
+    self.broadcast("Round " + str(round_number))
+
+    steps = self.game.round_steps(round_number)
+    choice = None
+
+    try:
+      while True:
+        kind, player, *args = steps.send(choice)
+
+        if isinstance(player, Person):
+          choice = await self.__ask_person(kind, player, *args)
+        else:
+          choice = await self.__ask_worker(kind, player, *args)
+
+        if kind == 'move':
+          self.broadcast(player.name + (" passed." if choice == "*" else " played " + str(choice).strip() + "."))
+    except StopIteration as stop:
+      round_results = stop.value
+
+    self.broadcast("Finishing order: " + ", ".join(round_results['finishing_order']))
+
+    return round_results
+
+  async def __ask_person(self, kind, player, *args):
+    '''Return the choice of a Person, read from their connection'''
+
+    connection = self.connections[player.name]
+    connection.write("Your hand: " + str(player.hand) + "\n")
+
+    if kind == 'trade':
+      return await self.__ask_trade_cards(connection, player, *args)
+
+    previous_move, lowest_card = args
+    player._get_move_parameters(previous_move, lowest_card)
+
+    connection.write("Previous Move: " + (str(previous_move).strip() if previous_move != "*" else "None") + "\n")
+    connection.write(format_moves(player))
+
+    return player._get_move(await valid_input_with_range(connection, user_in.MOVE_PROMPT, 1, player._last_choice))
+
+  async def __ask_trade_cards(self, connection, player, number_of_cards):
+    '''Return the different cards of their hand a Person picks to give away (see Person.choose_cards)'''
+
+    connection.write("Pick " + str(number_of_cards) + " of the following to give:\n" + format_cards(player.hand))
+
+    while True:
+      card_choices = []
+
+      for card_number in range(1, number_of_cards + 1):
+        card_choices.append(await valid_input_with_range(connection, user_in.CARD_PROMPT + str(card_number) + ": ", 1, len(player.hand)))
+
+      if len(set(card_choices)) == len(card_choices):
+        return [player.hand[card_choice - 1] for card_choice in card_choices]
+
+      connection.write("Cards must be different!\n")
+
+  async def __ask_worker(self, kind, player, *args):
+    '''Return the choice of any other player, made by a copy of it in the executor'''
+
+    decks = self.game.decks
+    worker_function = choose_trade_cards if kind == 'trade' else choose_move
+    job = functools.partial(worker_function, detached(player), player.hand.to_mask(), decks, *args)
+
+    choice = await asyncio.get_running_loop().run_in_executor(self.executor, job)
+
+    if kind == 'trade':
+      return choice
+
+    return player.play_move(multi_deck.move_class(decks).from_mask(choice)) if choice else "*"
+
+class TableServer:
+  '''
+  Host of tables that people join over connections (see join): a table starts as soon as every Person at it has joined,
+  and once it is over, its results are kept in results, by table name (None if someone left, or the game failed, before the end)
+
+  executor -- pool every table's AI choose in (see Table), which is by default a pool of max_workers processes, shut down by close
+  '''
+
+  def __init__(self, executor = None, max_workers = None):
+    self.owns_executor = executor == None
+
+    # Workers are spawned rather than forked, as forked ones would hold on to the sockets of the people connected at the time
+    if executor == None:
+      executor = concurrent.futures.ProcessPoolExecutor(max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+    self.executor = executor
+    self.tables = {}
+    self.results = {}
+    self.tasks = set()
+
+  def add_table(self, name, players, total_rounds = 1, seed = None, decks = None):
+    '''Open a table of the given players (see Table) under name, and return it'''
+
+    if name in self.tables or name in self.results:
+      raise ValueError("There is already a table called " + name + ".")
+
+    table = Table(players, total_rounds=total_rounds, seed=seed, decks=decks, executor=self.executor)
+    self.tables[name] = table
+
+    if not table.waiting_for():
+      self.__start(name, table)
+
+    return table
+
+  async def join(self, connection):
+    '''Seat a connection at a table, given the first line sent on it: the name of the table, a space, and the name of the Person to play as'''
+
+    try:
+      line = await connection.read_line()
+    except EOFError:
+      connection.close()
+      return
+
+    table_name, separator, player_name = line.strip().partition(" ")
+    table = self.tables.get(table_name)
+
+    if table == None or player_name not in table.waiting_for():
+      connection.write("There is no free seat for " + player_name + " at table " + table_name + ".\n")
+      await connection.drain()
+      connection.close()
+      return
+
+    table.seat(player_name, connection)
+    connection.write("Joined table " + table_name + " as " + player_name + ".\n")
+
+    if table.waiting_for():
+      connection.write("Waiting for " + ", ".join(table.waiting_for()) + "...\n")
+    else:
+      self.__start(table_name, table)
+
+  async def serve_unix(self, path):
+    '''Start accepting connections on a Unix socket at path (each joining a table, see join), and return the asyncio server'''
+    return await asyncio.start_unix_server(lambda reader, writer: self.join(StreamConnection(reader, writer)), path)
+
+  async def wait_closed(self):
+    '''Wait until every table being played is over'''
+
+    while self.tasks:
+      await asyncio.gather(*self.tasks)
+
+  def close(self):
+    '''Shut down the executor, if the server made it'''
+
+    if self.owns_executor:
+      self.executor.shutdown()
+
+  def __start(self, name, table):
+    task = asyncio.get_running_loop().create_task(self.__play(name, table))
+    self.tasks.add(task)
+    task.add_done_callback(self.tasks.discard)
+
+  async def __play(self, name, table):
+    '''Play a table out, keep its results, and close its connections'''
+
+    try:
+      self.results[name] = await table.play()
+    except (EOFError, ConnectionError):
+      # Someone left, and the game cannot go on without them
+      table.broadcast("A player left, so the game is over.")
+      self.results[name] = None
+    except Exception:
+      # Any other failure (e.g. in a worker) ends only this table, which would otherwise be left waiting with nobody told
+      logger.exception("Table %s stopped on an error.", name)
+      table.broadcast("The game stopped on an error, so it is over.")
+      self.results[name] = None
+    finally:
+      del self.tables[name]
+      table.close()
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Host President tables that people join over a Unix socket.")
+  parser.add_argument('--socket', required=True, help="path of the Unix socket to listen on")
+  parser.add_argument('--tables', type=int, default=1, help="number of tables")
+  parser.add_argument('--players', nargs='+', default=['Person', 'AI', 'AI', 'AI'], choices=list(PLAYER_TYPES), help="type of each player at every table")
+  parser.add_argument('--rounds', type=int, default=1, help="number of rounds per game")
+  parser.add_argument('--seed', type=int, default=None, help="seed the deals of every table are derived from (see dealing)")
+  parser.add_argument('--decks', type=int, default=None, help="number of decks shuffled together (default: as few as needed)")
+  parser.add_argument('--processes', type=int, default=None, help="number of worker processes for the AI (default: one per core)")
+  args = parser.parse_args()
+
+  async def serve():
+    server = TableServer(max_workers=args.processes)
+
+    for table_number in range(1, args.tables + 1):
+      players = [PLAYER_TYPES[player_type](player_type + " " + str(counter + 1)) for counter, player_type in enumerate(args.players)]
+      seed = dealing.stream_seed(args.seed, table_number) if args.seed != None else None
+      server.add_table(str(table_number), players, args.rounds, seed, args.decks)
+
+    unix_server = await server.serve_unix(args.socket)
+    print("Hosting " + str(args.tables) + " tables on " + args.socket)
+
+    try:
+      async with unix_server:
+        await unix_server.serve_forever()
+    finally:
+      server.close()
+
+  asyncio.run(serve())
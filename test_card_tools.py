@@ -0,0 +1,56 @@
+'''
+Tests of card_tools.minimum_moves_to_victory against an exhaustive search, and of the time it takes on full hands.
+'''
+
+import functools
+import random
+import time
+import card_tools as ct
+import move_gen
+
+def random_hand_masks(seed, hand_size, count, num_values = 13):
+  '''Return count masks of hand_size cards, dealt from the cards of num_values random values'''
+
+  rng = random.Random(seed)
+  hand_masks = []
+
+  for counter in range(count):
+    values = rng.sample(range(13), num_values)
+    ordinals = [4 * value + suit for value in values for suit in range(4)]
+    hand_masks.append(sum(1 << ordinal for ordinal in rng.sample(ordinals, hand_size)))
+
+  return hand_masks
+
+@functools.lru_cache(maxsize = None)
+def reference_minimum(hand_mask):
+  '''Return the minimum number of moves to play the hand, trying every move with its lowest card'''
+
+  if hand_mask == 0: return 0
+
+  return 1 + min(reference_minimum(hand_mask & ~move_mask) for move_mask in move_gen.moves_with_card(hand_mask, hand_mask & -hand_mask))
+
+def check_against_reference(hand_masks):
+  for hand_mask in hand_masks:
+    minimum, first_moves = ct.minimum_moves_to_victory(hand_mask)
+
+    assert minimum == reference_minimum(hand_mask)
+    assert first_moves == {move_mask for key, move_mask in move_gen.all_moves(hand_mask)
+                           if reference_minimum(hand_mask & ~move_mask) == minimum - 1}
+
+def test_random_hands_match_exhaustive_search():
+  for hand_size in [1, 5, 8, 11]:
+    check_against_reference(random_hand_masks(hand_size, hand_size, 30))
+
+def test_hands_of_few_values_match_exhaustive_search():
+  # Few values make for many pairs, three and four of a kinds, so full houses and four-of-a-kinds plus one
+  for hand_size in [6, 9, 12]:
+    check_against_reference(random_hand_masks(hand_size, hand_size, 30, num_values = 5))
+
+def test_empty_hand():
+  assert ct.minimum_moves_to_victory(0) == (0, set())
+
+def test_full_hands_are_solved_within_a_second():
+  for hand_mask in random_hand_masks(0, 26, 40):
+    start = time.perf_counter()
+    ct.minimum_moves_to_victory(hand_mask)
+    assert time.perf_counter() - start < 1, hex(hand_mask)
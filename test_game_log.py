@@ -0,0 +1,106 @@
+'''
+Tests of game_log: games written and read back unchanged, with one deck or several and with or without a seed,
+and logs cut short while being written.
+'''
+
+import pytest
+import game_log
+import multi_deck
+from ai import AI
+from engine import Game
+
+def play_game(num_players, total_rounds, seed, decks = None):
+  return Game([AI("AI " + str(counter + 1)) for counter in range(num_players)], total_rounds, seed, decks=decks).play()
+
+def expected_round(results, game_round):
+  '''Return a round of the results as it is decoded from a log, with the cards of trades as masks'''
+
+  hand_class = multi_deck.hand_class(results['decks'])
+
+  return {
+    'round': game_round['round'],
+    'seating': game_round['seating'],
+    'hands': game_round['hands'],
+    'trades': [{'president': trade['president'], 'bum': trade['bum'], 'given': hand_class.mask_of(list(trade['given'])),
+                'received': hand_class.mask_of(list(trade['received']))} for trade in game_round['trades']],
+    'turns': [tuple(turn) for turn in game_round['turns']],
+    'finishing_order': game_round['finishing_order']
+  }
+
+def check_round_trip(results):
+  record = game_log.GameRecord(game_log.encode_game(results))
+
+  assert record.seed == results['seed']
+  assert record.decks == results['decks']
+  assert record.players == results['players']
+  assert record.rounds == [expected_round(results, game_round) for game_round in results['rounds']]
+
+  replayed = record.replay(len(results['rounds']))
+  last_round = results['rounds'][-1]
+  hand_class = multi_deck.hand_class(results['decks'])
+
+  assert replayed['finishing_order'] == last_round['finishing_order']
+  assert [hand.to_mask() for hand in replayed['hands'].values()] == last_round['hands']
+  assert all(isinstance(hand, hand_class) for hand in replayed['hands'].values())
+  assert [move if move == "*" else move.mask for name, move in replayed['turns']] == [move_mask or "*" for seat, move_mask in last_round['turns']]
+
+@pytest.mark.parametrize('seed', [None, 0, 12345, (1 << 64) - 1])
+def test_single_deck_games_round_trip(seed):
+  check_round_trip(play_game(4, 3, seed))
+
+@pytest.mark.parametrize('seed', [None, 7])
+def test_multi_deck_games_round_trip(seed):
+  check_round_trip(play_game(12, 2, seed, decks=2))
+
+def test_seeds_must_fit_in_64_bits():
+  with pytest.raises(ValueError):
+    game_log.encode_game(play_game(4, 1, 1 << 64))
+
+def test_log_files_round_trip(tmp_path):
+  path = str(tmp_path / 'games.log')
+  games = [play_game(4, 2, 1), play_game(5, 1, None), play_game(10, 1, 2, decks=2)]
+
+  with game_log.GameLogWriter(path) as writer:
+    for results in games[:2]:
+      writer.write(results)
+
+  # Appending to an existing log adds its games after those already in it
+  with game_log.GameLogWriter(path) as writer:
+    writer.write(games[2])
+
+  records = list(game_log.GameLogReader(path))
+
+  assert [record.data for record in records] == [game_log.encode_game(results) for results in games]
+
+def test_truncated_logs_stop_at_the_last_whole_game(tmp_path):
+  path = str(tmp_path / 'games.log')
+  records = [game_log.encode_game(play_game(4, 1, seed)) for seed in range(3)]
+
+  with game_log.GameLogWriter(path) as writer:
+    for record in records:
+      writer.write_record(record)
+
+  with open(path, 'rb') as file:
+    data = file.read()
+
+  last_start = len(data) - len(records[-1]) - game_log._LENGTH.size
+
+  # Cut in the last record, in its length, and right after the previous record
+  for cut in [len(data) - 1, last_start + len(records[-1]) // 2, last_start + 2, last_start]:
+    with open(path, 'wb') as file:
+      file.write(data[:cut])
+
+    assert [record.data for record in game_log.GameLogReader(path)] == records[:2]
+
+def test_files_without_the_header_are_rejected(tmp_path):
+  path = tmp_path / 'games.log'
+  path.write_bytes(b'not a log')
+
+  with pytest.raises(ValueError):
+    list(game_log.GameLogReader(str(path)))
+
+def test_empty_logs_have_no_games(tmp_path):
+  path = str(tmp_path / 'games.log')
+  game_log.GameLogWriter(path).close()
+
+  assert list(game_log.GameLogReader(path)) == []
@@ -0,0 +1,107 @@
+'''
+Tests of multi_deck: the moves generated and counted from a hand of several decks, against an enumeration of every
+multiset of one to five of its cards, and the removal of cards from multi-deck hands.
+'''
+
+import collections
+import itertools
+import random
+import pytest
+import multi_deck as md
+from benchmark import reference_hand_type
+from card import CARDS, Move
+
+def random_hand_masks(seed, decks, hand_sizes, count, num_values = 13):
+  '''Return the count masks of count hands of one of hand_sizes cards, dealt from decks decks, keeping only the cards of num_values random values'''
+
+  rng = random.Random(seed)
+  hand_masks = []
+
+  for counter in range(count):
+    values = rng.sample(range(13), num_values)
+    deck = [4 * value + suit for value in values for suit in range(4)] * decks
+    hand_masks.append(sum(md.UNITS[card_ordinal] for card_ordinal in rng.sample(deck, rng.choice(hand_sizes))))
+
+  return hand_masks
+
+def enumerated_moves(hand_mask):
+  '''Return the hand type index of every move of the hand, by count mask, from every multiset of one to five of its cards'''
+
+  card_counts = md.counts(hand_mask)
+  held = [card_ordinal for card_ordinal, count in enumerate(card_counts) if count]
+  moves = {}
+
+  for move_size in range(1, 6):
+    for combo in itertools.combinations_with_replacement(held, move_size):
+      if any(combo.count(card_ordinal) > card_counts[card_ordinal] for card_ordinal in set(combo)): continue
+
+      hand_type_index = reference_hand_type([CARDS[card_ordinal] for card_ordinal in combo])
+
+      if hand_type_index > Move.HAND_TYPES.index('scattered'):
+        moves[sum(md.UNITS[card_ordinal] for card_ordinal in combo)] = hand_type_index
+
+  return moves
+
+def check_hands(hand_masks):
+  for hand_mask in hand_masks:
+    expected = enumerated_moves(hand_mask)
+    pairs = md.all_moves(hand_mask)
+
+    assert len(pairs) == len(expected)
+    assert {mask: key >> md.TYPE_SHIFT for key, mask in pairs} == expected
+    assert all(key == md.strength_key(mask) for key, mask in pairs)
+
+    type_counts = collections.Counter(expected.values())
+    assert md.move_counts(hand_mask) == [type_counts[hand_type_index] for hand_type_index in range(len(Move.HAND_TYPES))]
+
+@pytest.mark.parametrize('decks', [2, 3, 4])
+def test_moves_match_enumeration(decks):
+  check_hands(random_hand_masks(decks, decks, range(1, 17), 60))
+
+@pytest.mark.parametrize('decks', [2, 3, 4])
+def test_moves_of_hands_with_many_copies_match_enumeration(decks):
+  # Few values make for many copies of each card, so four and five of a kinds, and flushes that are also full houses
+  check_hands(random_hand_masks(10 + decks, decks, range(5, 17), 40, num_values = 3))
+
+def test_moves_of_full_hands_match_enumeration():
+  check_hands(random_hand_masks(20, 2, [26], 3) + random_hand_masks(21, 4, [26], 3))
+
+def test_moves_of_types_are_in_ascending_order():
+  for hand_mask in random_hand_masks(30, 3, [20], 10):
+    for hand_type_index in range(md.ONE_CARD, md.STRAIGHT_FLUSH + 1):
+      pairs = md.moves_of_type(hand_mask, hand_type_index)
+      assert pairs == sorted(pairs)
+
+def test_valid_pairs_beat_the_previous_move():
+  for hand_mask in random_hand_masks(40, 2, [13], 20):
+    pairs = md.all_moves(hand_mask)
+
+    for previous_key, previous_mask in random.Random(hand_mask).sample(pairs, min(5, len(pairs))):
+      size = md.size(previous_mask)
+      expected = sorted(pair for pair in pairs if pair[0] > previous_key and md.size(pair[1]) == size)
+
+      assert md.valid_pairs(hand_mask, previous_key) == expected
+
+def test_subtract_removes_one_copy_per_copy():
+  hand = md.MultiDeckHand.from_mask(3 * md.UNITS[0] + md.UNITS[5] + 2 * md.UNITS[51])
+
+  hand.subtract(md.MultiDeckMove(mask=2 * md.UNITS[0]))
+  assert hand.to_mask() == md.UNITS[0] + md.UNITS[5] + 2 * md.UNITS[51]
+
+  remaining = hand.subtract([CARDS[51], CARDS[0]], in_place=False)
+  assert remaining.to_mask() == md.UNITS[5] + md.UNITS[51]
+  assert hand.to_mask() == md.UNITS[0] + md.UNITS[5] + 2 * md.UNITS[51]
+
+  hand.subtract(CARDS[5])
+  assert hand.to_mask() == md.UNITS[0] + 2 * md.UNITS[51]
+
+def test_subtract_refuses_cards_not_in_the_hand():
+  hand = md.MultiDeckHand.from_mask(md.UNITS[0] + 2 * md.UNITS[51])
+
+  with pytest.raises(ValueError):
+    hand.subtract([CARDS[0], CARDS[0]])
+
+  with pytest.raises(TypeError):
+    hand.subtract("5 of spades")
+
+  assert hand.to_mask() == md.UNITS[0] + 2 * md.UNITS[51]
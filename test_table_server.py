@@ -0,0 +1,131 @@
+'''
+Tests of table_server: tables played to completion by people over QueueConnections and by AI, and tables ended early.
+'''
+
+import asyncio
+import concurrent.futures
+import table_server
+import user_input as user_in
+from ai import AI
+from person import Person
+from player import Player
+
+class FailingPlayer(Player):
+  '''Player whose first move fails, as a bug in a player would'''
+
+  def do_move(self, previous_move = "*", lowest_card = None):
+    raise RuntimeError("The player failed.")
+
+async def answer(connection):
+  '''Play as a person at the other end of a connection, with the first move offered and the first cards of the hand, and return all the output'''
+
+  output = []
+
+  while True:
+    text = await connection.output.get()
+    if text == None: return "".join(output)
+
+    output.append(text)
+
+    if text == user_in.MOVE_PROMPT:
+      connection.push(1)
+    elif text.startswith(user_in.CARD_PROMPT):
+      connection.push(text[len(user_in.CARD_PROMPT):].rstrip(": "))
+
+async def join(server, table_name, player_name):
+  '''Join a table of the server over a QueueConnection, and return the connection'''
+
+  connection = table_server.QueueConnection([table_name + " " + player_name])
+  await server.join(connection)
+
+  return connection
+
+def players(*player_types):
+  return [player_type(player_type.__name__ + " " + str(counter + 1)) for counter, player_type in enumerate(player_types)]
+
+def check_results(results, total_rounds):
+  assert len(results['rounds']) == total_rounds
+
+  for game_round in results['rounds']:
+    assert sorted(game_round['finishing_order']) == sorted(results['players'])
+
+def test_tables_are_played_to_completion():
+  async def play_tables(server):
+    server.add_table('ai', players(AI, AI, AI, AI), total_rounds=2, seed=1)
+    server.add_table('one', players(Person, AI, AI, AI), total_rounds=2, seed=2)
+    server.add_table('many', players(*[Person, AI, AI, AI, AI] * 2), seed=3, decks=2)
+
+    connections = [await join(server, 'one', "Person 1"), await join(server, 'many', "Person 1"), await join(server, 'many', "Person 6")]
+    outputs = await asyncio.gather(*map(answer, connections))
+    await server.wait_closed()
+
+    return outputs
+
+  server = table_server.TableServer(max_workers=2)
+
+  try:
+    outputs = asyncio.run(play_tables(server))
+  finally:
+    server.close()
+
+  assert server.tables == {}
+  check_results(server.results['ai'], 2)
+  check_results(server.results['one'], 2)
+  check_results(server.results['many'], 1)
+  assert server.results['many']['decks'] == 2
+
+  for output in outputs:
+    assert output.startswith("Joined table")
+    assert "Final roles" in output
+
+def test_table_ends_when_a_person_leaves():
+  async def play_table(server):
+    server.add_table('1', players(Person, AI, AI, AI))
+    connection = await join(server, '1', "Person 1")
+    connection.close()
+    await server.wait_closed()
+
+  with concurrent.futures.ThreadPoolExecutor() as executor:
+    server = table_server.TableServer(executor)
+    asyncio.run(play_table(server))
+
+  assert server.results == {'1': None}
+  assert server.tables == {}
+
+def test_table_ends_when_a_player_fails(caplog):
+  async def play_table(server):
+    server.add_table('1', players(Person, FailingPlayer, FailingPlayer, FailingPlayer))
+    connection = await join(server, '1', "Person 1")
+    output = await answer(connection)
+    await server.wait_closed()
+
+    return output
+
+  with concurrent.futures.ThreadPoolExecutor() as executor:
+    server = table_server.TableServer(executor)
+    output = asyncio.run(play_table(server))
+
+  assert server.results == {'1': None}
+  assert server.tables == {}
+  assert "stopped on an error" in output
+  assert "The player failed." in caplog.text
+
+def test_join_refuses_taken_seats():
+  async def join_twice(server):
+    server.add_table('1', players(Person, AI, AI, AI))
+    first = table_server.QueueConnection(["1 Person 1"])
+    second = table_server.QueueConnection(["1 Person 1"])
+    await server.join(first)
+    await server.join(second)
+
+    refusal = await answer(second)
+    first.close()
+    await server.wait_closed()
+
+    return refusal
+
+  with concurrent.futures.ThreadPoolExecutor() as executor:
+    server = table_server.TableServer(executor)
+    refusal = asyncio.run(join_twice(server))
+
+  assert refusal.startswith("There is no free seat")
@@ -0,0 +1,89 @@
+'''
+Tests of the input providers of user_input: scripted input, and games of AI replayed by a Person answered from their log.
+'''
+
+import pytest
+import game_log
+import user_input as user_in
+import user_interface as ui
+from ai import AI
+from engine import Game
+from person import Person
+
+@pytest.fixture(autouse=True)
+def unattended():
+  '''Show nothing while a test runs, and put the provider and renderer in use back afterwards'''
+
+  old_renderer = ui.set_renderer(ui.NullRenderer())
+  old_provider = user_in.provider
+
+  yield
+
+  user_in.set_provider(old_provider)
+  ui.set_renderer(old_renderer)
+
+def play_game(num_players, total_rounds, seed, person_seat = None, decks = None):
+  '''Play a game between AI (with a Person in person_seat, if any) and return its results'''
+
+  players = [(Person if counter == person_seat else AI)("Player " + str(counter + 1)) for counter in range(num_players)]
+
+  return Game(players, total_rounds, seed, decks=decks).play()
+
+@pytest.mark.parametrize('person_seat', range(4))
+def test_person_replays_single_deck_game_from_log(person_seat):
+  results = play_game(4, 3, 21)
+  record = game_log.GameRecord(game_log.encode_game(results))
+
+  user_in.set_provider(user_in.LogReplayInput(record))
+
+  assert play_game(4, 3, 21, person_seat)['rounds'] == results['rounds']
+
+@pytest.mark.parametrize('person_seat', [0, 5])
+def test_person_replays_multi_deck_game_from_log(person_seat):
+  results = play_game(10, 2, 22, decks=2)
+  record = game_log.GameRecord(game_log.encode_game(results))
+
+  user_in.set_provider(user_in.LogReplayInput(record))
+
+  assert play_game(10, 2, 22, person_seat, decks=2)['rounds'] == results['rounds']
+
+def test_replay_of_another_game_fails():
+  record = game_log.GameRecord(game_log.encode_game(play_game(4, 1, 23)))
+
+  user_in.set_provider(user_in.LogReplayInput(record))
+
+  with pytest.raises((RuntimeError, EOFError)):
+    play_game(4, 1, 24, 0)
+
+def test_log_replay_refuses_prompts_that_are_not_choices():
+  record = game_log.GameRecord(game_log.encode_game(play_game(4, 1, 25)))
+
+  with pytest.raises(EOFError):
+    user_in.LogReplayInput(record).read_line("Number of players: ")
+
+  assert user_in.LogReplayInput(record, user_in.ScriptedInput(["4"])).read_line("Number of players: ") == "4"
+
+def test_scripted_input_runs_out():
+  provider = user_in.ScriptedInput([1, "two"])
+  provider.push(3)
+
+  assert [provider.read_line("Line: ") for counter in range(3)] == ["1", "two", "3"]
+
+  with pytest.raises(EOFError):
+    provider.read_line("Line: ")
+
+def test_scripted_input_answers_input_functions():
+  user_in.set_provider(user_in.ScriptedInput(["x", "0", "7", "3"]))
+
+  # Invalid lines are asked for again, until one in the range is given
+  assert user_in.valid_input_with_range("Number: ", int, 1, 5) == 3
+
+  with pytest.raises(EOFError):
+    user_in.input_ln("More: ")
+
+def test_callback_input_is_given_the_player():
+  asked = []
+  user_in.set_provider(user_in.CallbackInput(lambda input_str, player: asked.append((input_str, player)) or 2))
+
+  assert user_in.input_ln("Move #: ", "someone") == "2"
+  assert asked == [("Move #: ", "someone")]
@@ -0,0 +1,214 @@
+'''
+Tournament runner that plays many headless games (see engine) across a pool of processes.
+
+Every game gets its own seed, derived from the tournament seed and the game number, so results
+are reproducible and do not depend on the number of processes.
+
+Usage: python tournament.py --games 1000 --rounds 3 --players AI AI AI Player
+Tables of more than 8 players are dealt from several decks, e.g. --players with 16 AI and --decks 2.
+'''
+
+import argparse
+import math
+import multiprocessing
+import dealing
+import instrumentation
+import game_log
+from engine import Game
+from player import Player
+from ai import AI
+from mc_ai import MonteCarloAI
+
+PLAYER_TYPES = {'AI': AI, 'MonteCarloAI': MonteCarloAI, 'Player': Player}
+
+def game_seed(seed, game_index):
+  '''Return the seed of a game in a tournament with the given seed'''
+  return dealing.stream_seed(seed, game_index)
+
+def empty_tally(names):
+  '''Return a tally with no games recorded, for players with the given names'''
+
+  return {
+    'games': 0,
+    'positions': {name: [0] * len(names) for name in names},
+    'roles': {name: {} for name in names}
+  }
+
+def record_game(tally, result):
+  '''Add the finishing positions and roles of every round of a game result to the tally'''
+
+  tally['games'] += 1
+
+  for game_round in result['rounds']:
+    for name, role in game_round['roles'].items():
+      tally['roles'][name][role] = tally['roles'][name].get(role, 0) + 1
+
+  for name, finishing_record in result['finishing_records'].items():
+    for position in finishing_record:
+      tally['positions'][name][position - 1] += 1
+
+  if 'instrumentation' in result:
+    tally['instrumentation'] = instrumentation.merge_summaries(tally.get('instrumentation', {'counters': {}, 'timings': {}}), result['instrumentation'])
+
+def merge_tallies(total, tally):
+  '''Add the games recorded in tally to total'''
+
+  total['games'] += tally['games']
+
+  for name in tally['positions']:
+    for index in range(len(tally['positions'][name])):
+      total['positions'][name][index] += tally['positions'][name][index]
+
+    for role, count in tally['roles'][name].items():
+      total['roles'][name][role] = total['roles'][name].get(role, 0) + count
+
+  if 'instrumentation' in tally:
+    total['instrumentation'] = instrumentation.merge_summaries(total.get('instrumentation', {'counters': {}, 'timings': {}}), tally['instrumentation'])
+
+def play_games(player_specs, total_rounds, seed, game_indices, instrument = False, log = False, decks = None):
+  '''
+  Play the games with the given indices, and return their tally (runs inside worker processes)
+
+  If log is set, the tally also holds the game log record of every game (see game_log), under 'log'.
+  decks -- number of decks of every game (see engine.Game), if not as few as the number of players needs
+  '''
+
+  names = [name for name, player_type in player_specs]
+  tally = empty_tally(names)
+
+  if log: tally['log'] = []
+
+  for game_index in game_indices:
+    players = [player_type(name) for name, player_type in player_specs]
+    result = Game(players, total_rounds, game_seed(seed, game_index), instrument, decks).play()
+    record_game(tally, result)
+
+    if log: tally['log'].append(game_log.encode_game(result))
+
+  return tally
+
+def _play_batch(args):
+  return play_games(*args)
+
+def summarize(tally, z = 1.96):
+  '''
+  Return the role distribution and mean finishing position of each player in the tally,
+  along with the half-width of the confidence interval of that mean (z = 1.96 for 95%)
+  '''
+
+  summary = {'games': tally['games'], 'players': {}}
+
+  for name, positions in tally['positions'].items():
+    num_rounds = sum(positions)
+    mean = variance = half_width = None
+
+    if num_rounds > 0:
+      mean = sum((index + 1) * count for index, count in enumerate(positions)) / num_rounds
+      variance = sum(((index + 1 - mean) ** 2) * count for index, count in enumerate(positions)) / num_rounds
+      half_width = z * math.sqrt(variance / num_rounds)
+
+    summary['players'][name] = {
+      'rounds': num_rounds,
+      'mean_position': mean,
+      'half_width': half_width,
+      'positions': positions[:],
+      'roles': {role: count / num_rounds for role, count in tally['roles'][name].items()}
+    }
+
+  if 'instrumentation' in tally:
+    summary['instrumentation'] = tally['instrumentation']
+
+  return summary
+
+def is_precise(summary, tolerance):
+  '''Return whether every player's mean finishing position is known to within tolerance'''
+
+  for stats in summary['players'].values():
+    if stats['half_width'] == None or stats['half_width'] > tolerance:
+      return False
+
+  return True
+
+def run_tournament(player_specs, num_games, total_rounds = 1, seed = 0, processes = None, batch_size = 50, tolerance = None, min_games = 100, z = 1.96, instrument = False, log_path = None, decks = None):
+  '''
+  Play up to num_games games between players given as (name, player class) pairs, and return the summary of the results
+
+  If tolerance is specified, the tournament stops early, once at least min_games games have been played
+  and every player's mean finishing position is known to within tolerance (see summarize),
+  checked after each batch of batch_size games in game order, so the same arguments always stop after the same games.
+  If instrument is set, every game is recorded (see engine.Game), and the summary includes what was recorded in all of them.
+  If log_path is specified, every game is appended to the game log at that path (see game_log).
+  If decks is specified, every game is played with that many decks (see multi_deck), which allows more players.
+  '''
+
+  names = [name for name, player_type in player_specs]
+
+  if len(set(names)) != len(names):
+    raise ValueError("Player names must be unique.")
+
+  batches = [(player_specs, total_rounds, seed, range(start, min(start + batch_size, num_games)), instrument, log_path != None, decks) for start in range(0, num_games, batch_size)]
+  total = empty_tally(names)
+  log_writer = game_log.GameLogWriter(log_path) if log_path != None else None
+
+  with multiprocessing.Pool(processes) as pool:
+    # Batches are merged in order, so an early stop always happens after the same games, whatever their timing
+    for tally in pool.imap(_play_batch, batches):
+      if log_writer != None:
+        for record in tally.pop('log'):
+          log_writer.write_record(record)
+
+      merge_tallies(total, tally)
+
+      if tolerance != None and total['games'] >= min_games and is_precise(summarize(total, z), tolerance):
+        pool.terminate()
+        break
+
+  if log_writer != None: log_writer.close()
+
+  return summarize(total, z)
+
+def print_summary(summary):
+  '''Output the summary of a tournament as a table'''
+
+  print("Games played:", summary['games'])
+
+  for name, stats in summary['players'].items():
+    # A player without any finished round (e.g. when no games were played) has no mean position
+    if stats['mean_position'] == None:
+      print(name.ljust(16), "mean position: n/a")
+    else:
+      print(name.ljust(16), "mean position: %.3f +/- %.3f" % (stats['mean_position'], stats['half_width']))
+
+    for role, share in sorted(stats['roles'].items(), key=lambda item: -item[1]):
+      print("  " + role.ljust(16), "%5.1f%%" % (share * 100))
+
+  if 'instrumentation' in summary:
+    print()
+    instrumentation.print_summary(summary['instrumentation'])
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser(description="Play a tournament of headless President games between AI players.")
+  parser.add_argument('--games', type=int, default=1000, help="maximum number of games to play")
+  parser.add_argument('--rounds', type=int, default=1, help="number of rounds per game")
+  parser.add_argument('--players', nargs='+', default=['AI', 'AI', 'AI', 'AI'], choices=list(PLAYER_TYPES), help="type of each player")
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--processes', type=int, default=None, help="number of worker processes (default: one per core)")
+  parser.add_argument('--batch-size', type=int, default=50, help="number of games handed to a worker at a time")
+  parser.add_argument('--tolerance', type=float, default=None, help="stop once every mean finishing position is known to within this")
+  parser.add_argument('--instrument', action='store_true', help="record turn latencies and move generation (see instrumentation)")
+  parser.add_argument('--log', default=None, help="append every game to the game log at this path (see game_log)")
+  parser.add_argument('--decks', type=int, default=None, help="number of decks shuffled together, allowing 8 players per deck (default: as few as needed)")
+  parser.add_argument('--turn-budget', type=float, default=None, help="latency budget of a turn in milliseconds, whose overruns are counted (implies --instrument)")
+  args = parser.parse_args()
+
+  if args.games < 1:
+    parser.error("--games must be at least 1")
+
+  player_specs = [(player_type + " " + str(counter + 1), PLAYER_TYPES[player_type]) for counter, player_type in enumerate(args.players)]
+
+  instrument = args.instrument
+
+  if args.turn_budget != None:
+    instrument = {'turn/' + player_type: args.turn_budget / 1000 for player_type in PLAYER_TYPES}
+
+  print_summary(run_tournament(player_specs, args.games, args.rounds, args.seed, args.processes, args.batch_size, args.tolerance, instrument=instrument, log_path=args.log, decks=args.decks))
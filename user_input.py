@@ -1,30 +1,203 @@
-from user_interface import print_ln_input
+'''
+Input of the game, with data validation, read from an input provider: the keyboard by default, or a script,
+a callback or a game log (see set_provider), so games with people in them can be played unattended.
 
-def valid_input(input_str, checker_func, error_message = "Please enter a valid input."):
+Providers are given each prompt, and the player it is for when a player is making a choice
+(see Person), and return the line of input that answers it.
+'''
+
+import collections
+import card_mask
+import multi_deck
+import user_interface as ui
+
+# Prompts of the choices players make (see Person), which a log can answer (see LogReplayInput)
+MOVE_PROMPT = "Move #: "
+CARD_PROMPT = "Card "
+
+class InputProvider:
+  '''Source of the lines of input of the game'''
+
+  def read_line(self, input_str, player = None):
+    '''Return the line of input answering the prompt input_str, asked of player if it is one of their choices'''
+    raise NotImplementedError
+
+  def wait_for_enter(self, prompt):
+    '''Wait until the user is ready to continue, after prompting them with prompt'''
+
+    # Only a person at the keyboard needs time to read, so other providers carry on straight away
+    ui.renderer.write(prompt + "\n")
+    ui.renderer.flush()
+
+  def _echo(self, input_str, line):
+    '''Output the prompt and the line answering it, as if it had been typed in'''
+
+    ui.renderer.write("┃ " + input_str + line + "\n")
+    ui.renderer.flush()
+
+class ConsoleInput(InputProvider):
+  '''Input typed in by the user at the keyboard'''
+
+  def read_line(self, input_str, player = None):
+    return ui.renderer.read_line("┃ " + input_str)
+
+  def wait_for_enter(self, prompt):
+    ui.renderer.read_line(prompt)
+
+class ScriptedInput(InputProvider):
+  '''
+  Input read from a queue of lines, which can be added to at any time (see push)
+
+  When the queue is empty, reading raises EOFError, like input() at the end of a file.
+  '''
+
+  def __init__(self, lines = ()):
+    self.lines = collections.deque(str(line) for line in lines)
+
+  def push(self, *lines):
+    '''Add lines to the end of the queue'''
+    self.lines.extend(str(line) for line in lines)
+
+  def read_line(self, input_str, player = None):
+    if not self.lines:
+      raise EOFError("Scripted input ran out at prompt: " + input_str)
+
+    line = self.lines.popleft()
+    self._echo(input_str, line)
+
+    return line
+
+class CallbackInput(InputProvider):
+  '''
+  Input returned by a function called with each prompt and the player it is for (None if not a player's choice)
+
+  The callback must eventually return valid input, as invalid input is asked for again.
+  '''
+
+  def __init__(self, callback):
+    self.callback = callback
+
+  def read_line(self, input_str, player = None):
+    line = str(self.callback(input_str, player))
+    self._echo(input_str, line)
+
+    return line
+
+class LogReplayInput(InputProvider):
+  '''
+  Input that makes every player of a logged game (see game_log.GameRecord) choose the moves and trade cards they chose in the log
+
+  Players are matched with the log by name. Replaying the game with the same seed and the same choices
+  from every other player (e.g. deterministic AI) plays it out exactly as logged. Otherwise, once a player
+  is asked for a choice that the log cannot answer, reading raises RuntimeError (or EOFError past the end of the log).
+
+  fallback -- provider of any input that is not a choice of a player (e.g. the options of base_game), if any
+  '''
+
+  def __init__(self, record, fallback = None):
+    self.fallback = fallback
+
+    # Choices of each player in the order they were made, as ('card', (card mask, number of copies of it chosen before))
+    # or ('move', move mask or 0 for a pass), where masks are count masks with several decks (see multi_deck)
+    self.choices = {name: collections.deque() for name in record.players}
+    card_masks = card_mask.bits if record.decks == 1 else multi_deck.units
+
+    for game_round in record.rounds:
+      seating = game_round['seating']
+
+      for trade in game_round['trades']:
+        given_masks = card_masks(trade['given'])
+
+        for counter, given_mask in enumerate(given_masks):
+          self.choices[trade['president']].append(('card', (given_mask, given_masks[:counter].count(given_mask))))
+
+      for seat, move_mask in game_round['turns']:
+        self.choices[seating[seat]].append(('move', move_mask))
+
+  def read_line(self, input_str, player = None):
+    if player == None or not (input_str == MOVE_PROMPT or input_str.startswith(CARD_PROMPT)):
+      if self.fallback == None:
+        raise EOFError("The log has no answer to prompt: " + input_str)
+
+      return self.fallback.read_line(input_str, player)
+
+    if not self.choices.get(player.name):
+      raise EOFError(player.name + " has no choices left in the log.")
+
+    kind, choice = self.choices[player.name].popleft()
+
+    if kind == 'move' and input_str == MOVE_PROMPT:
+      line = self.__move_choice(player, choice)
+    elif kind == 'card' and input_str.startswith(CARD_PROMPT):
+      line = self.__card_choice(player, choice)
+    else:
+      raise RuntimeError("The game diverged from the log: " + player.name + " was asked '" + input_str + "' instead of choosing a " + kind + ".")
+
+    self._echo(input_str, line)
+
+    return line
+
+  def __move_choice(self, player, move_mask):
+    '''Return the number of the choice of the logged move (or pass) among the player's options'''
+
+    if move_mask == 0 and player._can_pass:
+      return str(player._last_choice)
+
+    for index, valid_mask in enumerate(player._valid_moves.masks):
+      if valid_mask == move_mask:
+        return str(index + 1)
+
+    raise RuntimeError("The game diverged from the log: " + player.name + " cannot play the logged move.")
+
+  def __card_choice(self, player, card_choice):
+    '''Return the number of the choice of the logged card among the cards of the player's hand (skipping copies chosen already)'''
+
+    given_mask, copies_before = card_choice
+
+    for index, hand_card in enumerate(player.hand):
+      if player.hand.mask_of(hand_card) == given_mask:
+        if copies_before == 0: return str(index + 1)
+        copies_before -= 1
+
+    raise RuntimeError("The game diverged from the log: " + player.name + " does not hold the logged card.")
+
+# Input provider in use
+provider = ConsoleInput()
+
+def set_provider(new_provider):
+  '''Read all input from new_provider from now on, and return the one it replaces'''
+
+  global provider
+
+  old_provider, provider = provider, new_provider
+
+  return old_provider
+
+def valid_input(input_str, checker_func, error_message = "Please enter a valid input.", player = None):
   '''Input with data validation according to checker_func that outputs error message if invalid'''
 
   while True:
     try:
-      return checker_func(input_ln(input_str))
+      return checker_func(input_ln(input_str, player))
       break
     except ValueError:
-      print_ln_input(error_message)
+      ui.print_ln_input(error_message)
 
-def valid_input_with_range(input_str, checker_func, low, high):
+def valid_input_with_range(input_str, checker_func, low, high, player = None):
   '''Input with data validation according to checker_func and specific number range that outputs error message if invalid'''
 
   within_range = False
   error_message = ("Please enter a number from " + str(low) + " to " + str(high) + ".")
 
   while not within_range:
-    user_in = valid_input(input_str, checker_func, error_message)
+    user_in = valid_input(input_str, checker_func, error_message, player)
 
     if low <= user_in <= high:
       return user_in
     else:
-      print_ln_input(error_message)
+      ui.print_ln_input(error_message)
 
-def valid_input_with_values(input_str, *possible_values):
+def valid_input_with_values(input_str, *possible_values, player = None):
   '''Input with data validation with a selection of valid values that outputs error message if invalid'''
 
   valid = False
@@ -40,15 +213,20 @@ def valid_input_with_values(input_str, *possible_values):
   error_message += values_str
 
   while not valid:
-    user_in = input_ln(input_str + " (" + values_str + "): ")
+    user_in = input_ln(input_str + " (" + values_str + "): ", player)
 
     if user_in.lower() in possible_values:
       return user_in.lower()
     else:
-      print_ln_input(error_message)
+      ui.print_ln_input(error_message)
 
-def input_ln(input_str):
+def input_ln(input_str, player = None):
   '''Return player input, but displayed in formatted manner'''
-  
-  return input("┃ " + input_str)
-    
\ No newline at end of file
+
+  return provider.read_line(input_str, player)
+
+def wait_for_enter(prompt):
+  '''Wait for the user to press enter before continuing'''
+
+  provider.wait_for_enter(prompt)
+
@@ -1,11 +1,127 @@
-from card import Card, Hand
-import os
+from card import Card, Hand, Move
+import atexit
+import sys
 import time
+import user_input
 
 # Global Variables
 ui_width = 80
 box = ['┏', '┓', '┃', '━', '┗', '┛', '┣', '┫']
 
+CLEAR_SCREEN = '\033[H\033[2J\033[3J'   # Moves the cursor home and erases the screen and scrollback, like the clear command
+
+class Renderer:
+  '''
+  Output backend of the user interface, which writes straight to the console as soon as anything is output
+
+  delay -- whether to pause for effect after some messages (see print_end_input), which is only worth it if a person is watching
+  stream -- file the output is written to, by default whatever sys.stdout is at the time of writing (e.g. after a redirect)
+  '''
+
+  # Whether output is shown at all; if not, the print functions return before formatting anything
+  formatting = True
+
+  def __init__(self, delay = True, stream = None):
+    self.delay = delay
+    self._stream = stream
+
+  @property
+  def stream(self):
+    return self._stream if self._stream != None else sys.stdout
+
+  def write(self, text):
+    self.stream.write(text)
+
+  def clear(self):
+    self.write(CLEAR_SCREEN)
+
+  def flush(self):
+    self.stream.flush()
+
+  def pause(self, seconds):
+    '''Show everything output so far, then wait for the given number of seconds if delays are on'''
+
+    self.flush()
+    if self.delay: time.sleep(seconds)
+
+  def read_line(self, prompt):
+    '''Show everything output so far and the prompt, then return a line of input'''
+
+    self.flush()
+    return input(prompt)
+
+class TerminalRenderer(Renderer):
+  '''
+  Output backend that keeps the output of a screen in a buffer, and writes it to the console in one go
+  when the screen is complete (before waiting for input or pausing), instead of line by line
+
+  Clearing the screen drops whatever is still in the buffer, since it would be erased straight away.
+  '''
+
+  def __init__(self, delay = True, stream = None):
+    super().__init__(delay, stream)
+    self.buffer = []
+
+  def write(self, text):
+    self.buffer.append(text)
+
+  def clear(self):
+    self.buffer = [CLEAR_SCREEN]
+
+  def flush(self):
+    if self.buffer:
+      self.stream.write("".join(self.buffer))
+      self.buffer = []
+
+    self.stream.flush()
+
+class NullRenderer(Renderer):
+  '''Output backend that shows nothing but input prompts, for games nobody is watching (e.g. between AI players), without any delays'''
+
+  formatting = False
+
+  def __init__(self):
+    super().__init__(False)
+
+  def write(self, text):
+    pass
+
+  def clear(self):
+    pass
+
+  def flush(self):
+    pass
+
+  def pause(self, seconds):
+    pass
+
+  def read_line(self, prompt):
+    '''Return a line of input, still showing the prompt, as whoever is asked to type cannot answer without it'''
+    return input(prompt)
+
+# Output backend in use
+renderer = TerminalRenderer()
+
+def set_renderer(new_renderer):
+  '''Use new_renderer for all output from now on, and return the one it replaces (after showing its remaining output)'''
+
+  global renderer
+
+  old_renderer, renderer = renderer, new_renderer
+  old_renderer.flush()
+
+  return old_renderer
+
+def _flush_at_exit():
+  '''Show the output left in the buffer when the program ends (e.g. after a crash), unless the stream is already closed or broken'''
+
+  try:
+    renderer.flush()
+  except (ValueError, OSError):
+    pass
+
+atexit.register(_flush_at_exit)
+
 def to_ordinal(number):
   '''Converts number to ordinal representation as a string'''
 
@@ -18,21 +134,30 @@ def to_ordinal(number):
   elif number % 10 == 3:
     return str(number) + "rd"
 
-def print_hand_type(str_in):
+def hand_type_name(str_in):
   '''Return the display value of a card hand.'''
 
   list_in = str_in.split("_")
   for word_counter in range(len(list_in)):
     if not (list_in[word_counter] == 'of' or list_in[word_counter] == 'a'):
       list_in[word_counter] = list_in[word_counter].capitalize()
-  print(" ".join(list_in))
+  return " ".join(list_in)
+
+def print_hand_type(str_in):
+  '''Print the display value of a card hand.'''
+
+  if not renderer.formatting: return
+
+  renderer.write(hand_type_name(str_in) + "\n")
 
 def print_moves(player, moves = 'default', is_moves = True):
   '''
-  Print a list of moves or cards in a format that allows for player selection\n
+  Print a list of moves (or MoveList, see move_list) or cards in a format that allows for player selection\n
   By default, outputs a player's valid moves
   '''
 
+  if not renderer.formatting: return
+
   counter = 1
   choice_max_length = 1
   max_choice = len(moves) + 1
@@ -56,10 +181,10 @@ def print_moves(player, moves = 'default', is_moves = True):
     if is_moves:
       move_max_size = (14 * move.size()) + move.size() + (4 * (max_move_size - move.size()))
 
-      print(str(move).ljust(move_max_size), end="")
+      renderer.write(str(move).ljust(move_max_size))
       print_hand_type(move.hand_type)
     else:
-      print(move)
+      renderer.write(str(move) + "\n")
 
     counter += 1
 
@@ -71,7 +196,9 @@ def print_moves(player, moves = 'default', is_moves = True):
 def print_title(text, length = ui_width):
   '''Outputs a formatted title for a box'''
 
-  os.system("clear")
+  if not renderer.formatting: return
+
+  renderer.clear()
   print_str = box[0]
   print_str += " "
   print_str += text.upper()
@@ -79,16 +206,18 @@ def print_title(text, length = ui_width):
   print_str += (length - len(print_str) - 1) * box[3]
   print_str += box[1]
 
-  print(print_str)
+  renderer.write(print_str + "\n")
 
 def print_end(length = ui_width):
   '''Outputs the bottom of a box'''
 
+  if not renderer.formatting: return
+
   print_str = box[4]
   print_str += (length - 2) * box[3]
   print_str += box[5]
 
-  print(print_str)
+  renderer.write(print_str + "\n")
 
 # UNUSED
 # def print_subtitle(text, length = ui_width):
@@ -106,34 +235,42 @@ def print_end(length = ui_width):
 def print_title_input(text, length = ui_width):
   '''Outputs a formatted title for input purposes'''
 
+  if not renderer.formatting: return
+
   print_str = box[0]
   print_str += " "
   print_str += text.upper()
   
-  print(print_str)
+  renderer.write(print_str + "\n")
 
 def print_end_input(text, wait_for_enter = True):
   '''Outputs an ending message and prompt after input has been received'''
 
-  print(box[4], text, end="")
+  if not renderer.formatting: return
+
+  renderer.write(box[4] + " " + text)
 
   if wait_for_enter:
-    input(". Press enter to continue...")
+    user_input.wait_for_enter(". Press enter to continue...")
   else:
     for counter in range(3):
-      print(".", end="", flush=True)
-      time.sleep(0.3)
-    print()
-    time.sleep(0.5)
+      renderer.write(".")
+      renderer.pause(0.3)
+    renderer.write("\n")
+    renderer.pause(0.5)
 
 def print_ln_input(text, end='\n'):
   '''Outputs text formatted for inputting purposes'''
 
-  print("┃ " + text, end=end)
+  if not renderer.formatting: return
+
+  renderer.write("┃ " + text + end)
 
 def print_box(title, *text, length = ui_width):
   '''Outputs a fully formatted box with a title and text inside'''
 
+  if not renderer.formatting: return
+
   print_title(title, length)
   
   for item in text:
@@ -156,7 +293,8 @@ def print_box(title, *text, length = ui_width):
 def print_ln(*objects, sep=' ', end='\n', length = ui_width):
   '''Outputs one line of text within a box'''
 
-  if len(objects) == 0: print(end=end)
+  if not renderer.formatting: return
+  if len(objects) == 0: renderer.write(end)
 
   print_str = box[2]
   print_str += " "
@@ -167,7 +305,7 @@ def print_ln(*objects, sep=' ', end='\n', length = ui_width):
     print_str += str(objects[obj_index])
     if isinstance(objects[obj_index], Card):
       num_cards += 1
-    elif isinstance(objects[obj_index], Hand):
+    elif isinstance(objects[obj_index], (Hand, Move)):
       num_cards += objects[obj_index].size()
 
     if '👑' in print_str:
@@ -176,4 +314,4 @@ def print_ln(*objects, sep=' ', end='\n', length = ui_width):
     if obj_index < len(objects) - 1:
       print_str += sep
 
-  print(print_str.ljust(length - 1 + (num_cards * 11) - crown) + box[2], end=end)
+  renderer.write(print_str.ljust(length - 1 + (num_cards * 11) - crown) + box[2] + end)